@@ -0,0 +1,122 @@
+#!/usr/local/sbin/charm-env python3
+# Copyright 2019 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import traceback
+
+import yaml
+
+# Load modules from $CHARM_DIR/lib
+_path = os.path.dirname(os.path.realpath(__file__))
+_lib = os.path.abspath(os.path.join(_path, "../lib"))
+
+
+def _add_path(path):
+    if path not in sys.path:
+        sys.path.insert(1, path)
+
+
+_add_path(_lib)
+
+
+import charms_openstack.bus  # noqa
+import charms_openstack.charm as charm  # noqa
+
+import charmhelpers.core as ch_core  # noqa
+
+import charm.mysql_router as mysql_router  # noqa
+
+charms_openstack.bus.discover()
+
+
+def router_stats(args):
+    """Report connection statistics and greeting latency of each route.
+
+    :param args: sys.argv
+    :type args: list
+    :side effect: Calls hookenv.action_set
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    with charm.provide_charm_instance() as instance:
+        stats = instance.router_stats()
+    ch_core.unitdata.kv().flush()
+    ch_core.hookenv.action_set({
+        "output": yaml.safe_dump(stats, default_flow_style=False)})
+
+
+def failover_probe(args):
+    """Measure write unavailability through the RW route.
+
+    :param args: sys.argv
+    :type args: list
+    :side effect: Calls hookenv.action_set
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    params = ch_core.hookenv.action_get()
+    with charm.provide_charm_instance() as instance:
+        results = instance.probe_failover(
+            params["duration"], interval=params["interval"])
+    ch_core.hookenv.action_set({
+        "output": yaml.safe_dump(results, default_flow_style=False)})
+
+
+def handler_timings(args):
+    """Report p50/p95 wall times of each handler and major charm method.
+
+    :param args: sys.argv
+    :type args: list
+    :side effect: Calls hookenv.action_set
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    with charm.provide_charm_instance() as instance:
+        timings = instance.handler_timings()
+    ch_core.hookenv.action_set({
+        "output": yaml.safe_dump(timings, default_flow_style=False)})
+
+
+# A dictionary of all the defined actions to callables (which take
+# parsed arguments).
+ACTIONS = {
+    "router-stats": router_stats,
+    "failover-probe": failover_probe,
+    "handler-timings": handler_timings,
+}
+
+
+def main(args):
+    action_name = os.path.basename(args[0])
+    try:
+        action = ACTIONS[action_name]
+    except KeyError:
+        return "Action {} undefined".format(action_name)
+    else:
+        try:
+            action(args)
+        except Exception as e:
+            ch_core.hookenv.log(
+                "Action {} failed: {}".format(action_name, str(e)),
+                "ERROR")
+            ch_core.hookenv.action_fail(
+                "{} failed: {}".format(action_name, str(e)))
+            ch_core.hookenv.action_set({
+                "traceback": traceback.format_exc()})
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+#
+# Copyright 2019 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Prometheus exporter for MySQL Router.
+
+Serves the route and metadata cache statistics of the MySQL Router REST API
+in the Prometheus text exposition format. Installed and managed by the
+mysql-router charm, only the Python 3 standard library is used.
+"""
+
+import argparse
+import base64
+import datetime
+import http.server
+import json
+import urllib.request
+
+REST_API_VERSION = "20190715"
+
+# (name, type, help, REST API field)
+ROUTE_STATUS_METRICS = [
+    ("mysqlrouter_route_active_connections", "gauge",
+     "Client connections currently open on the route",
+     "activeConnections"),
+    ("mysqlrouter_route_connections_total", "counter",
+     "Client connections made to the route", "totalConnections"),
+    ("mysqlrouter_route_blocked_hosts", "gauge",
+     "Client hosts blocked by the route", "blockedHosts"),
+]
+METADATA_STATUS_METRICS = [
+    ("mysqlrouter_metadata_refresh_succeeded_total", "counter",
+     "Successful metadata cache refreshes", "refreshSucceeded"),
+    ("mysqlrouter_metadata_refresh_failed_total", "counter",
+     "Failed metadata cache refreshes", "refreshFailed"),
+]
+
+
+class RESTClient(object):
+    """Minimal client of the MySQL Router REST API."""
+
+    def __init__(self, url, user, password, timeout=5):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.authorization = "Basic {}".format(base64.b64encode(
+            "{}:{}".format(user, password).encode("UTF-8")).decode("UTF-8"))
+
+    def get(self, path):
+        """Get a resource from the REST API.
+
+        :param path: Path of the resource, i.e. routes
+        :type path: str
+        :returns: Decoded JSON response
+        :rtype: dict
+        :raises: OSError, ValueError
+        """
+        request = urllib.request.Request(
+            "{}/api/{}/{}".format(self.url, REST_API_VERSION, path))
+        request.add_header("Authorization", self.authorization)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("UTF-8"))
+
+
+def parse_timestamp(value):
+    """Convert a REST API timestamp to seconds since the epoch.
+
+    :param value: Timestamp, i.e. 2020-02-05T12:34:56.123456Z
+    :type value: str
+    :returns: Seconds since the epoch or None if it can not be parsed
+    :rtype: Union[float, None]
+    """
+    for _format in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            timestamp = datetime.datetime.strptime(value or "", _format)
+        except ValueError:
+            continue
+        return timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+    return None
+
+
+def collect(client):
+    """Collect metrics from the REST API.
+
+    :param client: REST API client
+    :type client: RESTClient
+    :returns: {name: (type, help, [(labels, value), ...])}
+    :rtype: dict
+    """
+    metrics = {}
+
+    def _add(name, _type, _help, labels, value):
+        if value is None:
+            return
+        metrics.setdefault(name, (_type, _help, []))[2].append(
+            (labels, value))
+
+    try:
+        routes = [item["name"] for item in client.get("routes")["items"]]
+        caches = [item["name"] for item in client.get("metadata")["items"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        _add("mysqlrouter_up", "gauge",
+             "Whether the MySQL Router REST API is reachable", {}, 0)
+        return metrics
+    _add("mysqlrouter_up", "gauge",
+         "Whether the MySQL Router REST API is reachable", {}, 1)
+
+    for route in routes:
+        labels = {"route": route}
+        try:
+            status = client.get("routes/{}/status".format(route))
+            health = client.get("routes/{}/health".format(route))
+            destinations = client.get("routes/{}/destinations".format(route))
+        except (OSError, ValueError):
+            continue
+        for name, _type, _help, field in ROUTE_STATUS_METRICS:
+            _add(name, _type, _help, labels, status.get(field))
+        _add("mysqlrouter_route_alive", "gauge",
+             "Whether the route is alive", labels,
+             int(bool(health.get("isAlive"))))
+        _add("mysqlrouter_route_destinations", "gauge",
+             "Destinations currently available to the route", labels,
+             len(destinations.get("items", [])))
+
+    for cache in caches:
+        labels = {"metadata_cache": cache}
+        try:
+            status = client.get("metadata/{}/status".format(cache))
+        except (OSError, ValueError):
+            continue
+        for name, _type, _help, field in METADATA_STATUS_METRICS:
+            _add(name, _type, _help, labels, status.get(field))
+        _add("mysqlrouter_metadata_last_refresh_succeeded_timestamp_seconds",
+             "gauge", "Time of the last successful metadata cache refresh",
+             labels, parse_timestamp(status.get("timeLastRefreshSucceeded")))
+        _add("mysqlrouter_metadata_last_refresh_failed_timestamp_seconds",
+             "gauge", "Time of the last failed metadata cache refresh",
+             labels, parse_timestamp(status.get("timeLastRefreshFailed")))
+    return metrics
+
+
+def format_metrics(metrics):
+    """Format metrics in the Prometheus text exposition format.
+
+    :param metrics: {name: (type, help, [(labels, value), ...])}
+    :type metrics: dict
+    :returns: Metrics
+    :rtype: str
+    """
+    lines = []
+    for name in sorted(metrics):
+        _type, _help, samples = metrics[name]
+        lines.append("# HELP {} {}".format(name, _help))
+        lines.append("# TYPE {} {}".format(name, _type))
+        for labels, value in samples:
+            _labels = ",".join(
+                '{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                for k, v in sorted(labels.items()))
+            lines.append("{}{} {}".format(
+                name, "{{{}}}".format(_labels) if _labels else "", value))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serve /metrics."""
+
+    client = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = format_metrics(collect(self.client)).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", required=True,
+                        help="JSON file with rest_api_url, user, password, "
+                             "bind_address and port")
+    args = parser.parse_args()
+    with open(args.config) as f:
+        config = json.load(f)
+
+    MetricsHandler.client = RESTClient(
+        config["rest_api_url"], config["user"], config["password"])
+    server = http.server.HTTPServer(
+        (config.get("bind_address", ""), config["port"]), MetricsHandler)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import configparser
+import contextlib
+import datetime
+import hashlib
 import json
+import math
+import os
+import random
+import shutil
+import signal
+import socket
 import subprocess
+import threading
+import time
+import urllib.parse
+import urllib.request
+import yaml
 
 import charms_openstack.charm
 import charms_openstack.adapters
@@ -22,11 +38,30 @@ import charms.reactive as reactive
 
 import charmhelpers.core as ch_core
 import charmhelpers.contrib.network.ip as ch_net_ip
+import charmhelpers.contrib.openstack.utils as ch_os_utils
 
 import charmhelpers.contrib.database.mysql as mysql
 
 
 MYSQLD_CNF = "/etc/mysql/mysql.conf.d/mysqld.cnf"
+MYSQLROUTER_CNF = "mysqlrouter.conf"
+MYSQLROUTER_SERVICE = "jujumysqlrouter"
+# Written by the bootstrapped start.sh the charm ran the router with before
+# it had its systemd unit
+MYSQLROUTER_PID = "mysqlrouter.pid"
+EXPORTER_SERVICE = "jujumysqlrouter-exporter"
+EXPORTER_BIN = "/usr/local/bin/jujumysqlrouter-exporter"
+EXPORTER_CONF = "exporter.json"
+SYSTEMD_UNIT_DIR = "/etc/systemd/system"
+SOCKETS_DIR = "/var/lib/jujumysqlrouter"
+SYSCTL_CONF = "/etc/sysctl.d/50-mysql-router.conf"
+PROC_SYS = "/proc/sys"
+MYSQLROUTER_PASSWD_BIN = "/usr/bin/mysqlrouter_passwd"
+REST_API_PASSWD = "rest_api.passwd"
+REST_API_USER = "charm"
+REST_API_REALM = "charm_realm"
+REST_API_BACKEND = "charm_backend"
+REST_API_VERSION = "20190715"
 
 # Flag Strings
 MYSQL_ROUTER_BOOTSTRAPPED = "charm.mysqlrouter.bootstrapped"
@@ -34,6 +69,228 @@ MYSQL_ROUTER_STARTED = "charm.mysqlrouter.started"
 DB_ROUTER_AVAILABLE = "db-router.available"
 DB_ROUTER_PROXY_AVAILABLE = "db-router.available.proxy"
 
+# Unit KV Keys
+PROXIED_DB_REQUESTS = "charm.mysqlrouter.proxied-db-requests"
+PUBLISHED_DB_RESPONSES = "charm.mysqlrouter.published-db-responses"
+TIME_TO_READY = "charm.mysqlrouter.time-to-ready"
+CONNECTION_CHECK = "charm.mysqlrouter.connection-check"
+ROUTER_STATS = "charm.mysqlrouter.router-stats"
+MYSQLROUTER_FINGERPRINT = "charm.mysqlrouter.fingerprint"
+BOOTSTRAP_HISTORY = "charm.mysqlrouter.bootstrap-history"
+BOOTSTRAP_VALUES = "charm.mysqlrouter.bootstrap-values"
+CLUSTER_MEMBERS = "charm.mysqlrouter.cluster-members"
+REST_API_PASSWORD = "charm.mysqlrouter.rest-api-password"
+HANDLER_TIMINGS = "charm.mysqlrouter.handler-timings"
+DEFAULT_CLUSTER = "charm.mysqlrouter.default-cluster"
+CLUSTER_ROUTERS = "charm.mysqlrouter.cluster-routers"
+
+# Seconds a failed connection check is cached for, doubling on each
+# consecutive failure up to connection-check-ttl
+CONNECTION_CHECK_BACKOFF = 10
+
+# Minimum mysql-router package version supporting each charm managed option
+ROUTER_OPTION_VERSIONS = {
+    "threads": "8.0.22",
+    "use_gr_notifications": "8.0.17",
+    "auth_cache_ttl": "8.0.19",
+    "max_idle_server_connections": "8.0.29",
+    "connection_sharing": "8.0.29",
+    "idle_timeout": "8.0.33",
+    "max_total_connections": "8.0.27",
+}
+
+# Seconds before the first bootstrap retry, doubling on each failed attempt
+# up to BOOTSTRAP_BACKOFF_MAX
+BOOTSTRAP_BACKOFF = 2
+BOOTSTRAP_BACKOFF_MAX = 30
+
+# Number of bootstraps kept in the unit's KV store
+BOOTSTRAP_HISTORY_SIZE = 10
+
+# Seconds a failover probe waits for a connection through the RW route
+PROBE_CONNECT_TIMEOUT = 5
+
+# Offsets from base-port of the routes created by the bootstrap
+ROUTE_PORT_OFFSETS = {"rw": 0, "ro": 1, "x_rw": 2, "x_ro": 3}
+
+# Number of handler and method timings kept in the unit's KV store
+HANDLER_TIMINGS_SIZE = 500
+
+# Kernel parameters for the connection churn of the router, which opens a
+# backend connection for every client connection
+SYSCTL_PROFILES = {
+    "moderate": {
+        "net.core.somaxconn": 1024,
+        "net.ipv4.ip_local_port_range": "15000 65000",
+        "net.ipv4.tcp_tw_reuse": 1,
+        "net.ipv4.tcp_fin_timeout": 30,
+    },
+    "high-churn": {
+        "net.core.somaxconn": 4096,
+        "net.ipv4.ip_local_port_range": "10240 65535",
+        "net.ipv4.tcp_tw_reuse": 1,
+        "net.ipv4.tcp_fin_timeout": 15,
+    },
+}
+
+
+def content_hash(data):
+    """Hash JSON serializable data.
+
+    :param data: Data to hash
+    :type data: Union[dict, list, str]
+    :returns: Hex digest of the data
+    :rtype: str
+    """
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True).encode("UTF-8")).hexdigest()
+
+
+def endpoint_accepting(family, address, timeout=1):
+    """Check whether an endpoint accepts connections.
+
+    :param family: Socket family, AF_INET, AF_INET6 or AF_UNIX
+    :type family: socket.AddressFamily
+    :param address: (host, port) tuple or path to a unix socket
+    :type address: Union[tuple, str]
+    :param timeout: Connection timeout in seconds
+    :type timeout: float
+    :returns: True if the connection succeeds
+    :rtype: bool
+    """
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            return False
+    return True
+
+
+def read_server_greeting(family, address, timeout=5):
+    """Read the MySQL classic protocol greeting sent on connect.
+
+    The connection is closed once the greeting is read, no authentication
+    takes place.
+
+    :param family: Socket family, AF_INET, AF_INET6 or AF_UNIX
+    :type family: socket.AddressFamily
+    :param address: (host, port) tuple or path to a unix socket
+    :type address: Union[tuple, str]
+    :param timeout: Socket timeout in seconds
+    :type timeout: float
+    :returns: Server version from the greeting or None on failure
+    :rtype: Union[str, None]
+    """
+    def _recv(sock, length):
+        data = b""
+        while len(data) < length:
+            chunk = sock.recv(length - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed by server")
+            data += chunk
+        return data
+
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+            # Packet header: 3 byte payload length and 1 byte sequence id
+            header = _recv(sock, 4)
+            payload = _recv(sock, int.from_bytes(header[:3], "little"))
+        except OSError as e:
+            ch_core.hookenv.log(
+                "No MySQL greeting from {}: {}".format(address, e), "DEBUG")
+            return None
+
+    # Protocol version 10 handshake, anything else i.e. 0xff is an error
+    if not payload or payload[0] != 10 or b"\0" not in payload[1:]:
+        ch_core.hookenv.log(
+            "Unexpected MySQL greeting from {}".format(address), "DEBUG")
+        return None
+    return payload[1:payload.index(b"\0", 1)].decode("UTF-8", "replace")
+
+
+def percentile(values, pct):
+    """Determine the nearest rank percentile of values.
+
+    :param values: Samples
+    :type values: list
+    :param pct: Percentile, i.e. 99
+    :type pct: float
+    :returns: Percentile or None if there are no samples
+    :rtype: Union[float, None]
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100.0 * len(values)) - 1)]
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Record the wall time of a handler or method in the unit's timeline.
+
+    Usable as a context manager or as a decorator. The most recent
+    HANDLER_TIMINGS_SIZE timings are kept in the unit's KV store.
+
+    :param name: Name of the handler or method
+    :type name: str
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        seconds = time.monotonic() - start
+        db_kv = ch_core.unitdata.kv()
+        timeline = list(db_kv.get(HANDLER_TIMINGS, []))
+        timeline.append({
+            "name": name,
+            "hook": ch_core.hookenv.hook_name(),
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "seconds": round(seconds, 6),
+        })
+        db_kv.set(HANDLER_TIMINGS, timeline[-HANDLER_TIMINGS_SIZE:])
+
+
+def parse_mapping(value):
+    """Parse space separated key=value pairs.
+
+    :param value: i.e. "nova_cell1=mysql-cell1 nova_cell2=mysql-cell2"
+    :type value: Union[str, None]
+    :returns: {key: value}
+    :rtype: dict
+    """
+    mapping = {}
+    for item in (value or "").split():
+        key, sep, _value = item.partition("=")
+        if not sep or not key or not _value:
+            ch_core.hookenv.log(
+                "Ignoring invalid key=value pair {}".format(item), "WARNING")
+            continue
+        mapping[key] = _value
+    return mapping
+
+
+def parse_cpu_set(cpu_set):
+    """Parse a CPU set as accepted by systemd CPUAffinity.
+
+    :param cpu_set: CPU indexes and ranges, i.e. "0-3,8 9"
+    :type cpu_set: str
+    :returns: Sorted CPU indexes
+    :rtype: list
+    :raises: ValueError
+    """
+    cpus = set()
+    for item in cpu_set.replace(",", " ").split():
+        first, _, last = item.partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        if first < 0 or last < first:
+            raise ValueError("Invalid CPU range {}".format(item))
+        cpus.update(range(first, last + 1))
+    return sorted(cpus)
+
 
 @charms_openstack.adapters.config_property
 def db_router_address(cls):
@@ -57,18 +314,28 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
     required_relations = ["db-router", "shared-db"]
     source_config_key = "source"
 
-    # FIXME Can we have a non-systemd services?
-    # Create a systemd shim?
-    # services = ["mysqlrouter"]
-    services = []
-    # TODO Post bootstrap config management and restarts
-    restart_map = {}
     # TODO Pick group owner
     group = "mysql"
 
     # For internal use with mysql.get_db_data
     _unprefixed = "MRUP"
 
+    # Per hook snapshot of decoded relation data
+    _relation_snapshot = None
+
+    # Number of assess_status calls coalesced into this hook's assessment
+    _assess_status_requests = 0
+
+    # Number of restart requests merged into this hook's restart
+    _restart_requests = 0
+
+    # {option: bool} support of the installed mysql-router package
+    _supported_options = None
+
+    # db-router application of the router instance operated on, None for
+    # the default cluster
+    _cluster = None
+
     @property
     def mysqlrouter_bin(self):
         """Determine the path to the mysqlrouter binary.
@@ -89,7 +356,226 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: db-router interface
         :rtype: MySQLRouterRequires object
         """
-        return reactive.relations.endpoint_from_flag("db-router.available")
+        if "db-router-endpoint" not in self.relation_snapshot:
+            endpoint = reactive.relations.endpoint_from_flag(
+                DB_ROUTER_AVAILABLE)
+            if endpoint is None:
+                return None
+            self.relation_snapshot["db-router-endpoint"] = endpoint
+        return self.relation_snapshot["db-router-endpoint"]
+
+    @property
+    def relation_snapshot(self):
+        """Per hook snapshot of relation data.
+
+        The charm instance is provided once per hook, so relation data read
+        and decoded through the snapshot is only fetched once per hook until
+        invalidate_relation_snapshot is called.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Snapshot of relation data
+        :rtype: dict
+        """
+        if self._relation_snapshot is None:
+            self._relation_snapshot = {}
+        return self._relation_snapshot
+
+    def invalidate_relation_snapshot(self):
+        """Invalidate the relation data snapshot.
+
+        Called whenever this unit sets relation data.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        self._relation_snapshot = None
+
+    @contextlib.contextmanager
+    def cluster_context(self, cluster):
+        """Operate on the router instance of a cluster.
+
+        Within the context the paths, ports, systemd unit, flags and
+        db-router relation data of the charm refer to the router instance
+        of cluster. None selects the default cluster, which keeps the single
+        cluster layout.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param cluster: db-router application of the cluster or None
+        :type cluster: Union[str, None]
+        """
+        previous, self._cluster = self._cluster, cluster
+        try:
+            yield
+        finally:
+            self._cluster = previous
+
+    @property
+    def db_router_relations(self):
+        """Get the db-router relations from the snapshot.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {application: relation} in relation id order
+        :rtype: dict
+        """
+        if "db-router-relations" not in self.relation_snapshot:
+            endpoint = reactive.relations.endpoint_from_name("db-router")
+            relations = sorted(
+                getattr(endpoint, "relations", None) or [],
+                key=lambda r: int(r.relation_id.split(":")[-1]))
+            # A relation whose last unit departed has no application
+            self.relation_snapshot["db-router-relations"] = {
+                relation.application_name: relation
+                for relation in relations if relation.application_name}
+        return self.relation_snapshot["db-router-relations"]
+
+    @property
+    def default_cluster(self):
+        """Determine the cluster of the default router instance.
+
+        The cluster the default instance was bootstrapped for stays the
+        default while related, so that relating or departing other clusters
+        does not reassign it. Until then it is the first related cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: db-router application or None if not related
+        :rtype: Union[str, None]
+        """
+        relations = self.db_router_relations
+        default = ch_core.unitdata.kv().get(DEFAULT_CLUSTER)
+        if default in relations:
+            return default
+        return next(iter(relations), None)
+
+    @property
+    def additional_clusters(self):
+        """Determine the clusters related besides the default cluster.
+
+        Each gets its own router instance.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: db-router applications
+        :rtype: list
+        """
+        default = self.default_cluster
+        return [cluster for cluster in self.db_router_relations
+                if cluster != default]
+
+    @property
+    def cluster_relation(self):
+        """Get the db-router relation of the current cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Relation or None if related to a single cluster
+        :rtype: Union[Relation, None]
+        """
+        relations = self.db_router_relations
+        if self._cluster is not None:
+            return relations.get(self._cluster)
+        if len(relations) < 2:
+            return None
+        return relations[self.default_cluster]
+
+    def prefix_cluster(self, prefix):
+        """Determine the cluster of a shared-db prefix.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param prefix: Prefix of the shared-db request
+        :type prefix: str
+        :returns: db-router application or None for the default cluster
+        :rtype: Union[str, None]
+        """
+        if prefix in self._unprefixed:
+            prefix = "unprefixed"
+        cluster = parse_mapping(self.options.cluster_prefixes).get(prefix)
+        if cluster in self.additional_clusters:
+            return cluster
+        return None
+
+    def scoped(self, name):
+        """Scope a flag or unit KV key to the current cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param name: Flag or key of the default cluster
+        :type name: str
+        :returns: Flag or key
+        :rtype: str
+        """
+        if self._cluster is None:
+            return name
+        return "{}.{}".format(name, self._cluster)
+
+    def db_router_data(self, key, prefix=None, db_router=None):
+        """Get decoded db-router relation data from the snapshot.
+
+        When related to several clusters the data is read from the relation
+        of the current cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param key: Name of the db-router interface accessor, i.e. password
+        :type key: str
+        :param prefix: Prefix of the data
+        :type prefix: Union[str, None]
+        :param db_router: DB-Router interface, defaults to db_router_endpoint
+        :type db_router: MySQLRouterRequires object
+        :returns: JSON decoded value or None if unset
+        :rtype: Union[str, list, None]
+        """
+        snapshot = self.relation_snapshot.setdefault("db-router", {})
+        if (self._cluster, key, prefix) not in snapshot:
+            relation = self.cluster_relation
+            if relation is not None:
+                value = relation.joined_units.received_raw.get(
+                    "{}_{}".format(prefix, key) if prefix else key)
+            else:
+                accessor = getattr(db_router or self.db_router_endpoint, key)
+                value = accessor(prefix=prefix) if prefix else accessor()
+            snapshot[(self._cluster, key, prefix)] = (
+                None if value is None else json.loads(value))
+        return snapshot[(self._cluster, key, prefix)]
+
+    def db_router_prefixes(self, db_router=None):
+        """Get the prefixes set on the db-router relation from the snapshot.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param db_router: DB-Router interface, defaults to db_router_endpoint
+        :type db_router: MySQLRouterRequires object
+        :returns: Prefixes
+        :rtype: list
+        """
+        if "db-router-prefixes" not in self.relation_snapshot:
+            self.relation_snapshot["db-router-prefixes"] = list(
+                (db_router or self.db_router_endpoint).get_prefixes())
+        return self.relation_snapshot["db-router-prefixes"]
+
+    def shared_db_data(self, shared_db):
+        """Get the parsed shared-db requests from the snapshot.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param shared_db: Shared-DB interface
+        :type shared_db: MySQLSharedProvides object
+        :returns: {prefix: {database, username, hostname}}
+        :rtype: dict
+        """
+        if "shared-db" not in self.relation_snapshot:
+            # We can use shared_db.all_joined_units.received as this is a
+            # subordinate and there is only one unit related.
+            self.relation_snapshot["shared-db"] = mysql.get_db_data(
+                dict(shared_db.all_joined_units.received),
+                unprefixed=self._unprefixed)
+        return self.relation_snapshot["shared-db"]
 
     @property
     def db_prefix(self):
@@ -125,8 +611,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: Password
         :rtype: str
         """
-        return json.loads(
-            self.db_router_endpoint.password(prefix=self.db_prefix))
+        return self.db_router_data("password", prefix=self.db_prefix)
 
     @property
     def db_router_address(self):
@@ -154,7 +639,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: Address
         :rtype: str
         """
-        return json.loads(self.db_router_endpoint.db_host())
+        return self.db_router_data("db_host")
 
     @property
     def shared_db_address(self):
@@ -179,249 +664,2256 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: Path to the directory
         :rtype: str
         """
-        return "/home/{}/mysqlrouter".format(self.options.system_user)
+        if self._cluster is None:
+            return "/home/{}/mysqlrouter".format(self.options.system_user)
+        return "/home/{}/mysqlrouter-{}".format(
+            self.options.system_user, self._cluster)
 
-    def install(self):
-        """Custom install function.
+    @property
+    def sockets_dir(self):
+        """Determine the directory of the router's unix sockets.
+
+        The bootstrap directory is only accessible by the system user, the
+        sockets live where principals running as other users reach them.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :side effect: Executes other functions
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: Path to the directory
+        :rtype: str
         """
-        # TODO: charms.openstack should probably do this
-        # Need to configure source first
-        self.configure_source()
-        super().install()
+        return os.path.join(SOCKETS_DIR, self.mysqlrouter_service)
 
-    def get_db_helper(self):
-        """Get an instance of the MySQLDB8Helper class.
+    @property
+    def mysqlrouter_service(self):
+        """Determine the name of the mysqlrouter service.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :returns: Instance of MySQLDB8Helper class
-        :rtype: MySQLDB8Helper instance
+        :returns: Service name
+        :rtype: str
         """
-        db_helper = mysql.MySQL8Helper(
-            rpasswdf_template="/var/lib/charm/{}/mysql.passwd"
-                              .format(ch_core.hookenv.service_name()),
-            upasswdf_template="/var/lib/charm/{}/mysql-{{}}.passwd"
-                              .format(ch_core.hookenv.service_name()),
-            user=self.db_router_user,
-            password=self.db_router_password,
-            host=self.cluster_address)
-        return db_helper
-
-    def states_to_check(self, required_relations=None):
-        """Custom states to check function.
+        if self._cluster is None:
+            return MYSQLROUTER_SERVICE
+        return "{}-{}".format(MYSQLROUTER_SERVICE, self._cluster)
 
-        Construct a custom set of connected and available states for each
-        of the relations passed, along with error messages and new status
-        conditions.
+    @property
+    def base_port(self):
+        """Determine the first port of the router instance's routes.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :param required_relations: List of relations which overrides
-                                   self.relations
-        :type required_relations: list of strings
-        :returns: {relation: [(state, err_status, err_msg), (...),]}
-        :rtype: dict
+        :returns: Port or None if not configured or invalid for the cluster
+        :rtype: Union[int, None]
         """
-        states_to_check = super().states_to_check(required_relations)
-        states_to_check["charm"] = [
-            (MYSQL_ROUTER_BOOTSTRAPPED,
-             "waiting",
-             "MySQL Router not yet bootstrapped"),
-            (MYSQL_ROUTER_STARTED,
-             "waiting",
-             "MySQL Router not yet started"),
-            (DB_ROUTER_PROXY_AVAILABLE,
-             "waiting",
-             "Waiting for proxied DB creation from cluster")]
+        if self._cluster is None:
+            return self.options.base_port
+        port = parse_mapping(self.options.cluster_base_ports).get(
+            self._cluster)
+        try:
+            return int(port)
+        except (TypeError, ValueError):
+            return None
 
-        return states_to_check
+    @property
+    def mysqlrouter_conf(self):
+        """Determine the path to the bootstrapped mysqlrouter.conf file.
 
-    def check_mysql_connection(self):
-        """Check if an instance of MySQL is accessible.
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Path to the configuration file
+        :rtype: str
+        """
+        return os.path.join(self.mysqlrouter_dir, MYSQLROUTER_CNF)
 
-        Attempt a connection to the given instance of mysql to determine if it
-        is running and accessible.
+    @property
+    def services(self):
+        """Determine the services managed by the charm.
 
-        :side effect: Uses get_db_helper to execute a connection to the DB.
-        :returns: True if connection succeeds or False if not
-        :rtype: boolean
+        The mysql-router package's own mysqlrouter service uses
+        /etc/mysqlrouter, the charm runs the bootstrapped router with its own
+        systemd unit.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Service names
+        :rtype: list
         """
-        m_helper = self.get_db_helper()
-        try:
-            m_helper.connect(self.db_router_user,
-                             self.db_router_password,
-                             self.shared_db_address)
-            return True
-        except mysql.MySQLdb._exceptions.OperationalError:
-            ch_core.hookenv.log("Could not connect to db", "DEBUG")
-            return False
+        services = [MYSQLROUTER_SERVICE]
+        services.extend(
+            "{}-{}".format(MYSQLROUTER_SERVICE, cluster)
+            for cluster in ch_core.unitdata.kv().get(CLUSTER_ROUTERS) or [])
+        if self.options.metrics_exporter:
+            services.append(EXPORTER_SERVICE)
+        return services
 
-    def custom_assess_status_check(self):
-        """Custom assess status check.
+    @property
+    def systemd_unit_file(self):
+        """Determine the path to the mysqlrouter systemd unit file.
 
-        Custom assess status check that validates connectivity to this unit's
-        MySQL instance.
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Path to the unit file
+        :rtype: str
+        """
+        return os.path.join(
+            SYSTEMD_UNIT_DIR, "{}.service".format(self.mysqlrouter_service))
 
-        Returns tuple of (sate, message), if there is a problem to report to
-        status output, or (None, None) if all is well.
+    @property
+    def exporter_unit_file(self):
+        """Determine the path to the metrics exporter systemd unit file.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :returns: Either (state, message) or (None, None)
-        :rtype: Union[tuple(str, str), tuple(None, None)]
+        :returns: Path to the unit file
+        :rtype: str
         """
-        # Start with default checks
-        for f in [self.check_if_paused,
-                  self.check_interfaces,
-                  self.check_mandatory_config]:
-            state, message = f()
-            if state is not None:
-                ch_core.hookenv.status_set(state, message)
-                return state, message
+        return os.path.join(
+            SYSTEMD_UNIT_DIR, "{}.service".format(EXPORTER_SERVICE))
 
-        # We should not get here until there is a connection to the
-        # cluster (db-router available)
-        if not self.check_mysql_connection():
-            return "blocked", "Failed to connect to MySQL"
+    @property
+    def exporter_conf(self):
+        """Determine the path to the metrics exporter configuration.
 
-        return None, None
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Path to the configuration file
+        :rtype: str
+        """
+        return os.path.join(self.mysqlrouter_dir, EXPORTER_CONF)
 
-    def bootstrap_mysqlrouter(self):
-        """Bootstrap MySQL Router.
+    @property
+    def rest_api_enabled(self):
+        """Determine whether the REST API is enabled.
 
-        Execute the mysqlrouter bootstrap command. MySQL Router bootstraps into
-        a working directory information it gathers from the MySQL InnoDB
-        Cluster about the cluster's schema. Configuration and working files
-        live in self.mysqlrouter_bin.
+        The metrics exporter is built on the REST API and enables it. Only
+        the router instance of the default cluster serves the REST API.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :side effect: Executes the mysqlrouter bootstrap command
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: True if enabled
+        :rtype: bool
         """
-        cmd = [self.mysqlrouter_bin,
-               "--user", self.options.system_user,
-               "--bootstrap",
-               "{}:{}@{}".format(self.db_router_user,
-                                 self.db_router_password,
-                                 self.cluster_address),
-               "--directory", self.mysqlrouter_dir,
-               "--conf-use-sockets",
-               "--conf-base-port", str(self.options.base_port)]
-        try:
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-            ch_core.hookenv.log(output, "DEBUG")
-        except subprocess.CalledProcessError as e:
-            ch_core.hookenv.log(
-                "Failed to bootstrap mysqlrouter: {}"
-                .format(e.output.decode("UTF-8")), "ERROR")
-            return
-        reactive.flags.set_flag(MYSQL_ROUTER_BOOTSTRAPPED)
+        if self._cluster is not None:
+            return False
+        return bool(self.options.rest_api or self.options.metrics_exporter)
 
-    def start_mysqlrouter(self):
-        """Start MySQL Router.
+    @property
+    def restart_map(self):
+        """Map of configuration files to the services they affect.
 
-        Start up the mysqlrouter daemon via the start script.
+        The mysqlrouter.conf file is generated by the bootstrap rather than
+        rendered from a template. Post bootstrap changes are applied by
+        update_config_parameters.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :side effect: Executes the mysqlrouter start script
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: {file: [service, ...]}
+        :rtype: dict
         """
-        cmd = ["{}/start.sh".format(self.mysqlrouter_dir)]
-        try:
-            proc = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT, bufsize=1,
-                universal_newlines=True)
-            proc.wait()
-            ch_core.hookenv.log("MySQL router started", "DEBUG")
-        except subprocess.CalledProcessError as e:
-            ch_core.hookenv.log(
-                "Failed to start mysqlrouter: {}"
-                .format(e.output.decode("UTF-8")), "ERROR")
-            return
-        reactive.flags.set_flag(MYSQL_ROUTER_STARTED)
+        restart_map = {
+            self.mysqlrouter_conf: [self.mysqlrouter_service],
+            self.systemd_unit_file: [self.mysqlrouter_service],
+        }
+        if self.options.metrics_exporter:
+            for path in (EXPORTER_BIN, self.exporter_conf,
+                         self.exporter_unit_file):
+                restart_map[path] = [EXPORTER_SERVICE]
+        return restart_map
 
-    def stop_mysqlrouter(self):
-        """Stop MySQL Router.
+    @property
+    def config_parameters(self):
+        """Determine the charm managed mysqlrouter.conf parameters.
 
-        Stop the mysqlrouter daemon via the stop script.
+        Keys are the section names, or section types such as "routing" which
+        match every "routing:<name>" section, of the bootstrapped
+        configuration file.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :side effect: Executes the mysqlrouter stop script
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: {section: {parameter: value}}
+        :rtype: dict
         """
-        cmd = ["{}/stop.sh".format(self.mysqlrouter_dir)]
-        try:
-            proc = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT, bufsize=1,
-                universal_newlines=True)
-            proc.wait()
-            ch_core.hookenv.log("MySQL router stopped", "DEBUG")
-        except subprocess.CalledProcessError as e:
-            ch_core.hookenv.log(
-                "Failed to start mysqlrouter: {}"
-                .format(e.output.decode("UTF-8")), "ERROR")
-            return
-        reactive.flags.clear_flag(MYSQL_ROUTER_STARTED)
+        parameters = {
+            "routing": {
+                "max_connections": self.options.max_connections,
+                "max_connect_errors": self.options.max_connect_errors,
+                "connect_timeout": self.options.connect_timeout,
+                "client_connect_timeout": (
+                    self.options.client_connect_timeout),
+            },
+            "metadata_cache": self.metadata_cache_parameters,
+        }
+        # Newer routers also cap the connections of all routes together
+        if self.supports_option("max_total_connections"):
+            parameters[configparser.DEFAULTSECT] = {
+                "max_total_connections": self.max_total_connections}
+        connection_sharing = self.supports_option("connection_sharing")
+        for name, route in self.routes.items():
+            route_parameters = {}
+            # Moves the sockets of bootstraps predating sockets_dir
+            if route["socket"]:
+                route_parameters["socket"] = os.path.join(
+                    self.sockets_dir, os.path.basename(route["socket"]))
+            # Connection sharing is only available on classic protocol routes
+            if connection_sharing and route["protocol"] == "classic":
+                route_parameters["connection_sharing"] = int(
+                    bool(self.options.connection_sharing))
+            if route_parameters:
+                parameters["routing:{}".format(name)] = dict(
+                    parameters["routing"], **route_parameters)
+        return parameters
 
-    def restart_mysqlrouter(self):
-        """Restart MySQL Router.
+    @property
+    def max_total_connections(self):
+        """Determine the cap on client connections of all routes together.
 
-        Restart the mysqlrouter daemon by calling self.stop_mysqlrouter and
-        self.start_mysqlrouter.
+        Defaults to max-connections for each route so that the total does
+        not limit the routes below their own cap.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :side effect: Executes other functions
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: Number of connections
+        :rtype: int
         """
-        self.stop_mysqlrouter()
-        self.start_mysqlrouter()
+        if self.options.max_total_connections:
+            return self.options.max_total_connections
+        return self.options.max_connections * max(1, len(self.routes))
 
-    def proxy_db_and_user_requests(
-            self, receiving_interface, sending_interface):
-        """Proxy database and user requests to the MySQL InnoDB Cluster.
+    @property
+    def metadata_cache_parameters(self):
+        """Determine the charm managed metadata_cache parameters.
 
-        Take requests from the shared-db relation and proxy them to the
-        db-router relation using their respective endpoints.
+        Unset TTLs restore their bootstrapped value, as do both TTLs while
+        the metadata cache options are invalid as MySQL Router would fail to
+        start.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :param receiving_interface: Shared-DB interface
-        :type receiving_interface: MySQLSharedProvides object
-        :param sending_interface: DB-Router interface
-        :type sending_interface: MySQLRouterRequires object
-        :side effect: Executes sending interface's set function
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: {parameter: value}
+        :rtype: dict
+        """
+        ttl = self.options.metadata_ttl
+        auth_cache_ttl = self.options.metadata_auth_cache_ttl
+        if self.check_metadata_cache_config():
+            ttl = auth_cache_ttl = None
+        parameters = {"ttl": ttl}
+        if self.supports_option("auth_cache_ttl"):
+            parameters["auth_cache_ttl"] = auth_cache_ttl
+        if self.supports_option("use_gr_notifications"):
+            parameters["use_gr_notifications"] = int(
+                bool(self.options.gr_notifications))
+        return parameters
+
+    def check_metadata_cache_config(self):
+        """Validate the metadata cache options.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Error message or None if valid
+        :rtype: Union[str, None]
+        """
+        ttl = self.options.metadata_ttl
+        auth_cache_ttl = self.options.metadata_auth_cache_ttl
+        if ttl is not None and ttl < 0:
+            return "metadata-ttl must not be negative"
+        if auth_cache_ttl is None or auth_cache_ttl == -1:
+            return None
+        if auth_cache_ttl < (ttl or 0):
+            return ("metadata-auth-cache-ttl must be -1 or at least "
+                    "metadata-ttl")
+        return None
+
+    def check_sysctl_config(self):
+        """Validate the sysctl-profile and sysctl options.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Error message or None if valid
+        :rtype: Union[str, None]
+        """
+        profile = self.options.sysctl_profile
+        if profile and profile not in SYSCTL_PROFILES:
+            return "sysctl-profile must be one of {}".format(
+                ", ".join(sorted(SYSCTL_PROFILES)))
+        try:
+            overrides = yaml.safe_load(self.options.sysctl or "")
+        except yaml.YAMLError:
+            return "sysctl must be a YAML dictionary"
+        if overrides is not None and not isinstance(overrides, dict):
+            return "sysctl must be a YAML dictionary"
+        return None
+
+    def check_cluster_config(self):
+        """Validate the cluster-base-ports option.
+
+        Each additional cluster needs a base port and the ports of the router
+        instances must not overlap.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Error message or None if valid
+        :rtype: Union[str, None]
+        """
+        clusters = self.additional_clusters
+        if not clusters:
+            return None
+        base_ports = parse_mapping(self.options.cluster_base_ports)
+        missing = [cluster for cluster in clusters
+                   if cluster not in base_ports]
+        if missing:
+            return "cluster-base-ports has no entry for {}".format(
+                ", ".join(missing))
+        ports = {"base-port": self.options.base_port}
+        for cluster in clusters:
+            try:
+                ports[cluster] = int(base_ports[cluster])
+            except ValueError:
+                return "cluster-base-ports of {} is not a port".format(
+                    cluster)
+        width = len(ROUTE_PORT_OFFSETS)
+        names = sorted(ports, key=ports.get)
+        for lower, upper in zip(names, names[1:]):
+            if ports[upper] < ports[lower] + width:
+                return "Router ports of {} and {} overlap".format(
+                    lower, upper)
+        return None
+
+    @property
+    def sysctl_settings(self):
+        """Determine the charm managed kernel parameters.
+
+        The parameters of sysctl-profile are updated with those of the sysctl
+        option.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {parameter: value}, empty if not configured or invalid
+        :rtype: dict
+        """
+        if self.check_sysctl_config():
+            return {}
+        settings = dict(SYSCTL_PROFILES.get(self.options.sysctl_profile, {}))
+        settings.update(yaml.safe_load(self.options.sysctl or "") or {})
+        return settings
+
+    def supports_option(self, option):
+        """Determine if the installed MySQL Router supports an option.
+
+        The version of release_pkg is compared with ROUTER_OPTION_VERSIONS
+        once per hook.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param option: Option name, i.e. connection_sharing
+        :type option: str
+        :returns: True if supported
+        :rtype: bool
+        """
+        if self._supported_options is None:
+            self._supported_options = {}
+        if option not in self._supported_options:
+            self._supported_options[option] = ch_core.host.cmp_pkgrevno(
+                self.release_pkg, ROUTER_OPTION_VERSIONS[option]) >= 0
+        return self._supported_options[option]
+
+    @property
+    def connection_pool(self):
+        """Determine the charm managed connection_pool section.
+
+        Options the installed MySQL Router does not support are not
+        rendered. Unset options restore their bootstrapped value.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {parameter: value} or None to leave the section untouched
+        :rtype: Union[dict, None]
+        """
+        if not self.supports_option("max_idle_server_connections"):
+            requested = [self.options.connection_pool_size is not None,
+                         self.options.connection_sharing]
+            if any(requested):
+                ch_core.hookenv.log(
+                    "Connection pooling requires mysql-router {} or later"
+                    .format(ROUTER_OPTION_VERSIONS[
+                        "max_idle_server_connections"]), "WARNING")
+            return None
+        pool = {
+            "max_idle_server_connections": self.options.connection_pool_size,
+            "idle_timeout": None,
+        }
+        if self.options.connection_pool_idle_timeout is not None:
+            if self.supports_option("idle_timeout"):
+                pool["idle_timeout"] = (
+                    self.options.connection_pool_idle_timeout)
+            else:
+                ch_core.hookenv.log(
+                    "connection-pool-idle-timeout requires mysql-router {} "
+                    "or later".format(ROUTER_OPTION_VERSIONS["idle_timeout"]),
+                    "WARNING")
+        return pool
+
+    @property
+    def rest_api_passwd_file(self):
+        """Determine the path to the REST API credentials file.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Path to the file
+        :rtype: str
+        """
+        return os.path.join(self.mysqlrouter_dir, REST_API_PASSWD)
+
+    @property
+    def config_sections(self):
+        """Determine the charm managed mysqlrouter.conf sections.
+
+        Sections with a value of None are removed from the configuration,
+        parameters with a value of None are restored as bootstrapped.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {section: Union[{parameter: value}, None]}
+        :rtype: dict
+        """
+        rest_api = {
+            "http_server": {
+                "bind_address": "127.0.0.1",
+                "port": self.options.rest_api_port,
+                "ssl": 0,
+            },
+            "http_auth_realm:{}".format(REST_API_REALM): {
+                "backend": REST_API_BACKEND,
+                "method": "basic",
+                "name": "charm",
+            },
+            "http_auth_backend:{}".format(REST_API_BACKEND): {
+                "backend": "file",
+                "filename": self.rest_api_passwd_file,
+            },
+            "rest_api": {},
+            "rest_router": {"require_realm": REST_API_REALM},
+            "rest_routing": {"require_realm": REST_API_REALM},
+            "rest_metadata_cache": {"require_realm": REST_API_REALM},
+        }
+        if not self.rest_api_enabled:
+            sections = {section: None for section in rest_api}
+        else:
+            sections = rest_api
+        connection_pool = self.connection_pool
+        if connection_pool is not None:
+            sections["connection_pool"] = connection_pool
+        # None restores the bootstrapped [io], one thread per CPU
+        sections["io"] = {"threads": self.io_threads}
+        return sections
+
+    @property
+    def io_threads(self):
+        """Determine the number of IO threads of MySQL Router.
+
+        Defaults to the size of service-cpu-affinity when io-threads is not
+        set, as MySQL Router otherwise starts one thread per CPU of the host.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Number of threads or None to restore [io] as bootstrapped
+        :rtype: Union[int, None]
+        """
+        threads = self.options.io_threads
+        if threads is None and self.options.service_cpu_affinity:
+            try:
+                threads = len(parse_cpu_set(self.options.service_cpu_affinity))
+            except ValueError as e:
+                ch_core.hookenv.log(
+                    "Invalid service-cpu-affinity: {}".format(e), "ERROR")
+        if threads is None:
+            return None
+        if not self.supports_option("threads"):
+            ch_core.hookenv.log(
+                "io-threads requires mysql-router {} or later"
+                .format(ROUTER_OPTION_VERSIONS["threads"]), "WARNING")
+            return None
+        return threads
+
+    @timed("MySQLRouterCharm.install")
+    def install(self):
+        """Custom install function.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Executes other functions
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        # TODO: charms.openstack should probably do this
+        # Need to configure source first
+        self.configure_source()
+        super().install()
+        self.configure_sysctl()
+
+    @timed("MySQLRouterCharm.upgrade_charm")
+    def upgrade_charm(self):
+        """Custom upgrade charm function.
+
+        A router started by start.sh holds the route ports the systemd unit
+        needs, so it is stopped and the unit started in its place.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: May stop MySQL Router
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        super().upgrade_charm()
+        if self.stop_legacy_mysqlrouter():
+            # Started again by the start_mysqlrouter handler, which waits
+            # until the unit's routes accept connections
+            self.stop_mysqlrouter()
+
+    def stop_legacy_mysqlrouter(self, timeout=30):
+        """Stop a router started by the bootstrapped start.sh.
+
+        The router is found from the pid file start.sh wrote, as stop.sh
+        does, and waited on until it exited.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param timeout: Seconds to wait for the router to exit
+        :type timeout: int
+        :side effect: Signals the router and removes its pid file
+        :returns: True if a pid file was found
+        :rtype: bool
+        """
+        pid_file = os.path.join(self.mysqlrouter_dir, MYSQLROUTER_PID)
+        try:
+            with open(pid_file) as f:
+                pid = int(f.read().strip())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            ch_core.hookenv.log(
+                "Ignoring unreadable {}: {}".format(pid_file, e), "WARNING")
+            os.remove(pid_file)
+            return True
+        ch_core.hookenv.log(
+            "Stopping MySQL router {} started by start.sh".format(pid),
+            "INFO")
+        deadline = time.time() + timeout
+        try:
+            os.kill(pid, signal.SIGTERM)
+            while time.time() < deadline:
+                os.kill(pid, 0)
+                time.sleep(1)
+            ch_core.hookenv.log(
+                "MySQL router {} did not exit within {}s"
+                .format(pid, timeout), "WARNING")
+        except ProcessLookupError:
+            pass
+        os.remove(pid_file)
+        return True
+
+    def configure_sysctl(self):
+        """Apply the charm managed kernel parameters.
+
+        The parameters are written to SYSCTL_CONF so that they persist across
+        reboots and loaded with sysctl. Their effective values are logged, as
+        some can not be changed from within a container.
+
+        SYSCTL_CONF is left as is while the options are invalid and only
+        removed when neither sets a parameter.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Writes SYSCTL_CONF and sets kernel parameters
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        message = self.check_sysctl_config()
+        if message:
+            # Keep the tuning applied so far until the options are fixed
+            ch_core.hookenv.log(
+                "Not updating {}: {}".format(SYSCTL_CONF, message), "ERROR")
+            return
+        settings = self.sysctl_settings
+        if not settings:
+            if os.path.exists(SYSCTL_CONF):
+                os.remove(SYSCTL_CONF)
+                ch_core.hookenv.log(
+                    "Removed {}, kernel parameters keep their values until "
+                    "reboot".format(SYSCTL_CONF), "WARNING")
+            return
+        ch_core.host.write_file(
+            SYSCTL_CONF,
+            "".join("{}={}\n".format(key, value)
+                    for key, value in sorted(settings.items())),
+            perms=0o644)
+        try:
+            subprocess.check_output(
+                ["sysctl", "-p", SYSCTL_CONF], stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            ch_core.hookenv.log(
+                "Failed to apply {}: {}".format(
+                    SYSCTL_CONF, e.output.decode("UTF-8")), "ERROR")
+        effective = self.effective_sysctl(settings)
+        for key in sorted(settings):
+            ch_core.hookenv.log(
+                "sysctl {}: configured {}, effective {}"
+                .format(key, settings[key], effective[key]), "INFO")
+
+    def effective_sysctl(self, keys):
+        """Read the effective values of kernel parameters.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param keys: Parameters, i.e. net.core.somaxconn
+        :type keys: Iterable[str]
+        :returns: {parameter: value or None if it can not be read}
+        :rtype: dict
+        """
+        effective = {}
+        for key in keys:
+            try:
+                with open(os.path.join(PROC_SYS, *key.split("."))) as f:
+                    effective[key] = " ".join(f.read().split())
+            except OSError:
+                effective[key] = None
+        return effective
+
+    def sysctl_status(self):
+        """Describe the effective values of the charm managed parameters.
+
+        Values differing from the configured ones are marked.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: i.e. "sysctl: somaxconn=4096, tcp_tw_reuse=0 (not 1)"
+        :rtype: Union[str, None]
+        """
+        settings = self.sysctl_settings
+        if not settings:
+            return None
+        effective = self.effective_sysctl(settings)
+        values = []
+        for key in sorted(settings):
+            value = "{}={}".format(key.split(".")[-1], effective[key])
+            if effective[key] != " ".join(str(settings[key]).split()):
+                value += " (not {})".format(settings[key])
+            values.append(value)
+        return "sysctl: {}".format(", ".join(values))
+
+    def get_db_helper(self):
+        """Get an instance of the MySQLDB8Helper class.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Instance of MySQLDB8Helper class
+        :rtype: MySQLDB8Helper instance
+        """
+        db_helper = mysql.MySQL8Helper(
+            rpasswdf_template="/var/lib/charm/{}/mysql.passwd"
+                              .format(ch_core.hookenv.service_name()),
+            upasswdf_template="/var/lib/charm/{}/mysql-{{}}.passwd"
+                              .format(ch_core.hookenv.service_name()),
+            user=self.db_router_user,
+            password=self.db_router_password,
+            host=self.cluster_address)
+        return db_helper
+
+    def states_to_check(self, required_relations=None):
+        """Custom states to check function.
+
+        Construct a custom set of connected and available states for each
+        of the relations passed, along with error messages and new status
+        conditions.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param required_relations: List of relations which overrides
+                                   self.relations
+        :type required_relations: list of strings
+        :returns: {relation: [(state, err_status, err_msg), (...),]}
+        :rtype: dict
+        """
+        states_to_check = super().states_to_check(required_relations)
+        states_to_check["charm"] = [
+            (MYSQL_ROUTER_BOOTSTRAPPED,
+             "waiting",
+             "MySQL Router not yet bootstrapped"),
+            (MYSQL_ROUTER_STARTED,
+             "waiting",
+             "MySQL Router not yet started"),
+            (DB_ROUTER_PROXY_AVAILABLE,
+             "waiting",
+             "Waiting for proxied DB creation from cluster")]
+
+        return states_to_check
+
+    def check_mysql_connection(self):
+        """Check if an instance of MySQL is accessible.
+
+        Attempt a connection to the given instance of mysql to determine if it
+        is running and accessible.
+
+        :side effect: Uses get_db_helper to execute a connection to the DB.
+        :returns: True if connection succeeds or False if not
+        :rtype: boolean
+        """
+        m_helper = self.get_db_helper()
+        try:
+            m_helper.connect(self.db_router_user,
+                             self.db_router_password,
+                             self.shared_db_address)
+            return True
+        except mysql.MySQLdb._exceptions.OperationalError:
+            ch_core.hookenv.log("Could not connect to db", "DEBUG")
+            return False
+
+    def check_mysql_greeting(self):
+        """Check the RW and RO routes return a MySQL server greeting.
+
+        Confirms the routing path to the cluster without authenticating a
+        backend session. The unix socket of each route is preferred as MySQL
+        Router counts a client that disconnects before authenticating as a
+        connection error against its host when connecting over TCP.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True if every classic protocol route returns a greeting
+        :rtype: boolean
+        """
+        endpoints = [self.greeting_endpoint(route)
+                     for route in self.routes.values()
+                     if route["protocol"] == "classic"]
+        endpoints = [endpoint for endpoint in endpoints if endpoint]
+        if not endpoints:
+            ch_core.hookenv.log("No MySQL Router routes to check", "DEBUG")
+            return False
+        return all(read_server_greeting(*endpoint) for endpoint in endpoints)
+
+    def greeting_endpoint(self, route):
+        """Determine the endpoint used to read the greeting of a route.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param route: Route as returned by routes
+        :type route: dict
+        :returns: (family, address) or None if the route has no endpoint
+        :rtype: Union[tuple, None]
+        """
+        if route["socket"]:
+            return (socket.AF_UNIX, route["socket"])
+        if route["bind_port"]:
+            return (socket.AF_INET,
+                    (self.shared_db_address, route["bind_port"]))
+        return None
+
+    def check_router_health(self):
+        """Check MySQL Router health using the configured connection-check.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True if healthy
+        :rtype: boolean
+        """
+        if self.options.connection_check == "login":
+            return self.check_mysql_connection()
+        if self.options.connection_check == "rest" and self.rest_api_enabled:
+            return self.check_rest_api_health()
+        return self.check_mysql_greeting()
+
+    def check_mysql_connection_cached(self):
+        """Check if MySQL is accessible, caching the result.
+
+        The result of check_router_health is cached in the unit's KV store
+        for connection-check-ttl seconds. Failures are cached for
+        CONNECTION_CHECK_BACKOFF seconds, doubling on each consecutive
+        failure up to connection-check-ttl.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True if connection succeeds or False if not
+        :rtype: boolean
+        """
+        db_kv = ch_core.unitdata.kv()
+        cached = db_kv.get(CONNECTION_CHECK)
+        now = time.time()
+        if cached and now < cached["expires"]:
+            return cached["result"]
+
+        result = self.check_router_health()
+        ttl = self.options.connection_check_ttl
+        if result:
+            failures = 0
+        else:
+            failures = (cached or {}).get("failures", 0) + 1
+            ttl = min(ttl, CONNECTION_CHECK_BACKOFF * 2 ** (failures - 1))
+        db_kv.set(CONNECTION_CHECK, {
+            "result": result,
+            "failures": failures,
+            "expires": now + ttl})
+        return result
+
+    def invalidate_connection_check(self):
+        """Invalidate the cached connection check.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        ch_core.unitdata.kv().unset(CONNECTION_CHECK)
+
+    def assess_status(self):
+        """Assess status once at the end of the hook.
+
+        Every handler calls assess_status. The first call in a hook registers
+        the assessment to run when the hook exits and later calls are
+        coalesced into it. Actions assess status immediately as no exit
+        callbacks are run for them.
+
+        OpenStackCharm.assess_status is not used as it defers to an exit
+        callback itself, which is dropped when registered while the exit
+        callbacks run.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Registers an atexit callback
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        if ch_core.hookenv.action_name():
+            self._assess_status_now()
+            return
+        self._assess_status_requests += 1
+        if self._assess_status_requests == 1:
+            ch_core.hookenv.atexit(self._deferred_assess_status)
+
+    def _deferred_assess_status(self):
+        """Run the assessment deferred by assess_status.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Sets workload status
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        # Exit callbacks run last in first, restart before assessing
+        self._deferred_restart()
+        ch_core.hookenv.log(
+            "Assessing status once for {} requests, {} coalesced"
+            .format(self._assess_status_requests,
+                    self._assess_status_requests - 1), "DEBUG")
+        self._assess_status_requests = 0
+        self._assess_status_now()
+
+    def _assess_status_now(self):
+        """Assess status without deferring it.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Sets workload status and application version
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        ch_core.hookenv.application_version_set(self.application_version)
+        self._assess_status()
+        self.add_status_details()
+
+    def add_status_details(self):
+        """Add the cluster topology and kernel tuning to an active status.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Sets workload status
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        state, message = ch_core.hookenv.status_get()
+        if state != "active":
+            return
+        details = [detail for detail in (
+            self.topology_status(), self.sysctl_status()) if detail]
+        if details:
+            ch_core.hookenv.status_set(
+                "active", ", ".join([message] + details))
+
+    def topology_status(self):
+        """Describe the cluster topology as seen by MySQL Router.
+
+        Members are read from the router's state file rather than from the
+        cluster. The primary is the destination of the RW route, which is
+        only available from the REST API.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: i.e. "cluster members: 3, primary: 10.5.0.10:3306"
+        :rtype: Union[str, None]
+        """
+        members = self.cluster_members()
+        if not members:
+            return None
+        message = "cluster members: {}".format(len(members))
+        primary = self.rw_destination()
+        if primary:
+            message += ", primary: {}".format(primary)
+        return message
+
+    def cluster_members(self):
+        """Determine the cluster members known to MySQL Router.
+
+        The parsed state file is cached in the unit's KV store until its
+        modification time changes.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Member URIs, i.e. mysql://10.5.0.10:3306, or None if not
+                  bootstrapped
+        :rtype: Union[list, None]
+        """
+        mysqlrouter_config = self.read_mysqlrouter_conf()
+        metadata_caches = [
+            section for section in mysqlrouter_config.sections()
+            if section.split(":")[0] == "metadata_cache"]
+        if not metadata_caches:
+            return None
+        metadata_cache = mysqlrouter_config[metadata_caches[0]]
+        state_file = self.state_file(metadata_cache)
+        try:
+            mtime = os.path.getmtime(state_file)
+        except OSError:
+            return self.metadata_servers(metadata_cache)
+
+        db_kv = ch_core.unitdata.kv()
+        cached = db_kv.get(CLUSTER_MEMBERS)
+        if cached and [cached["path"], cached["mtime"]] == [state_file, mtime]:
+            return cached["members"]
+        members = self.metadata_servers(metadata_cache)
+        db_kv.set(CLUSTER_MEMBERS, {
+            "path": state_file, "mtime": mtime, "members": members})
+        return members
+
+    def rw_destination(self):
+        """Determine the destination of the classic protocol RW route.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: address:port or None if unknown
+        :rtype: Union[str, None]
+        """
+        if not self.rest_api_enabled:
+            return None
+        for name, route in sorted(self.routes.items()):
+            if route["protocol"] != "classic" or not name.endswith("_rw"):
+                continue
+            destinations = self.rest_api_get(
+                "routes/{}/destinations".format(name))
+            items = (destinations or {}).get("items") or []
+            if items:
+                return "{}:{}".format(items[0]["address"], items[0]["port"])
+        return None
+
+    @timed("MySQLRouterCharm.custom_assess_status_check")
+    def custom_assess_status_check(self):
+        """Custom assess status check.
+
+        Custom assess status check that validates connectivity to this unit's
+        MySQL instance.
+
+        Returns tuple of (sate, message), if there is a problem to report to
+        status output, or (None, None) if all is well.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Either (state, message) or (None, None)
+        :rtype: Union[tuple(str, str), tuple(None, None)]
+        """
+        # Start with default checks
+        for f in [self.check_if_paused,
+                  self.check_interfaces,
+                  self.check_mandatory_config]:
+            state, message = f()
+            if state is not None:
+                ch_core.hookenv.status_set(state, message)
+                return state, message
+
+        for check in (self.check_metadata_cache_config,
+                      self.check_sysctl_config,
+                      self.check_cluster_config):
+            message = check()
+            if message:
+                return "blocked", message
+
+        # We should not get here until there is a connection to the
+        # cluster (db-router available)
+        if not self.check_mysql_connection_cached():
+            return "blocked", "Failed to connect to MySQL"
+
+        return None, None
+
+    @timed("MySQLRouterCharm.bootstrap_mysqlrouter")
+    def bootstrap_mysqlrouter(self):
+        """Bootstrap MySQL Router.
+
+        Execute the mysqlrouter bootstrap command. MySQL Router bootstraps into
+        a working directory information it gathers from the MySQL InnoDB
+        Cluster about the cluster's schema. Configuration and working files
+        live in self.mysqlrouter_dir.
+
+        An existing bootstrap of the same cluster is reused, as bootstrapping
+        again registers the router with the cluster once more. The bootstrap
+        is forced only when the existing one is for another cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Executes the mysqlrouter bootstrap command
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        ch_core.host.mkdir(
+            self.sockets_dir, owner=self.options.system_user, perms=0o755)
+        existing = self.existing_bootstrap()
+        if existing == "reusable":
+            ch_core.hookenv.log(
+                "Reusing the existing bootstrap in {}"
+                .format(self.mysqlrouter_dir), "INFO")
+        else:
+            cmd = [self.mysqlrouter_bin,
+                   "--user", self.options.system_user,
+                   "--bootstrap",
+                   "{}:{}@{}".format(self.db_router_user,
+                                     self.db_router_password,
+                                     self.cluster_address),
+                   "--directory", self.mysqlrouter_dir,
+                   "--conf-use-sockets",
+                   "--socketsdir", self.sockets_dir,
+                   "--conf-base-port", str(self.base_port)]
+            if existing == "other-cluster":
+                ch_core.hookenv.log(
+                    "Existing bootstrap in {} is for another cluster, "
+                    "forcing the bootstrap".format(self.mysqlrouter_dir),
+                    "WARNING")
+                cmd.append("--force")
+            if not self.run_bootstrap(cmd):
+                return
+            # The new mysqlrouter.conf has its own bootstrapped values
+            ch_core.unitdata.kv().unset(self.scoped(BOOTSTRAP_VALUES))
+        self.configure_rest_api()
+        self.update_config_parameters(
+            self.config_parameters, self.config_sections)
+        self.render_systemd_unit()
+        self.configure_metrics_exporter()
+        self.invalidate_connection_check()
+        db_kv = ch_core.unitdata.kv()
+        if self._cluster is None:
+            db_kv.set(DEFAULT_CLUSTER, self.default_cluster)
+        else:
+            routers = db_kv.get(CLUSTER_ROUTERS) or []
+            if self._cluster not in routers:
+                db_kv.set(CLUSTER_ROUTERS, routers + [self._cluster])
+        reactive.flags.set_flag(self.scoped(MYSQL_ROUTER_BOOTSTRAPPED))
+
+    def run_bootstrap(self, cmd):
+        """Run the bootstrap command, retrying on failure.
+
+        Failed attempts are retried with jittered exponential backoff until
+        bootstrap-attempts attempts were made or bootstrap-timeout expires.
+        The attempts and their durations are kept in the unit's KV store.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param cmd: Bootstrap command
+        :type cmd: list
+        :side effect: Executes the mysqlrouter bootstrap command
+        :returns: True if the bootstrap succeeded
+        :rtype: bool
+        """
+        start = time.time()
+        deadline = start + self.options.bootstrap_timeout
+        delay = BOOTSTRAP_BACKOFF
+        attempts = []
+        while True:
+            attempt_start = time.time()
+            returncode = self.run_logged(cmd, deadline - attempt_start)
+            attempts.append({
+                "duration": round(time.time() - attempt_start, 3),
+                "returncode": returncode})
+            remaining = deadline - time.time()
+            if returncode == 0 or remaining <= 0:
+                break
+            if len(attempts) >= self.options.bootstrap_attempts:
+                break
+            backoff = min(delay / 2 + random.uniform(0, delay / 2), remaining)
+            ch_core.hookenv.log(
+                "Bootstrap attempt {} failed with {}, retrying in {:.1f}s"
+                .format(len(attempts), returncode, backoff), "WARNING")
+            time.sleep(backoff)
+            delay = min(delay * 2, BOOTSTRAP_BACKOFF_MAX)
+
+        succeeded = returncode == 0
+        db_kv = ch_core.unitdata.kv()
+        history = db_kv.get(BOOTSTRAP_HISTORY) or []
+        history.append({
+            "time": start,
+            "duration": round(time.time() - start, 3),
+            "succeeded": succeeded,
+            "attempts": attempts})
+        db_kv.set(BOOTSTRAP_HISTORY, history[-BOOTSTRAP_HISTORY_SIZE:])
+        if not succeeded:
+            ch_core.hookenv.log(
+                "Failed to bootstrap mysqlrouter after {} attempts in {:.1f}s"
+                .format(len(attempts), time.time() - start), "ERROR")
+        return succeeded
+
+    def run_logged(self, cmd, timeout):
+        """Run a command logging its output line by line.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param cmd: Command
+        :type cmd: list
+        :param timeout: Seconds after which the command is killed
+        :type timeout: float
+        :returns: Exit code of the command
+        :rtype: int
+        """
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        timer = threading.Timer(max(0, timeout), process.kill)
+        timer.start()
+        try:
+            for line in process.stdout:
+                ch_core.hookenv.log(line.rstrip(), "INFO")
+            return process.wait()
+        finally:
+            timer.cancel()
+
+    def existing_bootstrap(self):
+        """Determine if an existing bootstrap can be reused.
+
+        A bootstrap is reusable when mysqlrouter.conf has a metadata cache
+        and routes, the keyring and its master key exist, and it was made
+        against a cluster that counts the current cluster address among its
+        metadata servers. The account in the metadata cache section is the
+        one the bootstrap created for the router, not the router user, and
+        says nothing about the cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: "reusable", "other-cluster" or None if there is none
+        :rtype: Union[str, None]
+        """
+        mysqlrouter_config = self.read_mysqlrouter_conf()
+        metadata_caches = [
+            section for section in mysqlrouter_config.sections()
+            if section.split(":")[0] == "metadata_cache"]
+        if not metadata_caches or not self.routes:
+            return None
+        for path in (os.path.join(self.mysqlrouter_dir, "mysqlrouter.key"),
+                     os.path.join(self.mysqlrouter_dir, "data", "keyring")):
+            if not os.path.isfile(path) or not os.path.getsize(path):
+                ch_core.hookenv.log(
+                    "Existing bootstrap is missing {}".format(path), "DEBUG")
+                return None
+
+        metadata_cache = mysqlrouter_config[metadata_caches[0]]
+        hosts = [urllib.parse.urlsplit(server).hostname
+                 for server in self.metadata_servers(metadata_cache)]
+        if self.cluster_address not in hosts:
+            return "other-cluster"
+        return "reusable"
+
+    def metadata_servers(self, metadata_cache):
+        """Determine the metadata servers known to the bootstrap.
+
+        Newer MySQL Router releases keep them in data/state.json, older ones
+        in the bootstrap_server_addresses of the metadata cache section.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param metadata_cache: metadata_cache section of mysqlrouter.conf
+        :type metadata_cache: configparser.SectionProxy
+        :returns: Server URIs, i.e. mysql://10.5.0.10:3306
+        :rtype: list
+        """
+        try:
+            with open(self.state_file(metadata_cache)) as f:
+                state = json.load(f)
+            return list(
+                state["metadata-cache"]["cluster-metadata-servers"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return [server.strip() for server in metadata_cache.get(
+            "bootstrap_server_addresses", "").split(",") if server.strip()]
+
+    def state_file(self, metadata_cache):
+        """Determine the path to the router's dynamic state file.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param metadata_cache: metadata_cache section of mysqlrouter.conf
+        :type metadata_cache: configparser.SectionProxy
+        :returns: Path to the file
+        :rtype: str
+        """
+        return metadata_cache.get(
+            "dynamic_state",
+            os.path.join(self.mysqlrouter_dir, "data", "state.json"))
+
+    def render_systemd_unit(self):
+        """Render the mysqlrouter systemd unit.
+
+        Systemd is reloaded when the rendered unit file changes.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Writes the unit file and reloads systemd
+        :returns: True if the unit file changed
+        :rtype: bool
+        """
+        return self._render_service_unit(
+            self.mysqlrouter_service, self.systemd_unit_file, {
+                "mysqlrouter_bin": self.mysqlrouter_bin,
+                "mysqlrouter_conf": self.mysqlrouter_conf,
+                "system_user": self.options.system_user,
+                "sockets_dir": self.sockets_dir,
+                "limit_nofile": self.options.service_limit_nofile,
+                "restart": self.options.service_restart,
+                "cpu_quota": self.options.service_cpu_quota,
+                "memory_max": self.options.service_memory_max,
+                "cpu_affinity": self.options.service_cpu_affinity,
+                "nice": self.options.service_nice,
+            },
+            template="{}.service".format(MYSQLROUTER_SERVICE))
+
+    def _render_service_unit(self, service, unit_file, context,
+                             template=None):
+        """Render a systemd unit from the template named after the service.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param service: Service name
+        :type service: str
+        :param unit_file: Path to the unit file
+        :type unit_file: str
+        :param context: Template context
+        :type context: dict
+        :param template: Template to use instead of <service>.service
+        :type template: Union[str, None]
+        :side effect: Writes the unit file and reloads systemd
+        :returns: True if the unit file changed
+        :rtype: bool
+        """
+        _hash = ch_core.host.file_hash(unit_file)
+        ch_core.templating.render(
+            source=template or "{}.service".format(service),
+            target=unit_file,
+            context=context,
+            perms=0o644)
+        if ch_core.host.file_hash(unit_file) == _hash:
+            return False
+        subprocess.check_call(["systemctl", "daemon-reload"])
+        ch_core.host.service("enable", service)
+        return True
+
+    def configure_metrics_exporter(self):
+        """Install or remove the Prometheus metrics exporter.
+
+        The exporter serves the REST API route and metadata cache statistics
+        in the Prometheus text exposition format.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Installs or removes the exporter and its systemd unit
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        if self._cluster is not None:
+            return
+        if not self.options.metrics_exporter:
+            if os.path.exists(self.exporter_unit_file):
+                ch_core.host.service_stop(EXPORTER_SERVICE)
+                ch_core.host.service("disable", EXPORTER_SERVICE)
+                os.remove(self.exporter_unit_file)
+                subprocess.check_call(["systemctl", "daemon-reload"])
+            return
+
+        with open(os.path.join(ch_core.hookenv.charm_dir(), "files",
+                               "mysqlrouter_exporter.py")) as f:
+            ch_core.host.write_file(EXPORTER_BIN, f.read(), perms=0o755)
+        ch_core.host.write_file(
+            self.exporter_conf,
+            json.dumps({
+                "rest_api_url": "http://127.0.0.1:{}".format(
+                    self.options.rest_api_port),
+                "user": REST_API_USER,
+                "password": self.rest_api_password,
+                "bind_address": self.options.metrics_exporter_bind_address,
+                "port": self.options.metrics_exporter_port,
+            }, sort_keys=True),
+            owner=self.options.system_user,
+            perms=0o600)
+        self._render_service_unit(
+            EXPORTER_SERVICE, self.exporter_unit_file, {
+                "system_user": self.options.system_user,
+                "exporter_bin": EXPORTER_BIN,
+                "exporter_conf": self.exporter_conf,
+            })
+
+    @timed("MySQLRouterCharm.start_mysqlrouter")
+    def start_mysqlrouter(self):
+        """Start MySQL Router.
+
+        Start up the mysqlrouter daemon via its systemd unit. The unit is
+        rendered first so that the process starts with the configured CPU
+        placement. MySQL Router is only flagged as started once all of its
+        routes accept connections. A paused unit is started on resume.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Starts the mysqlrouter service
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        self.invalidate_connection_check()
+        self.render_systemd_unit()
+        if ch_os_utils.is_unit_paused_set():
+            ch_core.hookenv.log(
+                "Unit paused, not starting mysqlrouter", "DEBUG")
+            return
+        if not ch_core.host.service_start(self.mysqlrouter_service):
+            ch_core.hookenv.log("Failed to start mysqlrouter", "ERROR")
+            return
+        self.mysqlrouter_started()
+
+    def mysqlrouter_started(self):
+        """Flag MySQL Router as started once it accepts connections.
+
+        The fingerprint of the configuration it was started with is recorded
+        so that later restart requests can be skipped when nothing changed.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Sets the started flag
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        time_to_ready = self.wait_for_mysqlrouter()
+        if time_to_ready is None:
+            ch_core.hookenv.log(
+                "MySQL router started but not yet ready", "ERROR")
+            return
+        db_kv = ch_core.unitdata.kv()
+        db_kv.set(self.scoped(TIME_TO_READY), time_to_ready)
+        db_kv.set(self.scoped(MYSQLROUTER_FINGERPRINT),
+                  self.mysqlrouter_fingerprint)
+        if self.options.metrics_exporter and self._cluster is None:
+            ch_core.host.service_start(EXPORTER_SERVICE)
+        ch_core.hookenv.log(
+            "MySQL router started, ready after {:.2f}s"
+            .format(time_to_ready), "DEBUG")
+        reactive.flags.set_flag(self.scoped(MYSQL_ROUTER_STARTED))
+
+    def stop_mysqlrouter(self):
+        """Stop MySQL Router.
+
+        Stop the mysqlrouter daemon via its systemd unit.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Stops the mysqlrouter service
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        self.invalidate_connection_check()
+        if not ch_core.host.service_stop(self.mysqlrouter_service):
+            ch_core.hookenv.log("Failed to stop mysqlrouter", "ERROR")
+            return
+        ch_core.hookenv.log("MySQL router stopped", "DEBUG")
+        reactive.flags.clear_flag(self.scoped(MYSQL_ROUTER_STARTED))
+
+    @timed("MySQLRouterCharm.restart_mysqlrouter")
+    def restart_mysqlrouter(self):
+        """Restart MySQL Router.
+
+        Restart the mysqlrouter daemon with a single systemd restart.
+
+        MySQL Router only reopens its log on SIGHUP and has no configuration
+        reload, so any change to the fingerprint requires a restart.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Restarts the mysqlrouter service
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        self.invalidate_connection_check()
+        if not ch_core.host.service_restart(self.mysqlrouter_service):
+            ch_core.hookenv.log("Failed to restart mysqlrouter", "ERROR")
+            reactive.flags.clear_flag(self.scoped(MYSQL_ROUTER_STARTED))
+            return
+        self.mysqlrouter_started()
+
+    @property
+    def mysqlrouter_fingerprint(self):
+        """Fingerprint the files MySQL Router reads when it starts.
+
+        The rendered configuration, the systemd unit and the credentials of
+        the bootstrap directory are included. Files MySQL Router writes
+        itself, such as its state, logs and sockets, are not.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Hash of the files
+        :rtype: str
+        """
+        paths = [
+            self.mysqlrouter_conf,
+            self.systemd_unit_file,
+            os.path.join(self.mysqlrouter_dir, "mysqlrouter.key"),
+            os.path.join(self.mysqlrouter_dir, "data", "keyring"),
+            self.rest_api_passwd_file,
+        ]
+        return content_hash(
+            [[path, ch_core.host.file_hash(path)] for path in paths])
+
+    def request_restart(self):
+        """Restart MySQL Router once at the end of the hook if required.
+
+        Restart requests made during a hook are merged into a single restart
+        which only happens if the fingerprint differs from the one MySQL
+        Router was started with. Actions restart immediately as no exit
+        callbacks are run for them.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Registers an atexit callback
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        self._restart_requests += 1
+        if ch_core.hookenv.action_name():
+            self._deferred_restart()
+        elif self._restart_requests == 1:
+            ch_core.hookenv.atexit(self._deferred_restart)
+
+    def _deferred_restart(self):
+        """Run the restart deferred by request_restart.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: May restart MySQL Router
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        requests, self._restart_requests = self._restart_requests, 0
+        if not requests:
+            return
+        self.restart_if_changed(requests)
+
+    def restart_if_changed(self, requests=1):
+        """Restart MySQL Router if its fingerprint changed since it started.
+
+        A paused unit is not restarted, resume starts it with the current
+        configuration.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param requests: Number of restart requests being served
+        :type requests: int
+        :side effect: May restart MySQL Router
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        if not reactive.flags.is_flag_set(self.scoped(MYSQL_ROUTER_STARTED)):
+            ch_core.hookenv.log(
+                "MySQL router not started, skipping {} restart requests"
+                .format(requests), "DEBUG")
+            return
+        if ch_os_utils.is_unit_paused_set():
+            ch_core.hookenv.log(
+                "Unit paused, skipping {} restart requests"
+                .format(requests), "DEBUG")
+            return
+        fingerprint = self.mysqlrouter_fingerprint
+        if fingerprint == ch_core.unitdata.kv().get(
+                self.scoped(MYSQLROUTER_FINGERPRINT)):
+            ch_core.hookenv.log(
+                "MySQL router configuration unchanged, skipping {} restart "
+                "requests".format(requests), "DEBUG")
+            return
+        ch_core.hookenv.log(
+            "Restarting MySQL router once for {} restart requests"
+            .format(requests), "DEBUG")
+        self.restart_mysqlrouter()
+
+    @timed("MySQLRouterCharm.configure_additional_clusters")
+    def configure_additional_clusters(self):
+        """Bootstrap, configure and start the additional clusters' routers.
+
+        The router instance of each db-router application after the first
+        runs from its own directory, systemd unit and base port. Each instance
+        is bootstrapped once its cluster provided the router credentials and
+        restarted when its fingerprint changed.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: May bootstrap, start or restart router instances
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        self.remove_departed_clusters()
+        message = self.check_cluster_config()
+        if message:
+            ch_core.hookenv.log(
+                "Not configuring the additional clusters: {}"
+                .format(message), "ERROR")
+            return
+        for cluster in self.additional_clusters:
+            with self.cluster_context(cluster):
+                if not (self.cluster_address and self.db_router_password):
+                    ch_core.hookenv.log(
+                        "Waiting on the router credentials of {}"
+                        .format(cluster), "DEBUG")
+                    continue
+                if not reactive.flags.is_flag_set(
+                        self.scoped(MYSQL_ROUTER_BOOTSTRAPPED)):
+                    self.bootstrap_mysqlrouter()
+                    if not reactive.flags.is_flag_set(
+                            self.scoped(MYSQL_ROUTER_BOOTSTRAPPED)):
+                        continue
+                else:
+                    self.update_config_parameters(
+                        self.config_parameters, self.config_sections)
+                    self.render_systemd_unit()
+                if not reactive.flags.is_flag_set(
+                        self.scoped(MYSQL_ROUTER_STARTED)):
+                    self.start_mysqlrouter()
+                else:
+                    self.restart_if_changed()
+
+    def remove_departed_clusters(self):
+        """Remove the router instances of departed clusters.
+
+        When the default cluster departs its router is stopped and flagged
+        for a new bootstrap, which is forced as the existing one is for
+        another cluster. The routers of departed additional clusters, and
+        of a cluster that became the default, are removed.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: May stop and remove router instances
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        db_kv = ch_core.unitdata.kv()
+        default = db_kv.get(DEFAULT_CLUSTER)
+        if default is not None and default not in self.db_router_relations:
+            ch_core.hookenv.log(
+                "Default cluster {} departed, stopping its router"
+                .format(default), "WARNING")
+            self.remove_cluster_router(None)
+            db_kv.unset(DEFAULT_CLUSTER)
+        additional_clusters = self.additional_clusters
+        for cluster in db_kv.get(CLUSTER_ROUTERS) or []:
+            if cluster not in additional_clusters:
+                ch_core.hookenv.log(
+                    "Cluster {} departed, removing its router"
+                    .format(cluster), "WARNING")
+                self.remove_cluster_router(cluster)
+
+    def remove_cluster_router(self, cluster):
+        """Stop the router instance of a cluster and clear its state.
+
+        The default instance keeps its directory and unit to be bootstrapped
+        again, those of an additional cluster are removed.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param cluster: db-router application of the cluster or None
+        :type cluster: Union[str, None]
+        :side effect: Stops the service and clears its flags and KV keys
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        db_kv = ch_core.unitdata.kv()
+        with self.cluster_context(cluster):
+            self.invalidate_connection_check()
+            ch_core.host.service_stop(self.mysqlrouter_service)
+            reactive.flags.clear_flag(self.scoped(MYSQL_ROUTER_STARTED))
+            reactive.flags.clear_flag(self.scoped(MYSQL_ROUTER_BOOTSTRAPPED))
+            for key in (TIME_TO_READY, MYSQLROUTER_FINGERPRINT,
+                        BOOTSTRAP_VALUES):
+                db_kv.unset(self.scoped(key))
+            if cluster is None:
+                return
+            ch_core.host.service("disable", self.mysqlrouter_service)
+            if os.path.exists(self.systemd_unit_file):
+                os.remove(self.systemd_unit_file)
+                subprocess.check_call(["systemctl", "daemon-reload"])
+            shutil.rmtree(self.mysqlrouter_dir, ignore_errors=True)
+            shutil.rmtree(self.sockets_dir, ignore_errors=True)
+        db_kv.set(CLUSTER_ROUTERS, [
+            router for router in db_kv.get(CLUSTER_ROUTERS) or []
+            if router != cluster])
+
+    def read_mysqlrouter_conf(self):
+        """Read the bootstrapped mysqlrouter.conf.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Parsed configuration, empty if not yet bootstrapped
+        :rtype: configparser.ConfigParser
+        """
+        mysqlrouter_config = configparser.ConfigParser(interpolation=None)
+        mysqlrouter_config.read(self.mysqlrouter_conf)
+        return mysqlrouter_config
+
+    @property
+    def routes(self):
+        """Determine the routes configured by the bootstrap.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {route: {bind_address, bind_port, socket, protocol,
+                  destinations}}
+        :rtype: dict
+        """
+        routes = {}
+        mysqlrouter_config = self.read_mysqlrouter_conf()
+        for section in mysqlrouter_config.sections():
+            if section.split(":")[0] != "routing":
+                continue
+            route = mysqlrouter_config[section]
+            routes[section.split(":", 1)[-1]] = {
+                "bind_address": route.get("bind_address"),
+                "bind_port": route.getint("bind_port"),
+                "socket": route.get("socket"),
+                "protocol": route.get("protocol", "classic"),
+                "destinations": route.get("destinations"),
+            }
+        return routes
+
+    @property
+    def route_ports(self):
+        """Determine the port of the RW, RO, X RW and X RO routes.
+
+        Ports are read from the bootstrapped configuration, falling back to
+        their offset from the base port. Roles without either are omitted.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {"rw": port, "ro": port, "x_rw": port, "x_ro": port}
+        :rtype: dict
+        """
+        base_port = self.base_port
+        ports = {}
+        if base_port is not None:
+            ports = {role: base_port + offset
+                     for role, offset in ROUTE_PORT_OFFSETS.items()}
+        for name, route in self.routes.items():
+            for role in ("x_rw", "x_ro", "rw", "ro"):
+                if name.endswith("_{}".format(role)):
+                    if route["bind_port"]:
+                        ports[role] = route["bind_port"]
+                    break
+        return ports
+
+    @property
+    def route_sockets(self):
+        """Determine the unix socket of the RW and RO routes.
+
+        Only sockets which exist under sockets_dir are returned.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {"rw": path, "ro": path}
+        :rtype: dict
+        """
+        sockets = {}
+        for name, route in self.routes.items():
+            if route["protocol"] != "classic" or not route["socket"]:
+                continue
+            if os.path.dirname(route["socket"]) != self.sockets_dir:
+                continue
+            if not os.path.exists(route["socket"]):
+                continue
+            for role in ("rw", "ro"):
+                if name.endswith("_{}".format(role)):
+                    sockets[role] = route["socket"]
+        return sockets
+
+    def additional_connection_info(self, prefix):
+        """Determine connection information sent alongside db_host.
+
+        The principal is always co-located so the RW unix socket is offered
+        as db_socket. The read only socket and port and the X protocol ports
+        are only published for prefixes listed in the read-only-prefixes
+        option, otherwise they are cleared. The RW port is published as
+        db_port for prefixes served by an additional cluster.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param prefix: Prefix of the shared-db request
+        :type prefix: str
+        :returns: {relation key: value}
+        :rtype: dict
+        """
+        _prefixes = (self.options.read_only_prefixes or "").split()
+        _unprefixed = prefix in self._unprefixed
+        if _unprefixed:
+            key_format = "{}"
+            opted_in = "all" in _prefixes or "unprefixed" in _prefixes
+        else:
+            key_format = "{}_{{}}".format(prefix)
+            opted_in = "all" in _prefixes or prefix in _prefixes
+
+        sockets = self.route_sockets
+        ports = self.route_ports if opted_in or self._cluster else {}
+        if not opted_in:
+            ports = {"rw": ports.get("rw")}
+        return {
+            key_format.format("db_socket"): sockets.get("rw"),
+            # Only the default cluster is served on the principal's default
+            # port
+            key_format.format("db_port"): (
+                ports.get("rw") if self._cluster else None),
+            key_format.format("db_ro_socket"): (
+                sockets.get("ro") if opted_in else None),
+            key_format.format("db_ro_port"): ports.get("ro"),
+            key_format.format("db_x_port"): ports.get("x_rw"),
+            key_format.format("db_x_ro_port"): ports.get("x_ro"),
+        }
+
+    @property
+    def route_endpoints(self):
+        """Determine the TCP and unix socket endpoints of all routes.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: [(family, address), ...]
+        :rtype: list
+        """
+        endpoints = []
+        for route in self.routes.values():
+            if route["bind_port"]:
+                address = route["bind_address"]
+                if address in (None, "0.0.0.0", "::"):
+                    address = self.shared_db_address
+                family = socket.AF_INET6 if ":" in address else socket.AF_INET
+                endpoints.append((family, (address, route["bind_port"])))
+            if route["socket"]:
+                endpoints.append((socket.AF_UNIX, route["socket"]))
+        return endpoints
+
+    def wait_for_mysqlrouter(self):
+        """Wait for MySQL Router to accept connections.
+
+        Poll every route endpoint with exponential backoff until all accept
+        connections or service-ready-timeout expires.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Seconds until ready or None if the timeout expired
+        :rtype: Union[float, None]
+        """
+        start = time.time()
+        delay = 0.1
+        pending = self.route_endpoints
+        while True:
+            pending = [endpoint for endpoint in pending
+                       if not endpoint_accepting(*endpoint)]
+            elapsed = time.time() - start
+            if not pending:
+                return elapsed
+            if elapsed >= self.options.service_ready_timeout:
+                ch_core.hookenv.log(
+                    "MySQL router not accepting connections on {} after {}s"
+                    .format(", ".join(str(e[1]) for e in pending),
+                            self.options.service_ready_timeout), "WARNING")
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 2)
+
+    def update_config_parameters(self, parameters, sections=None):
+        """Update parameters in the bootstrapped mysqlrouter.conf.
+
+        The file is only rewritten when at least one value differs from what
+        is already set so that its checksum, and hence the restart_map, only
+        changes when the rendered values change.
+
+        The bootstrapped value of a parameter is kept in the unit's KV store
+        when the charm first changes it. A value of None restores it, or
+        leaves the parameter untouched if the charm never changed it.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param parameters: {section: {parameter: value}}
+        :type parameters: dict
+        :param sections: Sections to add or update, or remove if None
+        :type sections: {section: Union[{parameter: value}, None]}
+        :side effect: Writes the mysqlrouter.conf file
+        :returns: True if the file was updated
+        :rtype: bool
+        """
+        mysqlrouter_config = self.read_mysqlrouter_conf()
+        db_kv = ch_core.unitdata.kv()
+        bootstrapped = db_kv.get(self.scoped(BOOTSTRAP_VALUES)) or {}
+
+        changed = False
+        for section, values in (sections or {}).items():
+            if values is None:
+                changed |= mysqlrouter_config.remove_section(section)
+                bootstrapped.pop(section, None)
+                continue
+            if not mysqlrouter_config.has_section(section):
+                if values and all(v is None for v in values.values()):
+                    continue
+                mysqlrouter_config.add_section(section)
+                changed = True
+            for param, value in values.items():
+                changed |= self._update_config_value(
+                    mysqlrouter_config, section, param, value, bootstrapped)
+            # Drop a section left empty by restoring its parameters
+            own = set(mysqlrouter_config.options(section))
+            own.difference_update(mysqlrouter_config.defaults())
+            if values and not own:
+                changed |= mysqlrouter_config.remove_section(section)
+                bootstrapped.pop(section, None)
+
+        # Unlike sections(), iterating includes [DEFAULT]
+        for section in mysqlrouter_config:
+            _parameters = parameters.get(
+                section, parameters.get(section.split(":")[0], {}))
+            for param, value in _parameters.items():
+                changed |= self._update_config_value(
+                    mysqlrouter_config, section, param, value, bootstrapped)
+
+        db_kv.set(self.scoped(BOOTSTRAP_VALUES), bootstrapped)
+        if not changed:
+            return False
+
+        ch_core.hookenv.log(
+            "Updating {}".format(self.mysqlrouter_conf), "DEBUG")
+        with open(self.mysqlrouter_conf, "w") as configfile:
+            mysqlrouter_config.write(
+                configfile, space_around_delimiters=False)
+        return True
+
+    @staticmethod
+    def _update_config_value(config, section, param, value, bootstrapped):
+        """Set a mysqlrouter.conf parameter or restore its bootstrapped value.
+
+        :param config: Parsed mysqlrouter.conf
+        :type config: configparser.ConfigParser
+        :param section: Section name
+        :type section: str
+        :param param: Parameter name
+        :type param: str
+        :param value: Value or None to restore the bootstrapped value
+        :type value: Union[str, int, float, None]
+        :param bootstrapped: {section: {parameter: bootstrapped value}}
+        :type bootstrapped: dict
+        :returns: True if the configuration changed
+        :rtype: bool
+        """
+        current = config.get(section, param, raw=True, fallback=None)
+        # A value inherited from [DEFAULT] is restored by removing it
+        inherited = False
+        if section != configparser.DEFAULTSECT:
+            inherited = config.defaults().get(param) == current
+        recorded = bootstrapped.get(section, {})
+        if value is None:
+            if param not in recorded:
+                return False
+            value = recorded.pop(param)
+            if value is None:
+                return config.remove_option(section, param)
+        else:
+            value = str(value)
+            if param not in recorded and value != current:
+                bootstrapped.setdefault(section, {})[param] = (
+                    None if inherited else current)
+        if value == current:
+            return False
+        config.set(section, param, value)
+        return True
+
+    @property
+    def rest_api_password(self):
+        """Get the password of the REST API user.
+
+        Generated once and kept in the unit's KV store.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Password
+        :rtype: str
+        """
+        db_kv = ch_core.unitdata.kv()
+        if not db_kv.get(REST_API_PASSWORD):
+            db_kv.set(REST_API_PASSWORD, ch_core.host.pwgen(32))
+        return db_kv.get(REST_API_PASSWORD)
+
+    def configure_rest_api(self):
+        """Create the REST API credentials file.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Executes mysqlrouter_passwd
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        if not self.rest_api_enabled:
+            return
+        if os.path.exists(self.rest_api_passwd_file):
+            return
+        cmd = [MYSQLROUTER_PASSWD_BIN, "set", self.rest_api_passwd_file,
+               REST_API_USER]
+        try:
+            subprocess.check_output(
+                cmd, input=self.rest_api_password.encode("UTF-8"),
+                stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            ch_core.hookenv.log(
+                "Failed to create REST API credentials: {}"
+                .format(e.output.decode("UTF-8")), "ERROR")
+            return
+        # MySQL Router runs as the system user
+        shutil.chown(self.rest_api_passwd_file, user=self.options.system_user)
+        os.chmod(self.rest_api_passwd_file, 0o600)
+
+    def rest_api_get(self, path):
+        """Get a resource from the MySQL Router REST API.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param path: Path of the resource, i.e. routes
+        :type path: str
+        :returns: Decoded JSON response or None on failure
+        :rtype: Union[dict, None]
+        """
+        request = urllib.request.Request(
+            "http://127.0.0.1:{}/api/{}/{}".format(
+                self.options.rest_api_port, REST_API_VERSION, path))
+        credentials = base64.b64encode("{}:{}".format(
+            REST_API_USER, self.rest_api_password).encode("UTF-8"))
+        request.add_header(
+            "Authorization", "Basic {}".format(credentials.decode("UTF-8")))
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read().decode("UTF-8"))
+        except (OSError, ValueError) as e:
+            ch_core.hookenv.log(
+                "MySQL Router REST API request for {} failed: {}"
+                .format(path, e), "DEBUG")
+            return None
+
+    def check_rest_api_health(self):
+        """Check the health of every route using the REST API.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True if every route is alive
+        :rtype: boolean
+        """
+        routes = self.routes
+        if not routes:
+            ch_core.hookenv.log("No MySQL Router routes to check", "DEBUG")
+            return False
+        for name in routes:
+            health = self.rest_api_get("routes/{}/health".format(name))
+            if not health or not health.get("isAlive"):
+                ch_core.hookenv.log(
+                    "MySQL Router route {} is not alive".format(name),
+                    "DEBUG")
+                return False
+        return True
+
+    def router_stats(self):
+        """Collect connection statistics and greeting latency of each route.
+
+        Active connections, the connection rate since the previous call and
+        the current destinations are read from the REST API when enabled,
+        otherwise only the configured destinations are reported. The
+        greeting round trip is timed through every classic protocol route.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Stores the connection totals in the unit's KV store
+        :returns: {route: {statistic: value}}
+        :rtype: dict
+        """
+        kv = ch_core.unitdata.kv()
+        previous = kv.get(ROUTER_STATS) or {}
+        totals = {}
+        now = time.time()
+        stats = {}
+        for name, route in sorted(self.routes.items()):
+            route_stats = {
+                "protocol": route["protocol"],
+                "bind-port": route["bind_port"],
+                "socket": route["socket"],
+                "destinations": [route["destinations"]],
+            }
+            if self.rest_api_enabled:
+                status = self.rest_api_get("routes/{}/status".format(name))
+                if status:
+                    total = status.get("totalConnections", 0)
+                    totals[name] = {"total": total, "time": now}
+                    route_stats["active-connections"] = status.get(
+                        "activeConnections")
+                    route_stats["total-connections"] = total
+                    last = previous.get(name)
+                    if last and now > last["time"]:
+                        rate = (total - last["total"]) / (now - last["time"])
+                        route_stats["connection-rate"] = round(rate, 3)
+                destinations = self.rest_api_get(
+                    "routes/{}/destinations".format(name))
+                if destinations:
+                    route_stats["destinations"] = [
+                        "{}:{}".format(item["address"], item["port"])
+                        for item in destinations.get("items", [])]
+            endpoint = self.greeting_endpoint(route)
+            if route["protocol"] == "classic" and endpoint:
+                start = time.time()
+                version = read_server_greeting(*endpoint)
+                if version:
+                    route_stats["server-version"] = version
+                    route_stats["greeting-ms"] = round(
+                        (time.time() - start) * 1000, 3)
+                else:
+                    route_stats["greeting-ms"] = None
+            stats[name] = route_stats
+        kv.set(ROUTER_STATS, totals)
+        return stats
+
+    def handler_timings(self):
+        """Summarise the wall times in the unit's timeline.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: {name: {"count": int, "p50-ms": float, "p95-ms": float,
+                          "max-ms": float}}
+        :rtype: dict
+        """
+        durations = {}
+        for entry in ch_core.unitdata.kv().get(HANDLER_TIMINGS, []):
+            durations.setdefault(entry["name"], []).append(
+                entry["seconds"] * 1000)
+        return {
+            name: {
+                "count": len(values),
+                "p50-ms": round(percentile(values, 50), 1),
+                "p95-ms": round(percentile(values, 95), 1),
+                "max-ms": round(max(values), 1),
+            } for name, values in durations.items()}
+
+    def probe_failover(self, duration, interval=0.1):
+        """Measure write unavailability through the RW route.
+
+        Repeatedly checks, with the router credentials, that the RW route
+        reaches a writable primary while an operator switches the primary of
+        the cluster. The router user is not granted writes to application
+        schemas, so a probe succeeds when super_read_only is off on the
+        member the route connects to. A failed probe drops the connection so
+        the next probe reconnects through the router.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param duration: Seconds to probe for
+        :type duration: float
+        :param interval: Seconds between probes
+        :type interval: float
+        :returns: {statistic: value}, times in milliseconds
+        :rtype: dict
+        """
+        m_helper = self.get_db_helper()
+        port = self.route_ports["rw"]
+        connected = False
+        probes = failed = 0
+        gaps = []
+        reconnects = []
+        last_success = outage = None
+
+        start = time.time()
+        while time.time() - start < duration:
+            probe_start = time.time()
+            probes += 1
+            try:
+                if not connected:
+                    m_helper.connect(
+                        self.db_router_user, self.db_router_password,
+                        self.shared_db_address, port=port,
+                        connect_timeout=PROBE_CONNECT_TIMEOUT)
+                    connected = True
+                    if outage is not None:
+                        reconnects.append(time.time() - probe_start)
+                if m_helper.select("SELECT @@global.super_read_only")[0][0]:
+                    raise ValueError("Connected to a read only member")
+            except (mysql.MySQLdb._exceptions.OperationalError,
+                    ValueError) as e:
+                failed += 1
+                if outage is None:
+                    outage = last_success or probe_start
+                    ch_core.hookenv.log(
+                        "Write probe failed: {}".format(e), "INFO")
+                if connected:
+                    try:
+                        m_helper.connection.close()
+                    except mysql.MySQLdb._exceptions.OperationalError:
+                        pass
+                    connected = False
+            else:
+                last_success = time.time()
+                if outage is not None:
+                    gaps.append(last_success - outage)
+                    outage = None
+            time.sleep(max(0, interval - (time.time() - probe_start)))
+
+        if connected:
+            m_helper.connection.close()
+        if outage is not None:
+            gaps.append(time.time() - outage)
+
+        def _ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 3)
+
+        return {
+            "duration": round(time.time() - start, 3),
+            "probes": probes,
+            "failed-statements": failed,
+            "outages": len(gaps),
+            "recovered": outage is None,
+            "max-gap-ms": _ms(max(gaps) if gaps else 0),
+            "reconnect-p50-ms": _ms(percentile(reconnects, 50)),
+            "reconnect-p99-ms": _ms(percentile(reconnects, 99)),
+        }
+
+    @timed("MySQLRouterCharm.config_changed")
+    def config_changed(self):
+        """Config changed.
+
+        Apply the charm managed parameters to the bootstrapped mysqlrouter.conf
+        and the systemd unit and request a restart of MySQL Router if either
+        changed. The routers of additional clusters are updated likewise.
+        Kernel parameters are applied first as they do not need a bootstrap.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Updates mysqlrouter.conf and may restart MySQL Router
+        :returns: This function is called for its side effect
+        :rtype: None
         """
-        # We can use receiving_interface.all_joined_units.received
-        # as this is a subordiante and there is only one unit related.
-        db_data = mysql.get_db_data(
-            dict(receiving_interface.all_joined_units.received),
-            unprefixed=self._unprefixed)
+        self.configure_sysctl()
+        if not os.path.exists(self.mysqlrouter_conf):
+            ch_core.hookenv.log(
+                "{} does not yet exist, skipping config changed"
+                .format(self.mysqlrouter_conf), "DEBUG")
+            return
+
+        def _update():
+            self.configure_rest_api()
+            self.update_config_parameters(
+                self.config_parameters, self.config_sections)
+            self.render_systemd_unit()
+            self.configure_metrics_exporter()
+
+        ch_core.host.restart_on_change_helper(
+            _update,
+            self.restart_map,
+            restart_functions={
+                MYSQLROUTER_SERVICE: lambda _svc: self.request_restart()})
+        self.configure_additional_clusters()
+
+    @timed("MySQLRouterCharm.proxy_db_and_user_requests")
+    def proxy_db_and_user_requests(
+            self, receiving_interface, sending_interface):
+        """Proxy database and user requests to the MySQL InnoDB Cluster.
+
+        Take requests from the shared-db relation and proxy them to the
+        db-router relation using their respective endpoints.
+
+        A hash of each request sent is kept in the unit's KV store so that
+        only requests which have been added, changed or removed since the
+        last hook are sent to the cluster.
 
+        When related to several clusters each request is only sent to the
+        cluster serving its prefix.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param receiving_interface: Shared-DB interface
+        :type receiving_interface: MySQLSharedProvides object
+        :param sending_interface: DB-Router interface
+        :type sending_interface: MySQLRouterRequires object
+        :side effect: Executes sending interface's set function
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        db_data = self.shared_db_data(receiving_interface)
+        db_kv = ch_core.unitdata.kv()
+        proxied = db_kv.get(PROXIED_DB_REQUESTS, {})
+        # Requests must be resent if the db-router relation is recreated
+        relation_ids = sorted(
+            relation.relation_id for relation in sending_interface.relations)
+
+        requests = {}
+        sent = 0
         for prefix in db_data:
-            sending_interface.configure_proxy_db(
-                db_data[prefix].get("database"),
-                db_data[prefix].get("username"),
-                db_data[prefix].get("hostname"),
-                prefix=prefix)
+            request = [db_data[prefix].get("database"),
+                       db_data[prefix].get("username"),
+                       db_data[prefix].get("hostname")]
+            requests[prefix] = content_hash(
+                [request, relation_ids, self.prefix_cluster(prefix)])
+            if proxied.get(prefix) == requests[prefix]:
+                continue
+            self.send_proxy_request(sending_interface, prefix, request)
+            sent += 1
+
+        removed = [prefix for prefix in proxied if prefix not in requests]
+        for prefix in removed:
+            self.send_proxy_request(
+                sending_interface, prefix, [None, None, None])
+
+        ch_core.hookenv.log(
+            "Proxied DB requests: {} sent, {} removed, {} unchanged"
+            .format(sent, len(removed), len(requests) - sent), "DEBUG")
+        db_kv.set(PROXIED_DB_REQUESTS, requests)
+        if sent or removed:
+            self.invalidate_relation_snapshot()
 
+    def send_proxy_request(self, db_router, prefix, request):
+        """Send a database and user request to the cluster serving prefix.
+
+        With a single cluster the request is sent using the db-router
+        endpoint. Otherwise it is published on the relation of the cluster
+        serving prefix and cleared on the others.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :param db_router: DB-Router interface
+        :type db_router: MySQLRouterRequires object
+        :param prefix: Prefix of the shared-db request
+        :type prefix: str
+        :param request: [database, username, hostname]
+        :type request: list
+        :side effect: Publishes the request on the db-router relations
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        if not self.additional_clusters:
+            db_router.configure_proxy_db(*request, prefix=prefix)
+            return
+        relations = self.db_router_relations
+        cluster = self.prefix_cluster(prefix) or self.default_cluster
+        db_router.set_prefix(prefix)
+        for application, relation in relations.items():
+            values = request if application == cluster else [None] * 3
+            for key, value in zip(("database", "username", "hostname"),
+                                  values):
+                relation.to_publish_raw["{}_{}".format(prefix, key)] = value
+
+    @timed("MySQLRouterCharm.proxy_db_and_user_responses")
     def proxy_db_and_user_responses(
             self, receiving_interface, sending_interface):
         """Proxy database and user responses to clients.
@@ -429,6 +2921,13 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         Take responses from the db-router relation and proxy them to the
         shared-db relation using their respective endpoints.
 
+        A hash of the (address, password, allowed_hosts) published for each
+        prefix is kept in the unit's KV store so that the principal is only
+        woken up when its connection information actually changes.
+
+        Responses for prefixes served by an additional cluster are read from
+        that cluster's relation and point at its router instance.
+
         :param self: Self
         :type self: MySQLRouterCharm instance
         :param receiving_interface: DB-Router interface
@@ -441,26 +2940,60 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         """
         # This is a suborndinate relationship there is only ever one
         unit = sending_interface.all_joined_units[0]
+        db_kv = ch_core.unitdata.kv()
+        published = db_kv.get(PUBLISHED_DB_RESPONSES, {})
 
-        for prefix in receiving_interface.get_prefixes():
+        responses = {}
+        skipped = 0
+        cluster_config_error = self.check_cluster_config()
+        for prefix in self.db_router_prefixes(receiving_interface):
 
             if prefix in self.db_prefix:
                 # Do not send the mysqlrouter credentials to the client
                 continue
 
-            _password = json.loads(
-                receiving_interface.password(prefix=prefix))
-            if ch_core.hookenv.local_unit() in (json.loads(
-                    receiving_interface.allowed_units(prefix=prefix))):
-                _allowed_hosts = unit.unit_name
-            else:
-                _allowed_hosts = None
-            if prefix in self._unprefixed:
-                prefix = None
+            cluster = self.prefix_cluster(prefix)
+            with self.cluster_context(cluster):
+                if cluster and not reactive.flags.is_flag_set(
+                        self.scoped(MYSQL_ROUTER_STARTED)):
+                    ch_core.hookenv.log(
+                        "Router of {} not yet started, not publishing {}"
+                        .format(cluster, prefix), "DEBUG")
+                    continue
+                if cluster and cluster_config_error:
+                    ch_core.hookenv.log(
+                        "Not publishing {}: {}"
+                        .format(prefix, cluster_config_error), "WARNING")
+                    continue
+                _password = self.db_router_data(
+                    "password", prefix=prefix, db_router=receiving_interface)
+                if ch_core.hookenv.local_unit() in (self.db_router_data(
+                        "allowed_units", prefix=prefix,
+                        db_router=receiving_interface) or []):
+                    _allowed_hosts = unit.unit_name
+                else:
+                    _allowed_hosts = None
+
+                _additional = self.additional_connection_info(prefix)
+
+            responses[prefix] = content_hash([
+                unit.relation.relation_id, self.shared_db_address,
+                _password, _allowed_hosts, _additional])
+            if published.get(prefix) == responses[prefix]:
+                skipped += 1
+                continue
 
             sending_interface.set_db_connection_info(
                 unit.relation.relation_id,
                 self.shared_db_address,
                 _password,
                 _allowed_hosts,
-                prefix=prefix)
+                prefix=None if prefix in self._unprefixed else prefix)
+            unit.relation.to_publish_raw.update(_additional)
+
+        ch_core.hookenv.log(
+            "Published DB responses: {} sent, {} skipped as unchanged"
+            .format(len(responses) - skipped, skipped), "DEBUG")
+        db_kv.set(PUBLISHED_DB_RESPONSES, responses)
+        if len(responses) > skipped:
+            self.invalidate_relation_snapshot()
@@ -25,15 +25,31 @@ def db_router_request(db_router):
     :param db_router: DB-Router interface
     :type db_router_interface: MySQLRouterRequires object
     """
-    with charm.provide_charm_instance() as instance:
+    with mysql_router.timed('db_router_request'), \
+            charm.provide_charm_instance() as instance:
         db_router.set_prefix(instance.db_prefix)
         db_router.configure_db_router(
             instance.db_router_user,
             instance.db_router_address,
             prefix=instance.db_prefix)
+        instance.invalidate_relation_snapshot()
         instance.assess_status()
 
 
+@reactive.when('endpoint.db-router.departed')
+def remove_departed_clusters(db_router):
+    """Remove the routers of departed MySQL InnoDB Clusters.
+
+    :param db_router: DB-Router interface
+    :type db_router_interface: MySQLRouterRequires object
+    """
+    with mysql_router.timed('remove_departed_clusters'), \
+            charm.provide_charm_instance() as instance:
+        instance.remove_departed_clusters()
+        instance.assess_status()
+    reactive.clear_flag('endpoint.db-router.departed')
+
+
 @reactive.when('charm.installed')
 @reactive.when(mysql_router.DB_ROUTER_AVAILABLE)
 @reactive.when_not(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)
@@ -43,7 +59,8 @@ def bootstrap_mysqlrouter(db_router):
     :param db_router: DB-Router interface
     :type db_router_interface: MySQLRouterRequires object
     """
-    with charm.provide_charm_instance() as instance:
+    with mysql_router.timed('bootstrap_mysqlrouter'), \
+            charm.provide_charm_instance() as instance:
         instance.bootstrap_mysqlrouter()
         instance.assess_status()
 
@@ -58,11 +75,26 @@ def start_mysqlrouter(db_router):
     :param db_router: DB-Router interface
     :type db_router_interface: MySQLRouterRequires object
     """
-    with charm.provide_charm_instance() as instance:
+    with mysql_router.timed('start_mysqlrouter'), \
+            charm.provide_charm_instance() as instance:
         instance.start_mysqlrouter()
         instance.assess_status()
 
 
+@reactive.when(mysql_router.MYSQL_ROUTER_STARTED)
+@reactive.when(mysql_router.DB_ROUTER_AVAILABLE)
+def configure_additional_clusters(db_router):
+    """Bootstrap and start the routers of additional MySQL InnoDB Clusters.
+
+    :param db_router: DB-Router interface
+    :type db_router_interface: MySQLRouterRequires object
+    """
+    with mysql_router.timed('configure_additional_clusters'), \
+            charm.provide_charm_instance() as instance:
+        instance.configure_additional_clusters()
+        instance.assess_status()
+
+
 @reactive.when(mysql_router.MYSQL_ROUTER_STARTED)
 @reactive.when(mysql_router.DB_ROUTER_AVAILABLE)
 @reactive.when('shared-db.available')
@@ -77,7 +109,8 @@ def proxy_shared_db_requests(shared_db, db_router):
     :param db_router: DB-Router interface
     :type db_router_interface: MySQLRouterRequires object
     """
-    with charm.provide_charm_instance() as instance:
+    with mysql_router.timed('proxy_shared_db_requests'), \
+            charm.provide_charm_instance() as instance:
         instance.proxy_db_and_user_requests(shared_db, db_router)
         instance.assess_status()
 
@@ -96,6 +129,7 @@ def proxy_shared_db_responses(shared_db, db_router):
     :param db_router: DB-Router interface
     :type db_router_interface: MySQLRouterRequires object
     """
-    with charm.provide_charm_instance() as instance:
+    with mysql_router.timed('proxy_shared_db_responses'), \
+            charm.provide_charm_instance() as instance:
         instance.proxy_db_and_user_responses(db_router, shared_db)
         instance.assess_status()
@@ -20,6 +20,8 @@ _path = os.path.dirname(os.path.realpath(__file__))
 _src = os.path.abspath(os.path.join(_path, "../src"))
 _lib = os.path.abspath(os.path.join(_path, "../src/lib"))
 _reactive = os.path.abspath(os.path.join(_path, "../src/reactive"))
+_files = os.path.abspath(os.path.join(_path, "../src/files"))
+_actions = os.path.abspath(os.path.join(_path, "../src/actions"))
 
 
 def _add_path(path):
@@ -29,6 +31,8 @@ def _add_path(path):
 _add_path(_src)
 _add_path(_lib)
 _add_path(_reactive)
+_add_path(_files)
+_add_path(_actions)
 
 # Mock out charmhelpers so that we can test without it.
 import charms_openstack.test_mocks  # noqa
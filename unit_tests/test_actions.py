@@ -0,0 +1,77 @@
+# Copyright 2019 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import yaml
+
+import charms_openstack.test_utils as test_utils
+
+import actions
+
+
+class TestMySQLRouterActions(test_utils.PatchHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.patch_object(actions.charm, "provide_charm_instance")
+        self.mrc = mock.MagicMock()
+        self.provide_charm_instance.return_value.__enter__.return_value = (
+            self.mrc)
+        self.patch_object(actions.ch_core.hookenv, "action_set")
+        self.patch_object(actions.ch_core.hookenv, "action_fail")
+        self.patch_object(actions.ch_core.unitdata, "kv")
+
+    def test_router_stats(self):
+        _stats = {"jujuCluster_rw": {"greeting-ms": 1.5}}
+        self.mrc.router_stats.return_value = _stats
+        actions.router_stats([])
+        self.kv.return_value.flush.assert_called_once_with()
+        _output = self.action_set.call_args[0][0]["output"]
+        self.assertEqual(_stats, yaml.safe_load(_output))
+
+    def test_failover_probe(self):
+        self.patch_object(actions.ch_core.hookenv, "action_get")
+        self.action_get.return_value = {"duration": 30, "interval": 0.5}
+        _results = {"max-gap-ms": 1062.5, "failed-statements": 3}
+        self.mrc.probe_failover.return_value = _results
+        actions.failover_probe([])
+        self.mrc.probe_failover.assert_called_once_with(30, interval=0.5)
+        _output = self.action_set.call_args[0][0]["output"]
+        self.assertEqual(_results, yaml.safe_load(_output))
+
+    def test_handler_timings(self):
+        _timings = {"bootstrap_mysqlrouter": {
+            "count": 2, "p50-ms": 1500.0, "p95-ms": 9000.0,
+            "max-ms": 9000.0}}
+        self.mrc.handler_timings.return_value = _timings
+        actions.handler_timings([])
+        _output = self.action_set.call_args[0][0]["output"]
+        self.assertEqual(_timings, yaml.safe_load(_output))
+
+    def test_main(self):
+        _router_stats = mock.MagicMock()
+        with mock.patch.dict(
+                actions.ACTIONS, {"router-stats": _router_stats}):
+            actions.main(["/var/lib/juju/charm/actions/router-stats"])
+            _router_stats.assert_called_once_with(
+                ["/var/lib/juju/charm/actions/router-stats"])
+
+            # Failure
+            _router_stats.side_effect = Exception("boom")
+            actions.main(["router-stats"])
+            self.action_fail.assert_called_once_with(
+                "router-stats failed: boom")
+
+        self.assertEqual(
+            "Action unknown undefined", actions.main(["unknown"]))
@@ -16,12 +16,143 @@ import copy
 import collections
 import json
 import mock
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import yaml
 
 import charms_openstack.test_utils as test_utils
 
 import charm.mysql_router as mysql_router
 
 
+with open(os.path.join(
+        os.path.dirname(__file__), "..", "src", "config.yaml")) as _f:
+    CONFIG_DEFAULTS = {
+        option: value.get("default")
+        for option, value in yaml.safe_load(_f)["options"].items()}
+
+RW_SOCKET = "/var/lib/jujumysqlrouter/jujumysqlrouter/mysql.sock"
+RO_SOCKET = "/var/lib/jujumysqlrouter/jujumysqlrouter/mysqlro.sock"
+
+MYSQLROUTER_CONF = """[DEFAULT]
+name=system
+user=ubuntu
+
+[metadata_cache:jujuCluster]
+cluster_type=gr
+router_id=1
+ttl=0.5
+
+[routing:jujuCluster_rw]
+bind_address=0.0.0.0
+bind_port=3306
+socket=/var/lib/jujumysqlrouter/jujumysqlrouter/mysql.sock
+destinations=metadata-cache://jujuCluster/?role=PRIMARY
+routing_strategy=first-available
+protocol=classic
+
+[routing:jujuCluster_ro]
+bind_address=0.0.0.0
+bind_port=3307
+socket=/var/lib/jujumysqlrouter/jujumysqlrouter/mysqlro.sock
+destinations=metadata-cache://jujuCluster/?role=SECONDARY
+routing_strategy=round-robin-with-fallback
+protocol=classic
+
+[routing:jujuCluster_x_rw]
+bind_address=0.0.0.0
+bind_port=3308
+socket=/var/lib/jujumysqlrouter/jujumysqlrouter/mysqlx.sock
+destinations=metadata-cache://jujuCluster/?role=PRIMARY
+routing_strategy=first-available
+protocol=x
+
+[routing:jujuCluster_x_ro]
+bind_address=0.0.0.0
+bind_port=3309
+socket=/var/lib/jujumysqlrouter/jujumysqlrouter/mysqlxro.sock
+destinations=metadata-cache://jujuCluster/?role=SECONDARY
+routing_strategy=round-robin-with-fallback
+protocol=x
+"""
+
+
+class TestPercentile(test_utils.PatchHelper):
+
+    def test_percentile(self):
+        _values = [5, 1, 4, 2, 3]
+        self.assertEqual(3, mysql_router.percentile(_values, 50))
+        self.assertEqual(5, mysql_router.percentile(_values, 99))
+        self.assertEqual(1, mysql_router.percentile(_values, 0))
+        self.assertIsNone(mysql_router.percentile([], 50))
+
+
+class TestParseCPUSet(test_utils.PatchHelper):
+
+    def test_parse_cpu_set(self):
+        self.assertEqual([0, 1, 2, 3, 8, 9],
+                         mysql_router.parse_cpu_set("0-3,8 9"))
+        self.assertEqual([4], mysql_router.parse_cpu_set("4"))
+        self.assertEqual([], mysql_router.parse_cpu_set(""))
+        for invalid in ("a", "3-1", "-1"):
+            with self.assertRaises(ValueError):
+                mysql_router.parse_cpu_set(invalid)
+
+
+class TestTimed(test_utils.PatchHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self.patch_object(mysql_router.ch_core.hookenv, "hook_name")
+        self.hook_name.return_value = "config-changed"
+        self.patch_object(mysql_router.time, "monotonic")
+
+    def test_timed(self):
+        self.monotonic.side_effect = [10.0, 12.5, 20.0, 20.25]
+        with mysql_router.timed("db_router_request"):
+            pass
+
+        @mysql_router.timed("bootstrap_mysqlrouter")
+        def _bootstrap():
+            raise FakeException()
+
+        with self.assertRaises(FakeException):
+            _bootstrap()
+        _timeline = self.kv.return_value.get(mysql_router.HANDLER_TIMINGS)
+        self.assertEqual(
+            [("db_router_request", "config-changed", 2.5),
+             ("bootstrap_mysqlrouter", "config-changed", 0.25)],
+            [(t["name"], t["hook"], t["seconds"]) for t in _timeline])
+
+    def test_timed_rolling(self):
+        self.monotonic.return_value = 10.0
+        self.patch_object(mysql_router, "HANDLER_TIMINGS_SIZE", new=3)
+        for name in ("a", "b", "c", "d"):
+            with mysql_router.timed(name):
+                pass
+        self.assertEqual(
+            ["b", "c", "d"],
+            [t["name"] for t in self.kv.return_value.get(
+                mysql_router.HANDLER_TIMINGS)])
+
+
+class TestParseMapping(test_utils.PatchHelper):
+
+    def test_parse_mapping(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.assertEqual(
+            {"nova_cell1": "mysql-cell1", "unprefixed": "mysql"},
+            mysql_router.parse_mapping(
+                "nova_cell1=mysql-cell1 invalid =x unprefixed=mysql"))
+        self.assertEqual(2, len(self.log.mock_calls))
+        self.assertEqual({}, mysql_router.parse_mapping(None))
+
+
 class TestMySQLRouterProperties(test_utils.PatchHelper):
 
     def setUp(self):
@@ -43,6 +174,72 @@ class TestMySQLRouterProperties(test_utils.PatchHelper):
         self.get_relation_ip.assert_called_once_with("db-router")
 
 
+class TestReadServerGreeting(test_utils.PatchHelper):
+
+    def setUp(self):
+        super().setUp()
+        _tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, _tmpdir)
+        self.path = os.path.join(_tmpdir, "mysql.sock")
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(self.server.close)
+        self.server.bind(self.path)
+        self.server.listen(1)
+
+    def _serve(self, payload):
+        def _send():
+            conn, _ = self.server.accept()
+            with conn:
+                conn.sendall(
+                    len(payload).to_bytes(3, "little") + b"\x00" + payload)
+        thread = threading.Thread(target=_send)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_greeting(self):
+        self._serve(b"\x0a8.0.19-0ubuntu0.19.10.3\x00\x01\x00\x00\x00")
+        self.assertEqual(
+            mysql_router.read_server_greeting(socket.AF_UNIX, self.path),
+            "8.0.19-0ubuntu0.19.10.3")
+
+    def test_error_packet(self):
+        self._serve(b"\xff\x69\x04Host is blocked")
+        self.assertIsNone(
+            mysql_router.read_server_greeting(socket.AF_UNIX, self.path))
+
+    def test_closed(self):
+        self._serve(b"")
+        self.assertIsNone(
+            mysql_router.read_server_greeting(socket.AF_UNIX, self.path))
+
+
+class FakeKV(object):
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def unset(self, key):
+        self.data.pop(key, None)
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
 class FakeException(Exception):
 
     def __init__(self, *args, **kwargs):
@@ -66,8 +263,18 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.patch_object(mysql_router.reactive.flags, "clear_flag")
         self.patch_object(
             mysql_router.reactive.relations, "endpoint_from_flag")
+        self.patch_object(
+            mysql_router.reactive.relations, "endpoint_from_name")
+        self.endpoint_from_name.return_value.relations = []
         self.patch_object(mysql_router.ch_net_ip, "get_relation_ip")
         self.patch_object(mysql_router.ch_core.hookenv, "local_unit")
+        self.patch_object(mysql_router.ch_core.hookenv, "config")
+        self.config.return_value = dict(CONFIG_DEFAULTS)
+        # mysql-router older than any optional feature
+        self.patch_object(mysql_router.ch_core.host, "cmp_pkgrevno")
+        self.patch_object(mysql_router.ch_os_utils, "is_unit_paused_set")
+        self.is_unit_paused_set.return_value = False
+        self.cmp_pkgrevno.return_value = -1
 
         self.stdout = mock.MagicMock()
         self.subprocess.STDOUT = self.stdout
@@ -118,6 +325,32 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.nova_shared_db.relations = {
             self.nova_shared_db.relation_id: self.nova_shared_db}
 
+    def _write_mysqlrouter_conf(self, contents=MYSQLROUTER_CONF):
+        _tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, _tmpdir)
+        _conf = os.path.join(_tmpdir, "mysqlrouter.conf")
+        with open(_conf, "w") as f:
+            f.write(contents)
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_conf",
+            new_callable=mock.PropertyMock)
+        self.mysqlrouter_conf.return_value = _conf
+        return _conf
+
+    def _relate_clusters(self, *applications):
+        _relations = []
+        for _id, application in enumerate(applications):
+            _relation = mock.MagicMock()
+            _relation.relation_id = "db-router:{}".format(_id + 1)
+            _relation.application_name = application
+            _relation.joined_units.received_raw = {}
+            _relation.to_publish_raw = {}
+            _relations.append(_relation)
+        # Relation ids order the clusters, not the endpoint
+        self.endpoint_from_name.return_value.relations = list(
+            reversed(_relations))
+        return _relations
+
     def _fake_get_allowed_units(self, interface):
         return " ".join(
             [x.unit_name for x in
@@ -164,6 +397,154 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             mrc.db_router_endpoint,
             self.db_router)
 
+    def test_relation_snapshot(self):
+        _json_pass = '"clusterpass"'
+        self.endpoint_from_flag.return_value = self.db_router
+        self.db_router.password.return_value = _json_pass
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Relation data is read and decoded once
+        self.assertEqual(mrc.db_router_password, "clusterpass")
+        self.assertEqual(mrc.db_router_password, "clusterpass")
+        self.endpoint_from_flag.assert_called_once_with(
+            mysql_router.DB_ROUTER_AVAILABLE)
+        self.db_router.password.assert_called_once_with(
+            prefix=mrc.db_prefix)
+
+        # Invalidated
+        mrc.invalidate_relation_snapshot()
+        self.assertEqual(mrc.db_router_password, "clusterpass")
+        self.assertEqual(2, len(self.db_router.password.mock_calls))
+
+    def test_db_router_data_unset(self):
+        self.endpoint_from_flag.return_value = self.db_router
+        self.db_router.allowed_units.return_value = None
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertIsNone(
+            mrc.db_router_data("allowed_units", prefix="nova"))
+
+    def test_db_router_relations(self):
+        _mysql, _cell1 = self._relate_clusters("mysql", "mysql-cell1")
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual(
+            ["mysql", "mysql-cell1"], list(mrc.db_router_relations))
+        self.assertEqual(["mysql-cell1"], mrc.additional_clusters)
+        self.endpoint_from_name.assert_called_once_with("db-router")
+        self.assertEqual(_mysql, mrc.cluster_relation)
+        with mrc.cluster_context("mysql-cell1"):
+            self.assertEqual(_cell1, mrc.cluster_relation)
+        self.assertEqual(_mysql, mrc.cluster_relation)
+
+        # Single cluster uses the db-router endpoint
+        self._relate_clusters("mysql")
+        mrc.invalidate_relation_snapshot()
+        self.assertEqual([], mrc.additional_clusters)
+        self.assertIsNone(mrc.cluster_relation)
+
+        # The bootstrapped default cluster stays the default
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self.kv().set(mysql_router.DEFAULT_CLUSTER, "mysql-cell1")
+        _mysql, _cell1 = self._relate_clusters("mysql", "mysql-cell1")
+        mrc.invalidate_relation_snapshot()
+        self.assertEqual("mysql-cell1", mrc.default_cluster)
+        self.assertEqual(["mysql"], mrc.additional_clusters)
+        self.assertEqual(_cell1, mrc.cluster_relation)
+
+        # Relations without units have departed
+        _cell1.application_name = None
+        mrc.invalidate_relation_snapshot()
+        self.assertEqual(["mysql"], list(mrc.db_router_relations))
+        self.assertEqual("mysql", mrc.default_cluster)
+        self.assertEqual([], mrc.additional_clusters)
+
+    def test_db_router_data_cluster(self):
+        _mysql, _cell1 = self._relate_clusters("mysql", "mysql-cell1")
+        _mysql.joined_units.received_raw = {
+            "db_host": '"10.5.0.10"', "nova_password": '"pass0"'}
+        _cell1.joined_units.received_raw = {
+            "db_host": '"10.5.1.10"', "nova_password": '"pass1"'}
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual("10.5.0.10", mrc.cluster_address)
+        self.assertEqual(
+            "pass0", mrc.db_router_data("password", prefix="nova"))
+        with mrc.cluster_context("mysql-cell1"):
+            self.assertEqual("10.5.1.10", mrc.cluster_address)
+            self.assertEqual(
+                "pass1", mrc.db_router_data("password", prefix="nova"))
+            self.assertIsNone(
+                mrc.db_router_data("allowed_units", prefix="nova"))
+        self.db_router.password.assert_not_called()
+
+    def test_prefix_cluster(self):
+        self._relate_clusters("mysql", "mysql-cell1")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.cluster_prefixes = (
+            "novacell1=mysql-cell1 unprefixed=mysql-cell1 "
+            "novaapi=mysql placement=mysql-gone")
+        self.assertEqual("mysql-cell1", mrc.prefix_cluster("novacell1"))
+        self.assertEqual(
+            "mysql-cell1", mrc.prefix_cluster(mrc._unprefixed))
+        self.assertIsNone(mrc.prefix_cluster("novaapi"))
+        self.assertIsNone(mrc.prefix_cluster("placement"))
+        self.assertIsNone(mrc.prefix_cluster("nova"))
+
+    def test_cluster_context(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+        mrc.options.base_port = 3306
+        mrc.options.cluster_base_ports = "mysql-cell1=3316"
+        mrc.options.rest_api = True
+        self.assertEqual("/home/ubuntu/mysqlrouter", mrc.mysqlrouter_dir)
+        self.assertEqual(
+            mysql_router.MYSQLROUTER_SERVICE, mrc.mysqlrouter_service)
+        self.assertEqual(3306, mrc.base_port)
+        self.assertEqual(
+            mysql_router.MYSQL_ROUTER_STARTED,
+            mrc.scoped(mysql_router.MYSQL_ROUTER_STARTED))
+        self.assertTrue(mrc.rest_api_enabled)
+
+        with mrc.cluster_context("mysql-cell1"):
+            self.assertEqual(
+                "/home/ubuntu/mysqlrouter-mysql-cell1", mrc.mysqlrouter_dir)
+            self.assertEqual(
+                "/home/ubuntu/mysqlrouter-mysql-cell1/mysqlrouter.conf",
+                mrc.mysqlrouter_conf)
+            self.assertEqual(
+                "jujumysqlrouter-mysql-cell1", mrc.mysqlrouter_service)
+            self.assertEqual(
+                "/etc/systemd/system/jujumysqlrouter-mysql-cell1.service",
+                mrc.systemd_unit_file)
+            self.assertEqual(3316, mrc.base_port)
+            self.assertEqual(
+                mysql_router.MYSQL_ROUTER_STARTED + ".mysql-cell1",
+                mrc.scoped(mysql_router.MYSQL_ROUTER_STARTED))
+            self.assertFalse(mrc.rest_api_enabled)
+            with mrc.cluster_context("mysql-cell2"):
+                self.assertIsNone(mrc.base_port)
+            self.assertEqual(3316, mrc.base_port)
+        self.assertEqual("/home/ubuntu/mysqlrouter", mrc.mysqlrouter_dir)
+
+    def test_db_router_prefixes(self):
+        _prefixes = ["mysqlrouter", "nova"]
+        self.db_router.get_prefixes.return_value = _prefixes
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual(
+            mrc.db_router_prefixes(self.db_router), _prefixes)
+        self.assertEqual(
+            mrc.db_router_prefixes(self.db_router), _prefixes)
+        self.db_router.get_prefixes.assert_called_once_with()
+
+    def test_shared_db_data(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        _data = mrc.shared_db_data(self.nova_shared_db)
+        self.assertEqual(
+            list(_data.keys()), ["nova", "novaapi", "novacell0"])
+        mrc.shared_db_data(self.nova_shared_db)
+        self.get_db_data.assert_called_once_with(
+            self.nova_shared_db.all_joined_units.received,
+            unprefixed=mrc._unprefixed)
+
     def test_db_prefix(self):
         mrc = mysql_router.MySQLRouterCharm()
         self.assertEqual(
@@ -218,15 +599,530 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             mrc.mysqlrouter_dir,
             "/home/{}/mysqlrouter".format(_user))
 
+    def test_mysqlrouter_conf(self):
+        _user = "ubuntu"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = _user
+        self.assertEqual(
+            mrc.mysqlrouter_conf,
+            "/home/{}/mysqlrouter/mysqlrouter.conf".format(_user))
+
+    def test_restart_map(self):
+        _user = "ubuntu"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = _user
+        mrc.options.metrics_exporter = False
+        self.assertEqual(
+            mrc.restart_map,
+            {"/home/{}/mysqlrouter/mysqlrouter.conf".format(_user):
+                [mysql_router.MYSQLROUTER_SERVICE],
+             "/etc/systemd/system/jujumysqlrouter.service":
+                [mysql_router.MYSQLROUTER_SERVICE]})
+
+        # Metrics exporter
+        mrc.options.metrics_exporter = True
+        _exporter = [mysql_router.EXPORTER_SERVICE]
+        self.assertEqual(
+            mrc.restart_map,
+            {"/home/{}/mysqlrouter/mysqlrouter.conf".format(_user):
+                [mysql_router.MYSQLROUTER_SERVICE],
+             "/etc/systemd/system/jujumysqlrouter.service":
+                [mysql_router.MYSQLROUTER_SERVICE],
+             "/usr/local/bin/jujumysqlrouter-exporter": _exporter,
+             "/home/{}/mysqlrouter/exporter.json".format(_user): _exporter,
+             "/etc/systemd/system/jujumysqlrouter-exporter.service":
+                _exporter})
+
+    def test_services(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.metrics_exporter = False
+        self.assertEqual(
+            [mysql_router.MYSQLROUTER_SERVICE], mrc.services)
+        mrc.options.metrics_exporter = True
+        self.assertEqual(
+            [mysql_router.MYSQLROUTER_SERVICE,
+             mysql_router.EXPORTER_SERVICE], mrc.services)
+
+        # Additional clusters, including departed ones until removed
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self.kv().set(mysql_router.CLUSTER_ROUTERS, ["mysql-cell1"])
+        mrc.options.metrics_exporter = False
+        self.assertEqual(
+            [mysql_router.MYSQLROUTER_SERVICE,
+             "jujumysqlrouter-mysql-cell1"], mrc.services)
+
+    def test_rest_api_enabled(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api = False
+        mrc.options.metrics_exporter = False
+        self.assertFalse(mrc.rest_api_enabled)
+        mrc.options.metrics_exporter = True
+        self.assertTrue(mrc.rest_api_enabled)
+        mrc.options.rest_api = True
+        mrc.options.metrics_exporter = False
+        self.assertTrue(mrc.rest_api_enabled)
+
+    def test_config_parameters(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.max_connections = 1024
+        mrc.options.max_connect_errors = 200
+        mrc.options.connect_timeout = 3
+        mrc.options.client_connect_timeout = 7
+        self.assertEqual(
+            mrc.config_parameters["routing"],
+            {"max_connections": 1024,
+             "max_connect_errors": 200,
+             "connect_timeout": 3,
+             "client_connect_timeout": 7})
+
+    def test_config_parameters_connection_sharing(self):
+        self._write_mysqlrouter_conf()
+        self.cmp_pkgrevno.return_value = 0
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.max_connections = 1024
+        mrc.options.max_connect_errors = 200
+        mrc.options.connect_timeout = 3
+        mrc.options.client_connect_timeout = 7
+        mrc.options.connection_sharing = True
+        _parameters = mrc.config_parameters
+        self.assertEqual(
+            _parameters["routing:jujuCluster_rw"],
+            {"max_connections": 1024,
+             "max_connect_errors": 200,
+             "connect_timeout": 3,
+             "client_connect_timeout": 7,
+             "socket": RW_SOCKET,
+             "connection_sharing": 1})
+        self.assertEqual(
+            1, _parameters["routing:jujuCluster_ro"]["connection_sharing"])
+        self.assertNotIn(
+            "connection_sharing", _parameters["routing:jujuCluster_x_rw"])
+
+        # Disabled
+        mrc.options.connection_sharing = False
+        self.assertEqual(
+            0,
+            mrc.config_parameters["routing:jujuCluster_rw"][
+                "connection_sharing"])
+
+    def test_config_parameters_sockets(self):
+        # Bootstrapped before the sockets moved out of mysqlrouter_dir
+        self._write_mysqlrouter_conf(MYSQLROUTER_CONF.replace(
+            "/var/lib/jujumysqlrouter/jujumysqlrouter/",
+            "/home/ubuntu/mysqlrouter/"))
+        mrc = mysql_router.MySQLRouterCharm()
+        _parameters = mrc.config_parameters
+        self.assertEqual(
+            "/var/lib/jujumysqlrouter/jujumysqlrouter/mysqlxro.sock",
+            _parameters["routing:jujuCluster_x_ro"]["socket"])
+        self.assertNotIn(
+            "connection_sharing", _parameters["routing:jujuCluster_rw"])
+        with mrc.cluster_context("mysql-cell1"):
+            self.assertEqual(
+                "/var/lib/jujumysqlrouter/jujumysqlrouter-mysql-cell1",
+                mrc.sockets_dir)
+
+    def test_config_parameters_max_total_connections(self):
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.max_connections = 1024
+        mrc.options.max_total_connections = None
+
+        # Older than 8.0.27
+        self.assertNotIn("DEFAULT", mrc.config_parameters)
+
+        # One max-connections per route by default
+        mrc._supported_options = {"max_total_connections": True}
+        self.assertEqual(
+            {"max_total_connections": 4096},
+            mrc.config_parameters["DEFAULT"])
+        mrc.options.max_total_connections = 2000
+        self.assertEqual(
+            {"max_total_connections": 2000},
+            mrc.config_parameters["DEFAULT"])
+
+    def test_metadata_cache_parameters(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.metadata_ttl = 0.1
+        mrc.options.metadata_auth_cache_ttl = -1
+        mrc.options.gr_notifications = True
+
+        # Older than 8.0.17
+        self.assertEqual({"ttl": 0.1}, mrc.metadata_cache_parameters)
+
+        mrc._supported_options = {
+            "auth_cache_ttl": True, "use_gr_notifications": True}
+        self.assertEqual(
+            {"ttl": 0.1, "auth_cache_ttl": -1, "use_gr_notifications": 1},
+            mrc.metadata_cache_parameters)
+        self.assertEqual(
+            mrc.metadata_cache_parameters,
+            mrc.config_parameters["metadata_cache"])
+
+        # Invalid, restores the bootstrapped TTLs
+        mrc.options.metadata_auth_cache_ttl = 0.05
+        self.assertEqual(
+            {"ttl": None, "auth_cache_ttl": None, "use_gr_notifications": 1},
+            mrc.metadata_cache_parameters)
+
+    def test_metadata_cache_parameters_unset(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.metadata_ttl = 5
+        mrc.options.metadata_auth_cache_ttl = None
+
+        # Set
+        self.assertTrue(
+            mrc.update_config_parameters(mrc.config_parameters))
+        self.assertEqual(
+            "5", mrc.read_mysqlrouter_conf()["metadata_cache:jujuCluster"][
+                "ttl"])
+
+        # Unset
+        mrc.options.metadata_ttl = None
+        self.assertTrue(
+            mrc.update_config_parameters(mrc.config_parameters))
+        self.assertEqual(
+            "0.5", mrc.read_mysqlrouter_conf()["metadata_cache:jujuCluster"][
+                "ttl"])
+
+        # Invalid
+        mrc.options.metadata_ttl = 5
+        self.assertTrue(
+            mrc.update_config_parameters(mrc.config_parameters))
+        mrc.options.metadata_ttl = -1
+        self.assertTrue(
+            mrc.update_config_parameters(mrc.config_parameters))
+        self.assertEqual(
+            "0.5", mrc.read_mysqlrouter_conf()["metadata_cache:jujuCluster"][
+                "ttl"])
+
+    def test_check_metadata_cache_config(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.metadata_ttl = None
+        mrc.options.metadata_auth_cache_ttl = None
+        self.assertIsNone(mrc.check_metadata_cache_config())
+
+        mrc.options.metadata_ttl = 0.5
+        mrc.options.metadata_auth_cache_ttl = -1
+        self.assertIsNone(mrc.check_metadata_cache_config())
+
+        mrc.options.metadata_auth_cache_ttl = 2
+        self.assertIsNone(mrc.check_metadata_cache_config())
+
+        mrc.options.metadata_auth_cache_ttl = 0.1
+        self.assertEqual(
+            "metadata-auth-cache-ttl must be -1 or at least metadata-ttl",
+            mrc.check_metadata_cache_config())
+
+        mrc.options.metadata_ttl = -1
+        self.assertEqual(
+            "metadata-ttl must not be negative",
+            mrc.check_metadata_cache_config())
+
+    def test_supports_option(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertFalse(mrc.supports_option("connection_sharing"))
+        self.cmp_pkgrevno.assert_called_once_with("mysql-router", "8.0.29")
+
+        # Cached
+        self.cmp_pkgrevno.return_value = 1
+        self.assertFalse(mrc.supports_option("connection_sharing"))
+        self.assertTrue(mrc.supports_option("idle_timeout"))
+        self.cmp_pkgrevno.assert_called_with("mysql-router", "8.0.33")
+        self.assertEqual(2, len(self.cmp_pkgrevno.mock_calls))
+
+    def test_connection_pool(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.connection_pool_size = 32
+        mrc.options.connection_pool_idle_timeout = 10
+        mrc.options.connection_sharing = False
+
+        # Unsupported
+        self.assertIsNone(mrc.connection_pool)
+
+        # 8.0.29
+        mrc._supported_options = {
+            "max_idle_server_connections": True,
+            "connection_sharing": True,
+            "idle_timeout": False}
+        self.assertEqual(
+            {"max_idle_server_connections": 32, "idle_timeout": None},
+            mrc.connection_pool)
+
+        # 8.0.33
+        mrc._supported_options["idle_timeout"] = True
+        self.assertEqual(
+            {"max_idle_server_connections": 32, "idle_timeout": 10},
+            mrc.connection_pool)
+
+        # Unset restores the bootstrapped values
+        mrc.options.connection_pool_size = None
+        mrc.options.connection_pool_idle_timeout = None
+        self.assertEqual(
+            {"max_idle_server_connections": None, "idle_timeout": None},
+            mrc.connection_pool)
+
+    def test_io_threads(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.io_threads = None
+        mrc.options.service_cpu_affinity = None
+        mrc._supported_options = {"threads": True}
+
+        # Unset
+        self.assertIsNone(mrc.io_threads)
+
+        # Configured
+        mrc.options.io_threads = 8
+        mrc.options.service_cpu_affinity = "0-3"
+        self.assertEqual(8, mrc.io_threads)
+
+        # Size of the CPU set
+        mrc.options.io_threads = None
+        self.assertEqual(4, mrc.io_threads)
+
+        # Invalid CPU set
+        mrc.options.service_cpu_affinity = "3-1"
+        self.assertIsNone(mrc.io_threads)
+
+        # Unsupported
+        mrc.options.io_threads = 8
+        mrc._supported_options = {"threads": False}
+        self.assertIsNone(mrc.io_threads)
+
     def test_install(self):
         self.patch_object(
             mysql_router.charms_openstack.charm.OpenStackCharm,
             "install", "super_install")
         mrc = mysql_router.MySQLRouterCharm()
         mrc.configure_source = mock.MagicMock()
+        mrc.configure_sysctl = mock.MagicMock()
         mrc.install()
         self.super_install.assert_called_once()
         mrc.configure_source.assert_called_once()
+        mrc.configure_sysctl.assert_called_once_with()
+
+    def test_upgrade_charm(self):
+        self.patch_object(
+            mysql_router.charms_openstack.charm.OpenStackCharm,
+            "upgrade_charm", "super_upgrade_charm")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.stop_legacy_mysqlrouter = mock.MagicMock()
+        mrc.stop_legacy_mysqlrouter.return_value = False
+        mrc.stop_mysqlrouter = mock.MagicMock()
+        mrc.upgrade_charm()
+        self.super_upgrade_charm.assert_called_once_with()
+        mrc.stop_legacy_mysqlrouter.assert_called_once_with()
+        mrc.stop_mysqlrouter.assert_not_called()
+
+        # Router started by start.sh
+        mrc.stop_legacy_mysqlrouter.return_value = True
+        mrc.upgrade_charm()
+        mrc.stop_mysqlrouter.assert_called_once_with()
+
+    def test_stop_legacy_mysqlrouter(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(mysql_router.os, "kill")
+        _clock = FakeClock()
+        self.patch_object(mysql_router.time, "time")
+        self.patch_object(mysql_router.time, "sleep")
+        self.time.side_effect = _clock.time
+        self.sleep.side_effect = _clock.sleep
+        _tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, _tmpdir)
+        _pid_file = os.path.join(_tmpdir, mysql_router.MYSQLROUTER_PID)
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_dir",
+            new_callable=mock.PropertyMock)
+        self.mysqlrouter_dir.return_value = _tmpdir
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Started by the systemd unit
+        self.assertFalse(mrc.stop_legacy_mysqlrouter())
+        self.kill.assert_not_called()
+
+        # Exits after two seconds
+        with open(_pid_file, "w") as f:
+            f.write("1234\n")
+        self.kill.side_effect = [None, None, None, ProcessLookupError]
+        self.assertTrue(mrc.stop_legacy_mysqlrouter())
+        self.kill.assert_has_calls([
+            mock.call(1234, mysql_router.signal.SIGTERM),
+            mock.call(1234, 0), mock.call(1234, 0), mock.call(1234, 0)])
+        self.assertFalse(os.path.exists(_pid_file))
+
+        # Does not exit
+        self.kill.reset_mock()
+        self.kill.side_effect = None
+        with open(_pid_file, "w") as f:
+            f.write("1234")
+        self.assertTrue(mrc.stop_legacy_mysqlrouter(timeout=5))
+        self.assertEqual(6, len(self.kill.mock_calls))
+        self.assertFalse(os.path.exists(_pid_file))
+
+        # Unreadable
+        self.kill.reset_mock()
+        with open(_pid_file, "w") as f:
+            f.write("")
+        self.assertTrue(mrc.stop_legacy_mysqlrouter())
+        self.kill.assert_not_called()
+        self.assertFalse(os.path.exists(_pid_file))
+
+    def test_check_sysctl_config(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.sysctl_profile = None
+        mrc.options.sysctl = None
+        self.assertIsNone(mrc.check_sysctl_config())
+        self.assertEqual({}, mrc.sysctl_settings)
+
+        mrc.options.sysctl_profile = "high-churn"
+        mrc.options.sysctl = "{net.ipv4.tcp_fin_timeout: 30}"
+        self.assertIsNone(mrc.check_sysctl_config())
+        self.assertEqual(
+            {"net.core.somaxconn": 4096,
+             "net.ipv4.ip_local_port_range": "10240 65535",
+             "net.ipv4.tcp_tw_reuse": 1,
+             "net.ipv4.tcp_fin_timeout": 30},
+            mrc.sysctl_settings)
+
+        # Invalid
+        mrc.options.sysctl_profile = "fast"
+        self.assertEqual(
+            "sysctl-profile must be one of high-churn, moderate",
+            mrc.check_sysctl_config())
+        self.assertEqual({}, mrc.sysctl_settings)
+        mrc.options.sysctl_profile = None
+        for invalid in ("[1, 2]", "{a: [b"):
+            mrc.options.sysctl = invalid
+            self.assertEqual(
+                "sysctl must be a YAML dictionary",
+                mrc.check_sysctl_config())
+
+    def test_check_cluster_config(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+        self.assertIsNone(mrc.check_cluster_config())
+
+        self._relate_clusters("mysql", "mysql-cell1", "mysql-cell2")
+        mrc.invalidate_relation_snapshot()
+        mrc.options.cluster_base_ports = "mysql-cell1=3316"
+        self.assertEqual(
+            "cluster-base-ports has no entry for mysql-cell2",
+            mrc.check_cluster_config())
+
+        mrc.options.cluster_base_ports = "mysql-cell1=3316 mysql-cell2=3320"
+        self.assertIsNone(mrc.check_cluster_config())
+
+        # Overlapping port ranges
+        mrc.options.cluster_base_ports = "mysql-cell1=3316 mysql-cell2=3318"
+        self.assertEqual(
+            "Router ports of mysql-cell1 and mysql-cell2 overlap",
+            mrc.check_cluster_config())
+        mrc.options.cluster_base_ports = "mysql-cell1=3309 mysql-cell2=3320"
+        self.assertEqual(
+            "Router ports of base-port and mysql-cell1 overlap",
+            mrc.check_cluster_config())
+        mrc.options.cluster_base_ports = "mysql-cell1=3304 mysql-cell2=3320"
+        self.assertEqual(
+            "Router ports of mysql-cell1 and base-port overlap",
+            mrc.check_cluster_config())
+
+        mrc.options.cluster_base_ports = "mysql-cell1=x mysql-cell2=3320"
+        self.assertEqual(
+            "cluster-base-ports of mysql-cell1 is not a port",
+            mrc.check_cluster_config())
+
+    def test_configure_sysctl(self):
+        self.patch_object(mysql_router.os.path, "exists")
+        self.patch_object(mysql_router.os, "remove")
+        self.patch_object(mysql_router.ch_core.host, "write_file")
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.subprocess.CalledProcessError = FakeException
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.effective_sysctl = mock.MagicMock()
+        mrc.effective_sysctl.return_value = {
+            "net.core.somaxconn": "4096", "net.ipv4.tcp_tw_reuse": "0"}
+        mrc.options.sysctl_profile = None
+        mrc.options.sysctl = (
+            "{net.core.somaxconn: 4096, net.ipv4.tcp_tw_reuse: 1}")
+
+        # Applied
+        mrc.configure_sysctl()
+        self.write_file.assert_called_once_with(
+            mysql_router.SYSCTL_CONF,
+            "net.core.somaxconn=4096\nnet.ipv4.tcp_tw_reuse=1\n",
+            perms=0o644)
+        self.subprocess.check_output.assert_called_once_with(
+            ["sysctl", "-p", mysql_router.SYSCTL_CONF],
+            stderr=self.stdout)
+        self.log.assert_any_call(
+            "sysctl net.ipv4.tcp_tw_reuse: configured 1, effective 0",
+            "INFO")
+
+        # Not applied
+        self.subprocess.check_output.side_effect = FakeException
+        mrc.configure_sysctl()
+        self.log.assert_any_call(
+            "Failed to apply {}: Mocked Exception"
+            .format(mysql_router.SYSCTL_CONF), "ERROR")
+
+        # Invalid, the applied parameters are kept
+        self.write_file.reset_mock()
+        self.exists.return_value = True
+        for _profile, _sysctl in (("fast", None), (None, "[1, 2]")):
+            mrc.options.sysctl_profile = _profile
+            mrc.options.sysctl = _sysctl
+            mrc.configure_sysctl()
+        self.remove.assert_not_called()
+        self.write_file.assert_not_called()
+        mrc.options.sysctl_profile = None
+
+        # No longer managed
+        self.write_file.reset_mock()
+        mrc.options.sysctl = None
+        self.exists.return_value = False
+        mrc.configure_sysctl()
+        self.remove.assert_not_called()
+        self.exists.return_value = True
+        mrc.configure_sysctl()
+        self.remove.assert_called_once_with(mysql_router.SYSCTL_CONF)
+        self.write_file.assert_not_called()
+
+    def test_effective_sysctl(self):
+        _tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, _tmpdir)
+        os.makedirs(os.path.join(_tmpdir, "net", "ipv4"))
+        with open(os.path.join(
+                _tmpdir, "net", "ipv4", "ip_local_port_range"), "w") as f:
+            f.write("10240\t65535\n")
+        self.patch_object(mysql_router, "PROC_SYS", new=_tmpdir)
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual(
+            {"net.ipv4.ip_local_port_range": "10240 65535",
+             "net.core.somaxconn": None},
+            mrc.effective_sysctl(
+                ["net.ipv4.ip_local_port_range", "net.core.somaxconn"]))
+
+    def test_sysctl_status(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.effective_sysctl = mock.MagicMock()
+        mrc.options.sysctl_profile = None
+        mrc.options.sysctl = None
+        self.assertIsNone(mrc.sysctl_status())
+
+        mrc.options.sysctl = (
+            "{net.core.somaxconn: 4096, net.ipv4.tcp_tw_reuse: 1, "
+            "net.ipv4.ip_local_port_range: 10240  65535}")
+        mrc.effective_sysctl.return_value = {
+            "net.core.somaxconn": "4096",
+            "net.ipv4.ip_local_port_range": "10240 65535",
+            "net.ipv4.tcp_tw_reuse": "0"}
+        self.assertEqual(
+            "sysctl: somaxconn=4096, ip_local_port_range=10240 65535, "
+            "tcp_tw_reuse=0 (not 1)", mrc.sysctl_status())
 
     def test_get_db_helper(self):
         self.patch_object(
@@ -290,6 +1186,288 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         _helper.connect.assert_called_once_with(
             _user, _pass, _addr)
 
+    def test_check_mysql_greeting(self):
+        self.patch_object(mysql_router, "read_server_greeting")
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Greeting on RW and RO sockets
+        self.read_server_greeting.return_value = "8.0.19"
+        self.assertTrue(mrc.check_mysql_greeting())
+        self.read_server_greeting.assert_has_calls([
+            mock.call(socket.AF_UNIX, RW_SOCKET),
+            mock.call(socket.AF_UNIX,
+                      RO_SOCKET)],
+            any_order=True)
+        self.assertEqual(2, len(self.read_server_greeting.mock_calls))
+
+        # No greeting
+        self.read_server_greeting.return_value = None
+        self.assertFalse(mrc.check_mysql_greeting())
+
+        # Not bootstrapped
+        self.mysqlrouter_conf.return_value = "/nonexistent/mysqlrouter.conf"
+        self.read_server_greeting.return_value = "8.0.19"
+        self.assertFalse(mrc.check_mysql_greeting())
+
+    def test_greeting_endpoint(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual(
+            (socket.AF_UNIX, "/tmp/mysql.sock"),
+            mrc.greeting_endpoint({"socket": "/tmp/mysql.sock",
+                                   "bind_port": 3306}))
+        self.assertEqual(
+            (socket.AF_INET, ("127.0.0.1", 3306)),
+            mrc.greeting_endpoint({"socket": None, "bind_port": 3306}))
+        self.assertIsNone(
+            mrc.greeting_endpoint({"socket": None, "bind_port": None}))
+
+    def test_check_router_health(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.check_mysql_connection = mock.MagicMock()
+        mrc.check_mysql_greeting = mock.MagicMock()
+
+        mrc.options.connection_check = "greeting"
+        self.assertEqual(
+            mrc.check_router_health(), mrc.check_mysql_greeting.return_value)
+        mrc.check_mysql_connection.assert_not_called()
+
+        mrc.options.connection_check = "login"
+        self.assertEqual(
+            mrc.check_router_health(),
+            mrc.check_mysql_connection.return_value)
+
+        mrc.check_rest_api_health = mock.MagicMock()
+        mrc.options.connection_check = "rest"
+        mrc.options.metrics_exporter = False
+        mrc.options.rest_api = True
+        self.assertEqual(
+            mrc.check_router_health(),
+            mrc.check_rest_api_health.return_value)
+
+        # REST API disabled
+        mrc.options.rest_api = False
+        self.assertEqual(
+            mrc.check_router_health(), mrc.check_mysql_greeting.return_value)
+
+    def test_check_mysql_connection_cached(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        self.patch_object(mysql_router.time, "time")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.connection_check_ttl = 300
+        mrc.check_router_health = mock.MagicMock()
+
+        # Checked and cached
+        self.time.return_value = 1000
+        mrc.check_router_health.return_value = True
+        self.assertTrue(mrc.check_mysql_connection_cached())
+        self.time.return_value = 1299
+        self.assertTrue(mrc.check_mysql_connection_cached())
+        mrc.check_router_health.assert_called_once_with()
+
+        # Expired, failures back off
+        self.time.return_value = 1300
+        mrc.check_router_health.return_value = False
+        self.assertFalse(mrc.check_mysql_connection_cached())
+        self.assertEqual(
+            1310, _kv.get(mysql_router.CONNECTION_CHECK)["expires"])
+        self.time.return_value = 1310
+        self.assertFalse(mrc.check_mysql_connection_cached())
+        self.assertEqual(
+            1330, _kv.get(mysql_router.CONNECTION_CHECK)["expires"])
+        self.assertEqual(3, len(mrc.check_router_health.mock_calls))
+
+        # Invalidated
+        mrc.check_router_health.return_value = True
+        mrc.invalidate_connection_check()
+        self.assertTrue(mrc.check_mysql_connection_cached())
+        self.assertEqual(
+            0, _kv.get(mysql_router.CONNECTION_CHECK)["failures"])
+        self.assertEqual(4, len(mrc.check_router_health.mock_calls))
+
+    def test_assess_status(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "action_name")
+        self.patch_object(mysql_router.ch_core.hookenv, "atexit")
+        self.action_name.return_value = None
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc._assess_status_now = mock.MagicMock()
+
+        # Coalesced
+        mrc.assess_status()
+        mrc.assess_status()
+        mrc.assess_status()
+        mrc._assess_status_now.assert_not_called()
+        self.atexit.assert_called_once_with(mrc._deferred_assess_status)
+
+        # Run at exit, after any pending restart
+        mrc._deferred_restart = mock.MagicMock()
+        mrc._deferred_assess_status()
+        mrc._deferred_restart.assert_called_once_with()
+        mrc._assess_status_now.assert_called_once_with()
+
+        # Next hook
+        self.atexit.reset_mock()
+        mrc.assess_status()
+        self.atexit.assert_called_once_with(mrc._deferred_assess_status)
+
+        # Actions
+        mrc._assess_status_now.reset_mock()
+        self.atexit.reset_mock()
+        self.action_name.return_value = "pause"
+        mrc.assess_status()
+        mrc._assess_status_now.assert_called_once_with()
+        self.atexit.assert_not_called()
+
+    def test_assess_status_at_exit(self):
+        # Exit callbacks as run by charmhelpers' hookenv._run_atexit,
+        # callbacks registered while they run are dropped
+        _atexit = []
+
+        def _run_atexit():
+            for callback, args, kwargs in reversed(_atexit):
+                callback(*args, **kwargs)
+            del _atexit[:]
+
+        self.patch_object(mysql_router.ch_core.hookenv, "action_name")
+        self.action_name.return_value = None
+        self.patch_object(mysql_router.ch_core.hookenv, "atexit")
+        self.atexit.side_effect = (
+            lambda callback, *args, **kwargs: _atexit.append(
+                (callback, args, kwargs)))
+        self.patch_object(
+            mysql_router.ch_core.hookenv, "application_version_set")
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "application_version",
+            new_callable=mock.PropertyMock)
+        self.application_version.return_value = "8.0.19"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc._assess_status = mock.MagicMock()
+        mrc.add_status_details = mock.MagicMock()
+        mrc._deferred_restart = mock.MagicMock()
+
+        mrc.assess_status()
+        mrc.assess_status()
+        _run_atexit()
+        mrc._assess_status.assert_called_once_with()
+        mrc.add_status_details.assert_called_once_with()
+        self.application_version_set.assert_called_once_with("8.0.19")
+        self.assertEqual([], _atexit)
+
+    def test_add_status_details(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "status_get")
+        self.patch_object(mysql_router.ch_core.hookenv, "status_set")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.topology_status = mock.MagicMock()
+        mrc.topology_status.return_value = "cluster members: 3"
+        mrc.sysctl_status = mock.MagicMock()
+        mrc.sysctl_status.return_value = None
+
+        # Active
+        self.status_get.return_value = ("active", "Unit is ready")
+        mrc.add_status_details()
+        self.status_set.assert_called_once_with(
+            "active", "Unit is ready, cluster members: 3")
+
+        # Kernel tuning
+        self.status_set.reset_mock()
+        mrc.sysctl_status.return_value = "sysctl: somaxconn=4096"
+        mrc.add_status_details()
+        self.status_set.assert_called_once_with(
+            "active",
+            "Unit is ready, cluster members: 3, sysctl: somaxconn=4096")
+
+        # Not active
+        self.status_set.reset_mock()
+        self.status_get.return_value = ("blocked", "Failed")
+        mrc.add_status_details()
+        self.status_set.assert_not_called()
+
+        # Unknown topology, kernel parameters not managed
+        self.status_get.return_value = ("active", "Unit is ready")
+        mrc.topology_status.return_value = None
+        mrc.sysctl_status.return_value = None
+        mrc.add_status_details()
+        self.status_set.assert_not_called()
+
+    def test_topology_status(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.cluster_members = mock.MagicMock()
+        mrc.rw_destination = mock.MagicMock()
+        mrc.cluster_members.return_value = [
+            "mysql://10.5.0.1:3306", "mysql://10.5.0.2:3306",
+            "mysql://10.5.0.3:3306"]
+        mrc.rw_destination.return_value = "10.5.0.2:3306"
+        self.assertEqual(
+            "cluster members: 3, primary: 10.5.0.2:3306",
+            mrc.topology_status())
+
+        mrc.rw_destination.return_value = None
+        self.assertEqual("cluster members: 3", mrc.topology_status())
+
+        mrc.cluster_members.return_value = None
+        self.assertIsNone(mrc.topology_status())
+
+    def test_cluster_members(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        _conf = self._write_mysqlrouter_conf()
+        _state_file = os.path.join(os.path.dirname(_conf), "state.json")
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "state_file")
+        self.state_file.return_value = _state_file
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.metadata_servers = mock.MagicMock()
+        mrc.metadata_servers.return_value = ["mysql://10.5.0.1:3306"]
+
+        # No state file
+        self.assertEqual(["mysql://10.5.0.1:3306"], mrc.cluster_members())
+        self.assertIsNone(_kv.get(mysql_router.CLUSTER_MEMBERS))
+
+        # Parsed and cached
+        with open(_state_file, "w") as f:
+            f.write("{}")
+        os.utime(_state_file, (1000, 1000))
+        mrc.metadata_servers.reset_mock()
+        self.assertEqual(["mysql://10.5.0.1:3306"], mrc.cluster_members())
+        mrc.metadata_servers.assert_called_once_with(mock.ANY)
+        mrc.metadata_servers.reset_mock()
+        self.assertEqual(["mysql://10.5.0.1:3306"], mrc.cluster_members())
+        mrc.metadata_servers.assert_not_called()
+
+        # Modified
+        os.utime(_state_file, (2000, 2000))
+        mrc.metadata_servers.return_value = ["mysql://10.5.0.2:3306"]
+        self.assertEqual(["mysql://10.5.0.2:3306"], mrc.cluster_members())
+
+        # Not bootstrapped
+        self.mysqlrouter_conf.return_value = "/nonexistent/mysqlrouter.conf"
+        self.assertIsNone(mrc.cluster_members())
+
+    def test_rw_destination(self):
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.rest_api_get = mock.MagicMock()
+        mrc.rest_api_get.return_value = {
+            "items": [{"address": "10.5.0.2", "port": 3306}]}
+
+        # REST API disabled
+        mrc.options.rest_api = False
+        mrc.options.metrics_exporter = False
+        self.assertIsNone(mrc.rw_destination())
+        mrc.rest_api_get.assert_not_called()
+
+        mrc.options.rest_api = True
+        self.assertEqual("10.5.0.2:3306", mrc.rw_destination())
+        mrc.rest_api_get.assert_called_once_with(
+            "routes/jujuCluster_rw/destinations")
+
+        # Unavailable
+        mrc.rest_api_get.return_value = None
+        self.assertIsNone(mrc.rw_destination())
+
     def test_custom_assess_status_check(self):
         _check = mock.MagicMock()
         _check.return_value = None, None
@@ -301,7 +1479,7 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         mrc.check_if_paused = _check
         mrc.check_interfaces = _check
         mrc.check_mandatory_config = _check
-        mrc.check_mysql_connection = _conn_check
+        mrc.check_mysql_connection_cached = _conn_check
 
         self.assertEqual((None, None), mrc.custom_assess_status_check())
         self.assertEqual(3, len(_check.mock_calls))
@@ -320,6 +1498,27 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             ("blocked", "Failed to connect to MySQL"),
             mrc.custom_assess_status_check())
 
+        # Invalid metadata cache options
+        mrc.options.metadata_ttl = -1
+        self.assertEqual(
+            ("blocked", "metadata-ttl must not be negative"),
+            mrc.custom_assess_status_check())
+
+        # Invalid kernel tuning options
+        mrc.options.metadata_ttl = None
+        mrc.options.sysctl = "[]"
+        self.assertEqual(
+            ("blocked", "sysctl must be a YAML dictionary"),
+            mrc.custom_assess_status_check())
+
+        # Additional cluster without a base port
+        mrc.options.sysctl = None
+        self._relate_clusters("mysql", "mysql-cell1")
+        mrc.invalidate_relation_snapshot()
+        self.assertEqual(
+            ("blocked", "cluster-base-ports has no entry for mysql-cell1"),
+            mrc.custom_assess_status_check())
+
     def test_bootstrap_mysqlrouter(self):
         _json_addr = '"10.10.10.60"'
         _json_pass = '"clusterpass"'
@@ -330,92 +1529,1259 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.endpoint_from_flag.return_value = self.db_router
         self.db_router.password.return_value = _json_pass
         self.db_router.db_host.return_value = _json_addr
+        self.patch_object(mysql_router.ch_core.host, "mkdir")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        self._relate_clusters("mysql")
 
         mrc = mysql_router.MySQLRouterCharm()
         mrc.options.system_user = _user
         mrc.options.base_port = _port
 
+        mrc.configure_rest_api = mock.MagicMock()
+        mrc.update_config_parameters = mock.MagicMock()
+        mrc.render_systemd_unit = mock.MagicMock()
+        mrc.configure_metrics_exporter = mock.MagicMock()
+        mrc.existing_bootstrap = mock.MagicMock()
+        mrc.existing_bootstrap.return_value = None
+        mrc.run_bootstrap = mock.MagicMock()
+        mrc.run_bootstrap.return_value = True
+
         # Successful
         mrc.bootstrap_mysqlrouter()
-        self.subprocess.check_output.assert_called_once_with(
+        mrc.configure_rest_api.assert_called_once_with()
+        mrc.update_config_parameters.assert_called_once_with(
+            mrc.config_parameters, mrc.config_sections)
+        mrc.render_systemd_unit.assert_called_once_with()
+        mrc.configure_metrics_exporter.assert_called_once_with()
+        mrc.run_bootstrap.assert_called_once_with(
             [mrc.mysqlrouter_bin, "--user", _user, "--bootstrap",
              "{}:{}@{}".format(mrc.db_router_user, _pass, _addr),
              "--directory", mrc.mysqlrouter_dir, "--conf-use-sockets",
-             "--conf-base-port", _port],
-            stderr=self.stdout)
+             "--socketsdir", "/var/lib/jujumysqlrouter/jujumysqlrouter",
+             "--conf-base-port", _port])
+        self.mkdir.assert_called_once_with(
+            "/var/lib/jujumysqlrouter/jujumysqlrouter", owner=_user,
+            perms=0o755)
+        self.set_flag.assert_called_once_with(
+            mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)
+        self.assertEqual("mysql", _kv.get(mysql_router.DEFAULT_CLUSTER))
+
+        # Reuse the existing bootstrap
+        mrc.run_bootstrap.reset_mock()
+        self.set_flag.reset_mock()
+        mrc.existing_bootstrap.return_value = "reusable"
+        mrc.bootstrap_mysqlrouter()
+        mrc.run_bootstrap.assert_not_called()
         self.set_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)
 
+        # Bootstrapped for another cluster
+        mrc.existing_bootstrap.return_value = "other-cluster"
+        mrc.bootstrap_mysqlrouter()
+        self.assertEqual("--force", mrc.run_bootstrap.call_args[0][0][-1])
+
+        # Additional cluster routers are recorded once
+        for _ in range(2):
+            with mrc.cluster_context("mysql-cell1"):
+                mrc.bootstrap_mysqlrouter()
+        self.assertEqual(
+            ["mysql-cell1"], _kv.get(mysql_router.CLUSTER_ROUTERS))
+
         # Fail
-        self.subprocess.reset_mock()
         self.set_flag.reset_mock()
-        self.subprocess.CalledProcessError = FakeException
-        self.subprocess.check_output.side_effect = (
-            self.subprocess.CalledProcessError)
+        mrc.existing_bootstrap.return_value = None
+        mrc.run_bootstrap.return_value = False
         mrc.bootstrap_mysqlrouter()
         self.set_flag.assert_not_called()
 
-    def test_start_mysqlrouter(self):
+    def test_run_bootstrap(self):
+        _clock = FakeClock()
+        self.patch_object(mysql_router.time, "time")
+        self.patch_object(mysql_router.time, "sleep")
+        self.time.side_effect = _clock.time
+        self.sleep.side_effect = _clock.sleep
+        self.patch_object(mysql_router.random, "uniform")
+        self.uniform.side_effect = lambda low, high: high
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.bootstrap_attempts = 5
+        mrc.options.bootstrap_timeout = 300
+        _returncodes = iter([1, 1, 0])
+
+        def _run_logged(cmd, timeout):
+            _clock.now += 1
+            return next(_returncodes)
+
+        mrc.run_logged = mock.MagicMock(side_effect=_run_logged)
+
+        # Succeeds on the third attempt
+        self.assertTrue(mrc.run_bootstrap(["bootstrap"]))
+        self.assertEqual(3, len(mrc.run_logged.mock_calls))
+        mrc.run_logged.assert_any_call(["bootstrap"], 300)
+        self.sleep.assert_has_calls([mock.call(2), mock.call(4)])
+        _history = _kv.get(mysql_router.BOOTSTRAP_HISTORY)
+        self.assertEqual(1, len(_history))
+        self.assertTrue(_history[0]["succeeded"])
+        self.assertEqual(9, _history[0]["duration"])
+        self.assertEqual(
+            [1, 1, 0], [a["returncode"] for a in _history[0]["attempts"]])
+
+        # Attempts exhausted
+        mrc.run_logged.reset_mock()
+        mrc.run_logged.side_effect = lambda cmd, timeout: 1
+        mrc.options.bootstrap_attempts = 2
+        self.assertFalse(mrc.run_bootstrap(["bootstrap"]))
+        self.assertEqual(2, len(mrc.run_logged.mock_calls))
+        _history = _kv.get(mysql_router.BOOTSTRAP_HISTORY)
+        self.assertFalse(_history[1]["succeeded"])
+
+        # Timed out
+        mrc.run_logged.reset_mock()
+        mrc.options.bootstrap_attempts = 5
+        mrc.options.bootstrap_timeout = 0
+        self.assertFalse(mrc.run_bootstrap(["bootstrap"]))
+        self.assertEqual(1, len(mrc.run_logged.mock_calls))
+
+    def test_run_logged(self):
+        self.patch_object(mysql_router.threading, "Timer")
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        _process = mock.MagicMock()
+        _process.stdout = iter(["Bootstrapping\n", "Done\n"])
+        _process.wait.return_value = 0
+        self.subprocess.Popen.return_value = _process
+        mrc = mysql_router.MySQLRouterCharm()
+
+        self.assertEqual(0, mrc.run_logged(["bootstrap"], 60))
+        self.subprocess.Popen.assert_called_once_with(
+            ["bootstrap"], stdout=self.stdout, stderr=self.stdout,
+            universal_newlines=True)
+        self.log.assert_has_calls([
+            mock.call("Bootstrapping", "INFO"), mock.call("Done", "INFO")])
+        self.Timer.assert_called_once_with(60, _process.kill)
+        self.Timer.return_value.cancel.assert_called_once_with()
+
+    def test_existing_bootstrap(self):
+        # As written by the bootstrap, with the account it created
+        _dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, _dir)
+        self._write_mysqlrouter_conf(MYSQLROUTER_CONF.replace(
+            "router_id=1\n",
+            "router_id=1\nuser=mysql_router1_8xkr3q0bi1oa\n"
+            "metadata_cluster=jujuCluster\n"
+            "dynamic_state={}/data/state.json\n".format(_dir)))
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_dir",
+            new_callable=mock.PropertyMock)
+        self.mysqlrouter_dir.return_value = _dir
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "cluster_address",
+            new_callable=mock.PropertyMock)
+        self.cluster_address.return_value = "10.5.0.1"
+        self.endpoint_from_flag.return_value = self.db_router
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # No keyring
+        self.assertIsNone(mrc.existing_bootstrap())
+
+        os.mkdir(os.path.join(_dir, "data"))
+        for path in ("mysqlrouter.key", "data/keyring"):
+            with open(os.path.join(_dir, path), "w") as f:
+                f.write("secret")
+        _state = {
+            "metadata-cache": {
+                "group-replication-id":
+                    "4d1a6f3e-3a35-11ea-9c1c-00163e5b2b5c",
+                "cluster-metadata-servers": [
+                    "mysql://10.5.0.1:3306", "mysql://10.5.0.2:3306"]},
+            "version": "1.0.0"}
+        with open(os.path.join(_dir, "data", "state.json"), "w") as f:
+            json.dump(_state, f)
+        self.assertEqual("reusable", mrc.existing_bootstrap())
+
+        # Another cluster
+        self.cluster_address.return_value = "10.5.0.10"
+        self.assertEqual("other-cluster", mrc.existing_bootstrap())
+
+        # Not bootstrapped
+        self.mysqlrouter_conf.return_value = "/nonexistent/mysqlrouter.conf"
+        self.assertIsNone(mrc.existing_bootstrap())
+
+    def test_metadata_servers(self):
+        _conf = self._write_mysqlrouter_conf(MYSQLROUTER_CONF.replace(
+            "router_id=1\n",
+            "router_id=1\nbootstrap_server_addresses="
+            "mysql://10.5.0.1:3306,mysql://10.5.0.2:3306\n"))
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_dir",
+            new_callable=mock.PropertyMock)
+        self.mysqlrouter_dir.return_value = os.path.dirname(_conf)
+        mrc = mysql_router.MySQLRouterCharm()
+        _section = mrc.read_mysqlrouter_conf()["metadata_cache:jujuCluster"]
+
+        # No state file
+        self.assertEqual(
+            ["mysql://10.5.0.1:3306", "mysql://10.5.0.2:3306"],
+            mrc.metadata_servers(_section))
+
+        # State file
+        _state_file = os.path.join(os.path.dirname(_conf), "state.json")
+        with open(_state_file, "w") as f:
+            json.dump({"metadata-cache": {"cluster-metadata-servers": [
+                "mysql://10.5.0.3:3306"]}}, f)
+        _section["dynamic_state"] = _state_file
+        self.assertEqual(
+            ["mysql://10.5.0.3:3306"], mrc.metadata_servers(_section))
+
+    def test_render_systemd_unit(self):
+        self.patch_object(mysql_router.ch_core.templating, "render")
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
+        self.patch_object(mysql_router.ch_core.host, "service")
         _user = "ubuntu"
-        _port = "3006"
         mrc = mysql_router.MySQLRouterCharm()
         mrc.options.system_user = _user
-        mrc.options.base_port = _port
+        mrc.options.service_limit_nofile = 65536
+        mrc.options.service_restart = "on-failure"
+        mrc.options.service_cpu_quota = "200%"
+        mrc.options.service_memory_max = None
+        mrc.options.service_cpu_affinity = "0-3"
+        mrc.options.service_nice = 5
+
+        # Changed
+        self.file_hash.side_effect = [None, "abc"]
+        self.assertTrue(mrc.render_systemd_unit())
+        self.render.assert_called_once_with(
+            source="jujumysqlrouter.service",
+            target="/etc/systemd/system/jujumysqlrouter.service",
+            context={
+                "mysqlrouter_bin": mrc.mysqlrouter_bin,
+                "mysqlrouter_conf": mrc.mysqlrouter_conf,
+                "system_user": _user,
+                "sockets_dir": "/var/lib/jujumysqlrouter/jujumysqlrouter",
+                "limit_nofile": 65536,
+                "restart": "on-failure",
+                "cpu_quota": "200%",
+                "memory_max": None,
+                "cpu_affinity": "0-3",
+                "nice": 5},
+            perms=0o644)
+        self.subprocess.check_call.assert_called_once_with(
+            ["systemctl", "daemon-reload"])
+        self.service.assert_called_once_with(
+            "enable", mysql_router.MYSQLROUTER_SERVICE)
+
+        # Unchanged
+        self.subprocess.reset_mock()
+        self.file_hash.side_effect = ["abc", "abc"]
+        self.assertFalse(mrc.render_systemd_unit())
+
+        # Additional cluster rendered from the same template
+        self.render.reset_mock()
+        self.file_hash.side_effect = [None, "abc"]
+        with mrc.cluster_context("mysql-cell1"):
+            self.assertTrue(mrc.render_systemd_unit())
+        _kwargs = self.render.call_args[1]
+        self.assertEqual("jujumysqlrouter.service", _kwargs["source"])
+        self.assertEqual(
+            "/etc/systemd/system/jujumysqlrouter-mysql-cell1.service",
+            _kwargs["target"])
+        self.assertEqual(
+            "/home/ubuntu/mysqlrouter-mysql-cell1/mysqlrouter.conf",
+            _kwargs["context"]["mysqlrouter_conf"])
+        self.service.assert_called_with(
+            "enable", "jujumysqlrouter-mysql-cell1")
+        self.subprocess.check_call.assert_not_called()
+
+    def test_configure_metrics_exporter(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "charm_dir")
+        self.patch_object(mysql_router.ch_core.host, "write_file")
+        self.patch_object(mysql_router.ch_core.host, "service")
+        self.patch_object(mysql_router.ch_core.host, "service_stop")
+        self.patch_object(mysql_router.os, "remove")
+        self.patch_object(mysql_router.os.path, "exists")
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "rest_api_password",
+            new_callable=mock.PropertyMock)
+        self.rest_api_password.return_value = "restpass"
+        self.charm_dir.return_value = os.path.join(
+            os.path.dirname(__file__), "..", "src")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+        mrc.options.rest_api_port = 8081
+        mrc.options.metrics_exporter_bind_address = "0.0.0.0"
+        mrc.options.metrics_exporter_port = 9101
+        mrc._render_service_unit = mock.MagicMock()
+
+        # Enabled
+        mrc.options.metrics_exporter = True
+        mrc.configure_metrics_exporter()
+        self.write_file.assert_any_call(
+            "/usr/local/bin/jujumysqlrouter-exporter", mock.ANY,
+            perms=0o755)
+        self.write_file.assert_any_call(
+            "/home/ubuntu/mysqlrouter/exporter.json",
+            json.dumps({
+                "bind_address": "0.0.0.0",
+                "password": "restpass",
+                "port": 9101,
+                "rest_api_url": "http://127.0.0.1:8081",
+                "user": "charm"}, sort_keys=True),
+            owner="ubuntu", perms=0o600)
+        mrc._render_service_unit.assert_called_once_with(
+            mysql_router.EXPORTER_SERVICE,
+            "/etc/systemd/system/jujumysqlrouter-exporter.service",
+            {"system_user": "ubuntu",
+             "exporter_bin": "/usr/local/bin/jujumysqlrouter-exporter",
+             "exporter_conf": "/home/ubuntu/mysqlrouter/exporter.json"})
+        self.service_stop.assert_not_called()
+
+        # Disabled, not installed
+        self.write_file.reset_mock()
+        mrc.options.metrics_exporter = False
+        self.exists.return_value = False
+        mrc.configure_metrics_exporter()
+        self.write_file.assert_not_called()
+        self.service_stop.assert_not_called()
+
+        # Disabled, installed
+        self.exists.return_value = True
+        mrc.configure_metrics_exporter()
+        self.service_stop.assert_called_once_with(
+            mysql_router.EXPORTER_SERVICE)
+        self.service.assert_called_once_with(
+            "disable", mysql_router.EXPORTER_SERVICE)
+        self.remove.assert_called_once_with(
+            "/etc/systemd/system/jujumysqlrouter-exporter.service")
+        self.subprocess.check_call.assert_called_once_with(
+            ["systemctl", "daemon-reload"])
+
+    def test_start_mysqlrouter(self):
+        self.patch_object(mysql_router.ch_core.host, "service_start")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_fingerprint",
+            new_callable=mock.PropertyMock)
+        self.mysqlrouter_fingerprint.return_value = "fingerprint"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.metrics_exporter = False
+        mrc.wait_for_mysqlrouter = mock.MagicMock()
+        mrc.render_systemd_unit = mock.MagicMock()
 
         # Successful
+        self.service_start.return_value = True
+        mrc.wait_for_mysqlrouter.return_value = 1.5
         mrc.start_mysqlrouter()
-        self.subprocess.Popen.assert_called_once_with(
-            ["/home/ubuntu/mysqlrouter/start.sh"],
-            bufsize=1,
-            stdout=self.stdout,
-            stderr=self.stdout,
-            universal_newlines=True)
+        mrc.render_systemd_unit.assert_called_once_with()
+        self.service_start.assert_called_once_with(
+            mysql_router.MYSQLROUTER_SERVICE)
         self.set_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_STARTED)
+        self.assertEqual(1.5, _kv.get(mysql_router.TIME_TO_READY))
+        self.assertEqual(
+            "fingerprint", _kv.get(mysql_router.MYSQLROUTER_FINGERPRINT))
 
-        # Fail
-        self.subprocess.reset_mock()
+        # Not ready
         self.set_flag.reset_mock()
-        self.subprocess.CalledProcessError = FakeException
-        self.subprocess.Popen.side_effect = self.subprocess.CalledProcessError
+        mrc.wait_for_mysqlrouter.return_value = None
         mrc.start_mysqlrouter()
         self.set_flag.assert_not_called()
 
+        # Fail
+        mrc.wait_for_mysqlrouter.reset_mock()
+        self.service_start.return_value = False
+        mrc.start_mysqlrouter()
+        self.set_flag.assert_not_called()
+        mrc.wait_for_mysqlrouter.assert_not_called()
+
+        # Paused
+        self.service_start.reset_mock()
+        self.is_unit_paused_set.return_value = True
+        mrc.start_mysqlrouter()
+        self.service_start.assert_not_called()
+        self.set_flag.assert_not_called()
+
     def test_stop_mysqlrouter(self):
-        _user = "ubuntu"
-        _port = "3306"
+        self.patch_object(mysql_router.ch_core.host, "service_stop")
         mrc = mysql_router.MySQLRouterCharm()
-        mrc.options.system_user = _user
-        mrc.options.base_port = _port
 
         # Successful
+        self.service_stop.return_value = True
         mrc.stop_mysqlrouter()
-        self.subprocess.Popen.assert_called_once_with(
-            ["/home/ubuntu/mysqlrouter/stop.sh"],
-            bufsize=1,
-            stdout=self.stdout,
-            stderr=self.stdout,
-            universal_newlines=True)
-
+        self.service_stop.assert_called_once_with(
+            mysql_router.MYSQLROUTER_SERVICE)
         self.clear_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_STARTED)
 
         # Fail
-        self.subprocess.reset_mock()
         self.clear_flag.reset_mock()
-        self.subprocess.CalledProcessError = FakeException
-        self.subprocess.Popen.side_effect = self.subprocess.CalledProcessError
+        self.service_stop.return_value = False
         mrc.stop_mysqlrouter()
         self.clear_flag.assert_not_called()
 
     def test_restart_mysqlrouter(self):
+        self.patch_object(mysql_router.ch_core.host, "service_restart")
         mrc = mysql_router.MySQLRouterCharm()
-        mrc.stop_mysqlrouter = mock.MagicMock()
-        mrc.start_mysqlrouter = mock.MagicMock()
+        mrc.mysqlrouter_started = mock.MagicMock()
 
+        # Successful
+        self.service_restart.return_value = True
+        mrc.restart_mysqlrouter()
+        self.service_restart.assert_called_once_with(
+            mysql_router.MYSQLROUTER_SERVICE)
+        mrc.mysqlrouter_started.assert_called_once_with()
+        self.clear_flag.assert_not_called()
+
+        # Fail
+        mrc.mysqlrouter_started.reset_mock()
+        self.service_restart.return_value = False
         mrc.restart_mysqlrouter()
-        mrc.stop_mysqlrouter.assert_called_once()
-        mrc.start_mysqlrouter.assert_called_once()
+        mrc.mysqlrouter_started.assert_not_called()
+        self.clear_flag.assert_called_once_with(
+            mysql_router.MYSQL_ROUTER_STARTED)
+
+    def test_mysqlrouter_fingerprint(self):
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
+        _hashes = {"/home/ubuntu/mysqlrouter/mysqlrouter.conf": "conf"}
+        self.file_hash.side_effect = _hashes.get
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+        _fingerprint = mrc.mysqlrouter_fingerprint
+        self.file_hash.assert_any_call(
+            "/home/ubuntu/mysqlrouter/data/keyring")
+        self.file_hash.assert_any_call(
+            "/etc/systemd/system/jujumysqlrouter.service")
+        self.assertEqual(_fingerprint, mrc.mysqlrouter_fingerprint)
+
+        # Changed
+        _hashes["/home/ubuntu/mysqlrouter/mysqlrouter.conf"] = "changed"
+        self.assertNotEqual(_fingerprint, mrc.mysqlrouter_fingerprint)
+
+    def test_request_restart(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "action_name")
+        self.patch_object(mysql_router.ch_core.hookenv, "atexit")
+        self.action_name.return_value = None
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc._deferred_restart = mock.MagicMock()
+
+        # Merged
+        mrc.request_restart()
+        mrc.request_restart()
+        self.atexit.assert_called_once_with(mrc._deferred_restart)
+        mrc._deferred_restart.assert_not_called()
+        self.assertEqual(2, mrc._restart_requests)
+
+        # Actions
+        self.atexit.reset_mock()
+        mrc._restart_requests = 0
+        self.action_name.return_value = "router-stats"
+        mrc.request_restart()
+        mrc._deferred_restart.assert_called_once_with()
+        self.atexit.assert_not_called()
+
+    def test_deferred_restart(self):
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_fingerprint",
+            new_callable=mock.PropertyMock)
+        self.mysqlrouter_fingerprint.return_value = "new"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.restart_mysqlrouter = mock.MagicMock()
+
+        # No requests
+        mrc._deferred_restart()
+        mrc.restart_mysqlrouter.assert_not_called()
+
+        # Not started
+        self.is_flag_set.return_value = False
+        mrc._restart_requests = 2
+        mrc._deferred_restart()
+        mrc.restart_mysqlrouter.assert_not_called()
+        self.assertEqual(0, mrc._restart_requests)
+
+        # Unchanged
+        self.is_flag_set.return_value = True
+        _kv.set(mysql_router.MYSQLROUTER_FINGERPRINT, "new")
+        mrc._restart_requests = 2
+        mrc._deferred_restart()
+        mrc.restart_mysqlrouter.assert_not_called()
+
+        # Changed, restarted once
+        _kv.set(mysql_router.MYSQLROUTER_FINGERPRINT, "old")
+        mrc._restart_requests = 3
+        mrc._deferred_restart()
+        mrc.restart_mysqlrouter.assert_called_once_with()
+        self.assertEqual(0, mrc._restart_requests)
+
+        # Changed while paused
+        mrc.restart_mysqlrouter.reset_mock()
+        self.is_unit_paused_set.return_value = True
+        mrc._restart_requests = 1
+        mrc._deferred_restart()
+        mrc.restart_mysqlrouter.assert_not_called()
+        self.assertEqual(0, mrc._restart_requests)
+
+    def test_configure_additional_clusters(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set")
+        _flags = set()
+        self.is_flag_set.side_effect = lambda flag: flag in _flags
+        _mysql, _cell1, _cell2 = self._relate_clusters(
+            "mysql", "mysql-cell1", "mysql-cell2")
+        _cell1.joined_units.received_raw = {
+            "db_host": '"10.5.1.10"', "mysqlrouter_password": '"pass1"'}
+        _cell2.joined_units.received_raw = {"db_host": '"10.5.2.10"'}
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.cluster_base_ports = "mysql-cell1=3316"
+        mrc.remove_departed_clusters = mock.MagicMock()
+        _called = []
+
+        def _record(name):
+            def _method(*args):
+                _called.append((name, mrc._cluster))
+                if name == "bootstrap_mysqlrouter":
+                    _flags.add(mrc.scoped(
+                        mysql_router.MYSQL_ROUTER_BOOTSTRAPPED))
+            return _method
+
+        for name in ("bootstrap_mysqlrouter", "start_mysqlrouter",
+                     "update_config_parameters", "render_systemd_unit",
+                     "restart_if_changed"):
+            setattr(mrc, name, _record(name))
+
+        # mysql-cell2 lacks a base port
+        mrc.configure_additional_clusters()
+        mrc.remove_departed_clusters.assert_called_once_with()
+        self.assertEqual([], _called)
+
+        # Bootstrapped and started, mysql-cell2 waits on its password
+        mrc.options.cluster_base_ports = "mysql-cell1=3316 mysql-cell2=3326"
+        mrc.configure_additional_clusters()
+        self.assertEqual(
+            [("bootstrap_mysqlrouter", "mysql-cell1"),
+             ("start_mysqlrouter", "mysql-cell1")], _called)
+        self.assertIsNone(mrc._cluster)
+
+        # Reconfigured and restarted if changed
+        _called.clear()
+        _flags.add(mysql_router.MYSQL_ROUTER_STARTED + ".mysql-cell1")
+        mrc.configure_additional_clusters()
+        self.assertEqual(
+            [("update_config_parameters", "mysql-cell1"),
+             ("render_systemd_unit", "mysql-cell1"),
+             ("restart_if_changed", "mysql-cell1")], _called)
+
+        # Waiting on credentials
+        _called.clear()
+        _flags.clear()
+        _cell1.joined_units.received_raw = {}
+        mrc.invalidate_relation_snapshot()
+        mrc.configure_additional_clusters()
+        self.assertEqual([], _called)
+
+    def test_remove_departed_clusters(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        _kv.set(mysql_router.DEFAULT_CLUSTER, "mysql")
+        _kv.set(mysql_router.CLUSTER_ROUTERS, ["mysql-cell1", "mysql-cell2"])
+        self._relate_clusters("mysql", "mysql-cell1", "mysql-cell2")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.remove_cluster_router = mock.MagicMock()
+
+        # Nothing departed
+        mrc.remove_departed_clusters()
+        mrc.remove_cluster_router.assert_not_called()
+
+        # An additional cluster departed
+        self._relate_clusters("mysql", "mysql-cell2")
+        mrc.invalidate_relation_snapshot()
+        mrc.remove_departed_clusters()
+        mrc.remove_cluster_router.assert_called_once_with("mysql-cell1")
+
+        # The default cluster departed, mysql-cell2 becomes the default and
+        # is bootstrapped again as such
+        mrc.remove_cluster_router.reset_mock()
+        _kv.set(mysql_router.CLUSTER_ROUTERS, ["mysql-cell2"])
+        self._relate_clusters("mysql-cell2")
+        mrc.invalidate_relation_snapshot()
+        mrc.remove_departed_clusters()
+        mrc.remove_cluster_router.assert_has_calls(
+            [mock.call(None), mock.call("mysql-cell2")])
+        self.assertIsNone(_kv.get(mysql_router.DEFAULT_CLUSTER))
+        self.assertEqual("mysql-cell2", mrc.default_cluster)
+
+    def test_remove_cluster_router(self):
+        self.patch_object(mysql_router.ch_core.host, "service_stop")
+        self.patch_object(mysql_router.ch_core.host, "service")
+        self.patch_object(mysql_router.os.path, "exists")
+        self.exists.return_value = True
+        self.patch_object(mysql_router.os, "remove")
+        self.patch_object(mysql_router.shutil, "rmtree")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        _kv.set(mysql_router.CLUSTER_ROUTERS, ["mysql-cell1", "mysql-cell2"])
+        for _key in (mysql_router.TIME_TO_READY,
+                     mysql_router.MYSQLROUTER_FINGERPRINT):
+            _kv.set(_key, "default")
+            _kv.set(_key + ".mysql-cell1", "cell1")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+
+        # Additional cluster
+        mrc.remove_cluster_router("mysql-cell1")
+        self.service_stop.assert_called_once_with(
+            "jujumysqlrouter-mysql-cell1")
+        self.service.assert_called_once_with(
+            "disable", "jujumysqlrouter-mysql-cell1")
+        self.remove.assert_called_once_with(
+            "/etc/systemd/system/jujumysqlrouter-mysql-cell1.service")
+        self.subprocess.check_call.assert_called_once_with(
+            ["systemctl", "daemon-reload"])
+        self.rmtree.assert_has_calls([
+            mock.call("/home/ubuntu/mysqlrouter-mysql-cell1",
+                      ignore_errors=True),
+            mock.call("/var/lib/jujumysqlrouter/jujumysqlrouter-mysql-cell1",
+                      ignore_errors=True)])
+        self.clear_flag.assert_has_calls([
+            mock.call(mysql_router.MYSQL_ROUTER_STARTED + ".mysql-cell1"),
+            mock.call(
+                mysql_router.MYSQL_ROUTER_BOOTSTRAPPED + ".mysql-cell1")])
+        self.assertIsNone(
+            _kv.get(mysql_router.TIME_TO_READY + ".mysql-cell1"))
+        self.assertIsNone(
+            _kv.get(mysql_router.MYSQLROUTER_FINGERPRINT + ".mysql-cell1"))
+        self.assertEqual("default", _kv.get(mysql_router.TIME_TO_READY))
+        self.assertEqual(
+            ["mysql-cell2"], _kv.get(mysql_router.CLUSTER_ROUTERS))
+        self.assertIsNone(mrc._cluster)
+
+        # The default cluster keeps its unit and directory
+        self.service.reset_mock()
+        self.rmtree.reset_mock()
+        self.clear_flag.reset_mock()
+        mrc.remove_cluster_router(None)
+        self.service_stop.assert_called_with(
+            mysql_router.MYSQLROUTER_SERVICE)
+        self.service.assert_not_called()
+        self.rmtree.assert_not_called()
+        self.clear_flag.assert_has_calls([
+            mock.call(mysql_router.MYSQL_ROUTER_STARTED),
+            mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)])
+        self.assertIsNone(_kv.get(mysql_router.TIME_TO_READY))
+        self.assertEqual(
+            ["mysql-cell2"], _kv.get(mysql_router.CLUSTER_ROUTERS))
+
+    def test_handler_timings(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual({}, mrc.handler_timings())
+
+        self.kv.return_value.set(mysql_router.HANDLER_TIMINGS, [
+            {"name": "start_mysqlrouter", "seconds": seconds}
+            for seconds in (0.1, 0.2, 0.3, 0.4, 5.0)] + [
+            {"name": "db_router_request", "seconds": 0.0125}])
+        self.assertEqual(
+            {"start_mysqlrouter": {
+                "count": 5, "p50-ms": 300.0, "p95-ms": 5000.0,
+                "max-ms": 5000.0},
+             "db_router_request": {
+                "count": 1, "p50-ms": 12.5, "p95-ms": 12.5,
+                "max-ms": 12.5}},
+            mrc.handler_timings())
+
+    def test_routes(self):
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        _routes = mrc.routes
+        self.assertEqual(
+            sorted(_routes.keys()),
+            ["jujuCluster_ro", "jujuCluster_rw",
+             "jujuCluster_x_ro", "jujuCluster_x_rw"])
+        self.assertEqual(
+            _routes["jujuCluster_ro"],
+            {"bind_address": "0.0.0.0",
+             "bind_port": 3307,
+             "socket": RO_SOCKET,
+             "protocol": "classic",
+             "destinations":
+                "metadata-cache://jujuCluster/?role=SECONDARY"})
+
+    def test_route_ports(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+
+        # Not yet bootstrapped
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "routes",
+            new_callable=mock.PropertyMock)
+        self.routes.return_value = {}
+        self.assertEqual(
+            mrc.route_ports,
+            {"rw": 3306, "ro": 3307, "x_rw": 3308, "x_ro": 3309})
+
+        # Bootstrapped
+        self.routes.return_value = {
+            "jujuCluster_rw": {"bind_port": 4306},
+            "jujuCluster_ro": {"bind_port": 4307},
+            "jujuCluster_x_rw": {"bind_port": 4308},
+            "jujuCluster_x_ro": {"bind_port": None}}
+        self.assertEqual(
+            mrc.route_ports,
+            {"rw": 4306, "ro": 4307, "x_rw": 4308, "x_ro": 3309})
+
+        # Base port of the cluster removed or invalid
+        for _base_ports in (None, "mysql-cell1=x"):
+            mrc.options.cluster_base_ports = _base_ports
+            with mrc.cluster_context("mysql-cell1"):
+                self.assertIsNone(mrc.base_port)
+                self.assertEqual(
+                    mrc.route_ports,
+                    {"rw": 4306, "ro": 4307, "x_rw": 4308})
+
+    def test_route_sockets(self):
+        self._write_mysqlrouter_conf()
+        self.patch_object(mysql_router.os.path, "exists")
+        self.exists.return_value = True
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+        self.assertEqual(
+            mrc.route_sockets,
+            {"rw": RW_SOCKET,
+             "ro": RO_SOCKET})
+
+        # Not under sockets_dir
+        with mrc.cluster_context("mysql-cell1"):
+            self.assertEqual(mrc.route_sockets, {})
+
+        # Not created
+        self.exists.return_value = False
+        self.assertEqual(mrc.route_sockets, {})
+
+    def test_additional_connection_info(self):
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "route_ports",
+            new_callable=mock.PropertyMock)
+        self.route_ports.return_value = {
+            "rw": 3306, "ro": 3307, "x_rw": 3308, "x_ro": 3309}
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "route_sockets",
+            new_callable=mock.PropertyMock)
+        self.route_sockets.return_value = {
+            "rw": RW_SOCKET,
+            "ro": RO_SOCKET}
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Not opted in
+        mrc.options.read_only_prefixes = None
+        self.assertEqual(
+            mrc.additional_connection_info("nova"),
+            {"nova_db_socket": RW_SOCKET,
+             "nova_db_port": None,
+             "nova_db_ro_socket": None,
+             "nova_db_ro_port": None,
+             "nova_db_x_port": None,
+             "nova_db_x_ro_port": None})
+
+        # Prefix opted in
+        mrc.options.read_only_prefixes = "nova novaapi"
+        self.assertEqual(
+            mrc.additional_connection_info("nova"),
+            {"nova_db_socket": RW_SOCKET,
+             "nova_db_port": None,
+             "nova_db_ro_socket": RO_SOCKET,
+             "nova_db_ro_port": 3307,
+             "nova_db_x_port": 3308,
+             "nova_db_x_ro_port": 3309})
+        self.assertEqual(
+            mrc.additional_connection_info(mrc._unprefixed),
+            {"db_socket": RW_SOCKET,
+             "db_port": None,
+             "db_ro_socket": None,
+             "db_ro_port": None,
+             "db_x_port": None,
+             "db_x_ro_port": None})
+
+        # Unprefixed opted in
+        mrc.options.read_only_prefixes = "unprefixed"
+        self.assertEqual(
+            mrc.additional_connection_info(mrc._unprefixed),
+            {"db_socket": RW_SOCKET,
+             "db_port": None,
+             "db_ro_socket": RO_SOCKET,
+             "db_ro_port": 3307,
+             "db_x_port": 3308,
+             "db_x_ro_port": 3309})
+
+        # All opted in
+        mrc.options.read_only_prefixes = "all"
+        _info = mrc.additional_connection_info("novacell0")
+        self.assertEqual(_info["novacell0_db_ro_port"], 3307)
+
+        # Served by an additional cluster
+        mrc.options.read_only_prefixes = None
+        with mrc.cluster_context("mysql-cell1"):
+            _info = mrc.additional_connection_info("novacell1")
+        self.assertEqual(_info["novacell1_db_port"], 3306)
+        self.assertIsNone(_info["novacell1_db_ro_port"])
+
+    def test_route_endpoints(self):
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        _endpoints = mrc.route_endpoints
+        self.assertEqual(8, len(_endpoints))
+        self.assertIn(
+            (socket.AF_INET, ("127.0.0.1", 3306)), _endpoints)
+        self.assertIn(
+            (socket.AF_UNIX, RW_SOCKET),
+            _endpoints)
+
+    def test_wait_for_mysqlrouter(self):
+        self.patch_object(mysql_router, "endpoint_accepting")
+        self.patch_object(mysql_router.time, "time")
+        self.patch_object(mysql_router.time, "sleep")
+        _rw = (socket.AF_INET, ("127.0.0.1", 3306))
+        _sock = (socket.AF_UNIX, RW_SOCKET)
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "route_endpoints",
+            new_callable=mock.PropertyMock)
+        self.route_endpoints.return_value = [_rw, _sock]
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.service_ready_timeout = 10
+
+        # Ready after backing off
+        self.time.side_effect = [100, 100.5, 101.5]
+        self.endpoint_accepting.side_effect = [True, False, True]
+        self.assertEqual(1.5, mrc.wait_for_mysqlrouter())
+        self.endpoint_accepting.assert_has_calls([
+            mock.call(*_rw), mock.call(*_sock), mock.call(*_sock)])
+        self.sleep.assert_called_once_with(0.1)
+
+        # Timeout
+        self.sleep.reset_mock()
+        self.time.side_effect = [100, 104, 108, 112]
+        self.endpoint_accepting.side_effect = None
+        self.endpoint_accepting.return_value = False
+        self.assertIsNone(mrc.wait_for_mysqlrouter())
+        self.sleep.assert_has_calls([mock.call(0.1), mock.call(0.2)])
+
+    def test_update_config_parameters(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        _conf = self._write_mysqlrouter_conf()
+        _params = {"routing": {"max_connections": 1024,
+                               "connect_timeout": None}}
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Changed
+        self.assertTrue(mrc.update_config_parameters(_params))
+        with open(_conf) as f:
+            _contents = f.read()
+        self.assertEqual(4, _contents.count("max_connections=1024"))
+        self.assertNotIn("connect_timeout", _contents)
+        self.assertIn("ttl=0.5", _contents)
+
+        # Unchanged
+        _mtime = os.stat(_conf).st_mtime_ns
+        self.assertFalse(mrc.update_config_parameters(_params))
+        self.assertEqual(_mtime, os.stat(_conf).st_mtime_ns)
+
+    def test_update_config_parameters_default(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self._write_mysqlrouter_conf()
+        _params = {"DEFAULT": {"max_total_connections": 4096}}
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertTrue(mrc.update_config_parameters(_params))
+        _config = mrc.read_mysqlrouter_conf()
+        self.assertEqual("4096", _config.defaults()["max_total_connections"])
+        self.assertEqual("system", _config.defaults()["name"])
+        self.assertFalse(mrc.update_config_parameters(_params))
+
+    def test_update_config_parameters_sections(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        _conf = self._write_mysqlrouter_conf()
+        _sections = {"http_server": {"port": 8081, "ssl": 0},
+                     "rest_api": {}}
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Added
+        self.assertTrue(mrc.update_config_parameters({}, _sections))
+        _config = mrc.read_mysqlrouter_conf()
+        self.assertEqual("8081", _config["http_server"]["port"])
+        self.assertTrue(_config.has_section("rest_api"))
+
+        # Unchanged
+        self.assertFalse(mrc.update_config_parameters({}, _sections))
+
+        # Updated
+        _sections["http_server"]["port"] = 8082
+        self.assertTrue(mrc.update_config_parameters({}, _sections))
+        self.assertEqual(
+            "8082", mrc.read_mysqlrouter_conf()["http_server"]["port"])
+
+        # Removed
+        _sections = {"http_server": None, "rest_api": None}
+        self.assertTrue(mrc.update_config_parameters({}, _sections))
+        _config = mrc.read_mysqlrouter_conf()
+        self.assertFalse(_config.has_section("http_server"))
+        self.assertFalse(_config.has_section("rest_api"))
+        self.assertFalse(mrc.update_config_parameters({}, _sections))
+        with open(_conf) as f:
+            self.assertIn("[routing:jujuCluster_rw]", f.read())
+
+    def test_update_config_parameters_restore(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        self._write_mysqlrouter_conf(
+            MYSQLROUTER_CONF + "\n[connection_pool]\n"
+            "max_idle_server_connections=64\n")
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Not changed by the charm, left as bootstrapped
+        _pool = {"max_idle_server_connections": None, "idle_timeout": None}
+        self.assertFalse(
+            mrc.update_config_parameters({}, {"connection_pool": _pool}))
+
+        # Set
+        _pool = {"max_idle_server_connections": 32, "idle_timeout": 10}
+        self.assertTrue(
+            mrc.update_config_parameters({}, {"connection_pool": _pool}))
+        _config = mrc.read_mysqlrouter_conf()
+        self.assertEqual(
+            {"max_idle_server_connections": "32", "idle_timeout": "10"},
+            {p: _config["connection_pool"][p] for p in _pool})
+        self.assertEqual(
+            {"connection_pool": {"max_idle_server_connections": "64",
+                                 "idle_timeout": None}},
+            _kv.get(mysql_router.BOOTSTRAP_VALUES))
+
+        # Changed again, the bootstrapped value is kept
+        _pool["max_idle_server_connections"] = 16
+        self.assertTrue(
+            mrc.update_config_parameters({}, {"connection_pool": _pool}))
+        self.assertEqual(
+            "64", _kv.get(mysql_router.BOOTSTRAP_VALUES)["connection_pool"][
+                "max_idle_server_connections"])
+
+        # Unset
+        _pool = {"max_idle_server_connections": None, "idle_timeout": None}
+        self.assertTrue(
+            mrc.update_config_parameters({}, {"connection_pool": _pool}))
+        _config = mrc.read_mysqlrouter_conf()
+        self.assertEqual(
+            "64", _config["connection_pool"]["max_idle_server_connections"])
+        self.assertFalse(_config.has_option("connection_pool", "idle_timeout"))
+        self.assertEqual(
+            {"connection_pool": {}}, _kv.get(mysql_router.BOOTSTRAP_VALUES))
+        self.assertFalse(
+            mrc.update_config_parameters({}, {"connection_pool": _pool}))
+
+        # Unset options do not add a section
+        self.assertFalse(
+            mrc.update_config_parameters({}, {"io": {"threads": None}}))
+        self.assertFalse(mrc.read_mysqlrouter_conf().has_section("io"))
+
+        # A section added by the charm is removed once unset
+        self.assertTrue(
+            mrc.update_config_parameters({}, {"io": {"threads": 4}}))
+        self.assertEqual("4", mrc.read_mysqlrouter_conf()["io"]["threads"])
+        self.assertTrue(
+            mrc.update_config_parameters({}, {"io": {"threads": None}}))
+        self.assertFalse(mrc.read_mysqlrouter_conf().has_section("io"))
+        self.assertNotIn("io", _kv.get(mysql_router.BOOTSTRAP_VALUES))
+
+    def test_config_sections(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+        mrc.options.rest_api_port = 8081
+        mrc.options.metrics_exporter = False
+
+        # Enabled
+        mrc.options.rest_api = True
+        _sections = mrc.config_sections
+        self.assertEqual(
+            _sections["http_server"],
+            {"bind_address": "127.0.0.1", "port": 8081, "ssl": 0})
+        self.assertEqual(
+            _sections["http_auth_backend:charm_backend"]["filename"],
+            "/home/ubuntu/mysqlrouter/rest_api.passwd")
+        self.assertEqual(
+            _sections["rest_routing"], {"require_realm": "charm_realm"})
+        self.assertNotIn("connection_pool", _sections)
+
+        # Connection pool
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "connection_pool",
+            new_callable=mock.PropertyMock)
+        self.connection_pool.return_value = {
+            "max_idle_server_connections": 32}
+        self.assertEqual(
+            mrc.config_sections["connection_pool"],
+            {"max_idle_server_connections": 32})
+        self.connection_pool.return_value = None
+
+        # IO threads
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "io_threads",
+            new_callable=mock.PropertyMock)
+        self.io_threads.return_value = 4
+        self.assertEqual(mrc.config_sections["io"], {"threads": 4})
+
+        # Unset restores the bootstrapped [io]
+        self.io_threads.return_value = None
+        self.assertEqual(mrc.config_sections["io"], {"threads": None})
+
+        # Disabled
+        mrc.options.rest_api = False
+        _sections = mrc.config_sections
+        self.assertEqual({"threads": None}, _sections.pop("io"))
+        self.assertEqual(set(_sections.values()), {None})
+
+    def test_rest_api_password(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self.patch_object(mysql_router.ch_core.host, "pwgen")
+        self.pwgen.return_value = "restpass"
+        mrc = mysql_router.MySQLRouterCharm()
+        self.assertEqual("restpass", mrc.rest_api_password)
+        self.assertEqual("restpass", mrc.rest_api_password)
+        self.pwgen.assert_called_once_with(32)
+
+    def test_configure_rest_api(self):
+        self.patch_object(mysql_router.os.path, "exists")
+        self.patch_object(mysql_router.os, "chmod")
+        self.patch_object(mysql_router.shutil, "chown")
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "rest_api_password",
+            new_callable=mock.PropertyMock)
+        self.rest_api_password.return_value = "restpass"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.system_user = "ubuntu"
+        _passwd = "/home/ubuntu/mysqlrouter/rest_api.passwd"
+
+        # Disabled
+        mrc.options.rest_api = False
+        mrc.options.metrics_exporter = False
+        mrc.configure_rest_api()
+        self.subprocess.check_output.assert_not_called()
+
+        # Already configured
+        mrc.options.rest_api = True
+        self.exists.return_value = True
+        mrc.configure_rest_api()
+        self.subprocess.check_output.assert_not_called()
+
+        # Configured
+        self.exists.return_value = False
+        mrc.configure_rest_api()
+        self.subprocess.check_output.assert_called_once_with(
+            ["/usr/bin/mysqlrouter_passwd", "set", _passwd, "charm"],
+            input=b"restpass", stderr=self.stdout)
+        self.chown.assert_called_once_with(_passwd, user="ubuntu")
+        self.chmod.assert_called_once_with(_passwd, 0o600)
+
+    def test_rest_api_get(self):
+        self.patch_object(mysql_router.urllib.request, "urlopen")
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "rest_api_password",
+            new_callable=mock.PropertyMock)
+        self.rest_api_password.return_value = "restpass"
+        _response = mock.MagicMock()
+        _response.read.return_value = b'{"isAlive": true}'
+        self.urlopen.return_value.__enter__.return_value = _response
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 8081
+
+        self.assertEqual(
+            {"isAlive": True},
+            mrc.rest_api_get("routes/jujuCluster_rw/health"))
+        _request = self.urlopen.call_args[0][0]
+        self.assertEqual(
+            "http://127.0.0.1:8081/api/20190715/routes/jujuCluster_rw/health",
+            _request.full_url)
+        self.assertEqual(
+            "Basic Y2hhcm06cmVzdHBhc3M=",
+            _request.get_header("Authorization"))
+
+        # Failed
+        self.urlopen.side_effect = OSError("Connection refused")
+        self.assertIsNone(mrc.rest_api_get("routes"))
+
+    def test_check_rest_api_health(self):
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.rest_api_get = mock.MagicMock()
+
+        # Alive
+        mrc.rest_api_get.return_value = {"isAlive": True}
+        self.assertTrue(mrc.check_rest_api_health())
+        self.assertEqual(4, len(mrc.rest_api_get.mock_calls))
+        mrc.rest_api_get.assert_any_call("routes/jujuCluster_ro/health")
+
+        # Dead
+        mrc.rest_api_get.return_value = {"isAlive": False}
+        self.assertFalse(mrc.check_rest_api_health())
+
+        # Unavailable
+        mrc.rest_api_get.return_value = None
+        self.assertFalse(mrc.check_rest_api_health())
+
+    def test_router_stats(self):
+        self.patch_object(mysql_router, "read_server_greeting")
+        self.patch_object(mysql_router.time, "time")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        _kv = FakeKV()
+        self.kv.return_value = _kv
+        self._write_mysqlrouter_conf()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api = False
+        mrc.options.metrics_exporter = False
+        self.read_server_greeting.return_value = "8.0.19"
+
+        # REST API disabled
+        self.time.side_effect = [1000, 1000, 1000.0015, 1000, 1000.002]
+        _stats = mrc.router_stats()
+        self.assertEqual(
+            _stats["jujuCluster_rw"],
+            {"protocol": "classic",
+             "bind-port": 3306,
+             "socket": RW_SOCKET,
+             "destinations": ["metadata-cache://jujuCluster/?role=PRIMARY"],
+             "server-version": "8.0.19",
+             "greeting-ms": 2.0})
+        self.assertEqual(1.5, _stats["jujuCluster_ro"]["greeting-ms"])
+        self.assertNotIn("greeting-ms", _stats["jujuCluster_x_rw"])
+        self.assertNotIn("active-connections", _stats["jujuCluster_rw"])
+
+        # REST API enabled
+        def _rest_api_get(path):
+            if path.endswith("/status"):
+                return {"activeConnections": 2, "totalConnections": 100}
+            return {"items": [{"address": "10.5.0.10", "port": 3306}]}
+
+        mrc.options.rest_api = True
+        mrc.rest_api_get = mock.MagicMock(side_effect=_rest_api_get)
+        self.read_server_greeting.return_value = None
+        self.time.side_effect = None
+        self.time.return_value = 1000
+        _stats = mrc.router_stats()
+        self.assertEqual(2, _stats["jujuCluster_rw"]["active-connections"])
+        self.assertEqual(100, _stats["jujuCluster_rw"]["total-connections"])
+        self.assertNotIn("connection-rate", _stats["jujuCluster_rw"])
+        self.assertEqual(
+            ["10.5.0.10:3306"], _stats["jujuCluster_rw"]["destinations"])
+        self.assertIsNone(_stats["jujuCluster_rw"]["greeting-ms"])
+
+        # Rate since the previous call
+        _kv.get(mysql_router.ROUTER_STATS)["jujuCluster_rw"]["total"] = 50
+        self.time.return_value = 1010
+        _stats = mrc.router_stats()
+        self.assertEqual(5.0, _stats["jujuCluster_rw"]["connection-rate"])
+
+    def test_probe_failover(self):
+        _clock = FakeClock()
+        self.patch_object(mysql_router.time, "time")
+        self.patch_object(mysql_router.time, "sleep")
+        self.time.side_effect = _clock.time
+        self.sleep.side_effect = _clock.sleep
+        self.patch_object(
+            mysql_router.mysql.MySQLdb, "_exceptions")
+        self._exceptions.OperationalError = FakeException
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "route_ports",
+            new_callable=mock.PropertyMock)
+        self.route_ports.return_value = {"rw": 3306}
+        self.endpoint_from_flag.return_value = self.db_router
+        self.db_router.password.return_value = '"routerpass"'
+        _helper = mock.MagicMock()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.get_db_helper = mock.MagicMock()
+        mrc.get_db_helper.return_value = _helper
+
+        # Writable, then the primary goes away: a statement fails, the
+        # first reconnect fails, the second reaches a read only member and
+        # the third the new primary
+        _results = iter(
+            [[(0,)], [(0,)], FakeException, FakeException, [(1,)]])
+
+        def _select(sql):
+            result = next(_results, [(0,)])
+            if result is FakeException:
+                raise FakeException()
+            return result
+
+        def _connect(*args, **kwargs):
+            if _helper.connect.call_count == 3:
+                _clock.now += 0.125
+            elif _helper.connect.call_count > 1:
+                _clock.now += 0.0625
+
+        _helper.select.side_effect = _select
+        _helper.connect.side_effect = _connect
+
+        _stats = mrc.probe_failover(2.5, interval=0.25)
+        _helper.connect.assert_called_with(
+            "mysqlrouteruser", "routerpass", "127.0.0.1", port=3306,
+            connect_timeout=mysql_router.PROBE_CONNECT_TIMEOUT)
+        self.assertEqual(4, _helper.connect.call_count)
+        self.assertEqual(10, _stats["probes"])
+        self.assertEqual(3, _stats["failed-statements"])
+        self.assertEqual(1, _stats["outages"])
+        self.assertTrue(_stats["recovered"])
+        # Last success at 0.25s, next at 1.3125s
+        self.assertEqual(1062.5, _stats["max-gap-ms"])
+        self.assertEqual(62.5, _stats["reconnect-p50-ms"])
+        self.assertEqual(125.0, _stats["reconnect-p99-ms"])
+
+    def test_config_changed(self):
+        self.patch_object(mysql_router.os.path, "exists")
+        self.patch_object(
+            mysql_router.ch_core.host, "restart_on_change_helper")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.metrics_exporter = False
+        mrc.configure_rest_api = mock.MagicMock()
+        mrc.update_config_parameters = mock.MagicMock()
+        mrc.render_systemd_unit = mock.MagicMock()
+        mrc.configure_metrics_exporter = mock.MagicMock()
+        mrc.request_restart = mock.MagicMock()
+        mrc.configure_sysctl = mock.MagicMock()
+
+        # Not yet bootstrapped
+        self.exists.return_value = False
+        mrc.config_changed()
+        self.restart_on_change_helper.assert_not_called()
+        mrc.configure_sysctl.assert_called_once_with()
+
+        # Bootstrapped
+        self.exists.return_value = True
+        mrc.config_changed()
+        self.restart_on_change_helper.assert_called_once()
+        _args, _kwargs = self.restart_on_change_helper.call_args
+        self.assertEqual(mrc.restart_map, _args[1])
+        _args[0]()
+        mrc.configure_rest_api.assert_called_once_with()
+        mrc.update_config_parameters.assert_called_once_with(
+            mrc.config_parameters, mrc.config_sections)
+        mrc.render_systemd_unit.assert_called_once_with()
+        mrc.configure_metrics_exporter.assert_called_once_with()
+        _kwargs["restart_functions"][mysql_router.MYSQLROUTER_SERVICE](
+            mysql_router.MYSQLROUTER_SERVICE)
+        mrc.request_restart.assert_called_once_with()
 
     def test_proxy_db_and_user_requests_no_prefix(self):
         mrc = mysql_router.MySQLRouterCharm()
@@ -436,6 +2802,116 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
                       prefix="novacell0")]
         self.db_router.configure_proxy_db.assert_has_calls(_calls)
 
+    def test_proxy_db_and_user_requests_incremental(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        _relation = mock.MagicMock()
+        _relation.relation_id = "db-router:3"
+        self.db_router.relations = [_relation]
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # All prefixes sent initially
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.assertEqual(3, len(self.db_router.configure_proxy_db.mock_calls))
+
+        # Nothing changed
+        self.db_router.configure_proxy_db.reset_mock()
+        mrc.invalidate_relation_snapshot()
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.db_router.configure_proxy_db.assert_not_called()
+
+        # One prefix changed and one removed
+        mrc.invalidate_relation_snapshot()
+        self.nova_shared_db.all_joined_units.received = {
+            "nova_database": "nova", "nova_username": "nova",
+            "nova_hostname": self.nova_unit_ip,
+            "novaapi_database": "nova_api", "novaapi_username": "novaapi",
+            "novaapi_hostname": self.nova_unit_ip}
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.db_router.configure_proxy_db.assert_has_calls([
+            mock.call("nova_api", "novaapi", self.nova_unit_ip,
+                      prefix="novaapi"),
+            mock.call(None, None, None, prefix="novacell0")])
+        self.assertEqual(2, len(self.db_router.configure_proxy_db.mock_calls))
+
+        # db-router relation recreated
+        self.db_router.configure_proxy_db.reset_mock()
+        mrc.invalidate_relation_snapshot()
+        _relation.relation_id = "db-router:4"
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.assertEqual(2, len(self.db_router.configure_proxy_db.mock_calls))
+
+    def test_proxy_db_and_user_requests_clusters(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        _mysql, _cell1 = self._relate_clusters("mysql", "mysql-cell1")
+        self.db_router.relations = [_mysql, _cell1]
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.cluster_prefixes = "novacell0=mysql-cell1"
+
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.db_router.configure_proxy_db.assert_not_called()
+        self.db_router.set_prefix.assert_has_calls([
+            mock.call("nova"), mock.call("novaapi"),
+            mock.call("novacell0")])
+        self.assertEqual("nova_cell0", _cell1.to_publish_raw[
+            "novacell0_database"])
+        self.assertIsNone(_mysql.to_publish_raw["novacell0_database"])
+        self.assertEqual("nova", _mysql.to_publish_raw["nova_database"])
+        self.assertIsNone(_cell1.to_publish_raw["nova_username"])
+
+        # Remapped prefix is resent
+        mrc.invalidate_relation_snapshot()
+        mrc.options.cluster_prefixes = None
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.assertEqual("nova_cell0", _mysql.to_publish_raw[
+            "novacell0_database"])
+        self.assertIsNone(_cell1.to_publish_raw["novacell0_database"])
+
+    def test_proxy_db_and_user_responses_clusters(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set")
+        self.is_flag_set.return_value = False
+        _mysql, _cell1 = self._relate_clusters("mysql", "mysql-cell1")
+        _mysql.joined_units.received_raw = {"nova_password": '"pass0"'}
+        _cell1.joined_units.received_raw = {"novacell0_password": '"pass1"'}
+        self.local_unit.return_value = "nmr/5"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.cluster_prefixes = "novacell0=mysql-cell1"
+        mrc.options.cluster_base_ports = "mysql-cell1=3316"
+        mrc.additional_connection_info = mock.MagicMock()
+        mrc.additional_connection_info.side_effect = (
+            lambda prefix: {"cluster": mrc._cluster})
+        self.db_router.get_prefixes.return_value = [
+            mrc.db_prefix, "nova", "novacell0"]
+
+        # Router of mysql-cell1 not started
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.nova_shared_db.set_db_connection_info.assert_called_once_with(
+            self.nova_shared_db.relation_id, mrc.shared_db_address, "pass0",
+            None, prefix="nova")
+        self.is_flag_set.assert_called_once_with(
+            mysql_router.MYSQL_ROUTER_STARTED + ".mysql-cell1")
+
+        # Started
+        self.is_flag_set.return_value = True
+        self.nova_shared_db.set_db_connection_info.reset_mock()
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.nova_shared_db.set_db_connection_info.assert_called_once_with(
+            self.nova_shared_db.relation_id, mrc.shared_db_address, "pass1",
+            None, prefix="novacell0")
+        self.nova_unit.relation.to_publish_raw.update.assert_called_with(
+            {"cluster": "mysql-cell1"})
+
+        # Started, but its base port was removed
+        self.nova_shared_db.set_db_connection_info.reset_mock()
+        mrc.additional_connection_info.reset_mock()
+        mrc.options.cluster_base_ports = None
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.nova_shared_db.set_db_connection_info.assert_not_called()
+        mrc.additional_connection_info.assert_called_once_with("nova")
+
     def test_proxy_db_and_user_responses_unprefixed(self):
         _json_pass = '"pass"'
         _pass = json.loads(_json_pass)
@@ -471,6 +2947,45 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         for call in self.keystone_shared_db.set_db_connection_info.mock_calls:
             self.assertNotEqual(mrc.db_prefix, call.kwargs.get("prefix"))
 
+    def test_proxy_db_and_user_responses_unchanged(self):
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.kv.return_value = FakeKV()
+        _local_unit = "nmr/5"
+        self.db_router.password.return_value = '"pass"'
+        self.db_router.allowed_units.return_value = json.dumps(_local_unit)
+        self.local_unit.return_value = _local_unit
+
+        mrc = mysql_router.MySQLRouterCharm()
+        self.db_router.get_prefixes.return_value = [
+            mrc.db_prefix, "nova", "novaapi"]
+
+        # Published initially
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.assertEqual(
+            2, len(self.nova_shared_db.set_db_connection_info.mock_calls))
+
+        # Unchanged
+        self.nova_shared_db.set_db_connection_info.reset_mock()
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.nova_shared_db.set_db_connection_info.assert_not_called()
+
+        # Opted in to read only endpoints
+        mrc.additional_connection_info = mock.MagicMock()
+        mrc.additional_connection_info.return_value = {"db_ro_port": 3307}
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.assertEqual(
+            2, len(self.nova_shared_db.set_db_connection_info.mock_calls))
+        self.nova_unit.relation.to_publish_raw.update.assert_called_with(
+            {"db_ro_port": 3307})
+
+        # Password changed
+        self.nova_shared_db.set_db_connection_info.reset_mock()
+        mrc.invalidate_relation_snapshot()
+        self.db_router.password.return_value = '"newpass"'
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.assertEqual(
+            2, len(self.nova_shared_db.set_db_connection_info.mock_calls))
+
     def test_proxy_db_and_user_responses_prefixed(self):
         _json_pass = '"pass"'
         _pass = json.loads(_json_pass)
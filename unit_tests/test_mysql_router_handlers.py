@@ -32,11 +32,16 @@ class TestRegisteredHooks(test_utils.TestRegisteredHooks):
             "when": {
                 "db_router_request": (
                     "db-router.connected", "charm.installed",),
+                "remove_departed_clusters": (
+                    "endpoint.db-router.departed",),
                 "bootstrap_mysqlrouter": (
                     mysql_router.DB_ROUTER_AVAILABLE, "charm.installed",),
                 "start_mysqlrouter": (
                     mysql_router.MYSQL_ROUTER_BOOTSTRAPPED,
                     mysql_router.DB_ROUTER_AVAILABLE, "charm.installed",),
+                "configure_additional_clusters": (
+                    mysql_router.MYSQL_ROUTER_STARTED,
+                    mysql_router.DB_ROUTER_AVAILABLE,),
                 "proxy_shared_db_requests": (
                     mysql_router.MYSQL_ROUTER_STARTED,
                     mysql_router.DB_ROUTER_AVAILABLE,
@@ -76,9 +81,16 @@ class TestMySQLRouterHandlers(test_utils.PatchHelper):
         self.shared_db = mock.MagicMock()
         self.db_router = mock.MagicMock()
 
+    def test_handlers_timed(self):
+        self.patch_object(handlers.mysql_router, "timed")
+        handlers.bootstrap_mysqlrouter(self.db_router)
+        self.timed.assert_called_once_with("bootstrap_mysqlrouter")
+        self.timed.return_value.__enter__.assert_called_once_with()
+
     def test_db_router_request(self):
         handlers.db_router_request(self.db_router)
         self.db_router.set_prefix.assert_called_once_with(self.mr.db_prefix)
+        self.mr.invalidate_relation_snapshot.assert_called_once_with()
 
     def test_bootstrap_mysqlrouter(self):
         handlers.bootstrap_mysqlrouter(self.db_router)
@@ -88,6 +100,19 @@ class TestMySQLRouterHandlers(test_utils.PatchHelper):
         handlers.start_mysqlrouter(self.db_router)
         self.mr.start_mysqlrouter.assert_called_once()
 
+    def test_remove_departed_clusters(self):
+        self.patch_object(handlers.reactive, "clear_flag")
+        handlers.remove_departed_clusters(self.db_router)
+        self.mr.remove_departed_clusters.assert_called_once_with()
+        self.mr.assess_status.assert_called_once_with()
+        self.clear_flag.assert_called_once_with(
+            "endpoint.db-router.departed")
+
+    def test_configure_additional_clusters(self):
+        handlers.configure_additional_clusters(self.db_router)
+        self.mr.configure_additional_clusters.assert_called_once_with()
+        self.mr.assess_status.assert_called_once_with()
+
     def test_proxy_shared_db_requests(self):
         handlers.proxy_shared_db_requests(self.shared_db, self.db_router)
         self.mr.proxy_db_and_user_requests.assert_called_once_with(
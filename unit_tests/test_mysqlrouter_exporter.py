@@ -0,0 +1,107 @@
+# Copyright 2019 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+import charms_openstack.test_utils as test_utils
+
+import mysqlrouter_exporter
+
+
+class FakeClient(object):
+
+    def __init__(self, resources):
+        self.resources = resources
+
+    def get(self, path):
+        if path not in self.resources:
+            raise OSError("Not found")
+        return self.resources[path]
+
+
+class TestMySQLRouterExporter(test_utils.PatchHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.client = FakeClient({
+            "routes": {"items": [{"name": "jujuCluster_rw"}]},
+            "metadata": {"items": [{"name": "jujuCluster"}]},
+            "routes/jujuCluster_rw/status": {
+                "activeConnections": 3, "totalConnections": 42,
+                "blockedHosts": 0},
+            "routes/jujuCluster_rw/health": {"isAlive": True},
+            "routes/jujuCluster_rw/destinations": {
+                "items": [{"address": "10.5.0.10", "port": 3306}]},
+            "metadata/jujuCluster/status": {
+                "refreshSucceeded": 100, "refreshFailed": 1,
+                "timeLastRefreshSucceeded": "1970-01-01T00:01:40.000000Z",
+                "timeLastRefreshFailed": None},
+        })
+
+    def test_parse_timestamp(self):
+        self.assertEqual(
+            100.5,
+            mysqlrouter_exporter.parse_timestamp(
+                "1970-01-01T00:01:40.500000Z"))
+        self.assertEqual(
+            100, mysqlrouter_exporter.parse_timestamp("1970-01-01T00:01:40Z"))
+        self.assertIsNone(mysqlrouter_exporter.parse_timestamp(None))
+        self.assertIsNone(mysqlrouter_exporter.parse_timestamp("garbage"))
+
+    def test_collect(self):
+        _metrics = mysqlrouter_exporter.collect(self.client)
+        _route = {"route": "jujuCluster_rw"}
+        _cache = {"metadata_cache": "jujuCluster"}
+        self.assertEqual([({}, 1)], _metrics["mysqlrouter_up"][2])
+        self.assertEqual(
+            [(_route, 3)],
+            _metrics["mysqlrouter_route_active_connections"][2])
+        self.assertEqual(
+            [(_route, 42)],
+            _metrics["mysqlrouter_route_connections_total"][2])
+        self.assertEqual(
+            [(_route, 1)], _metrics["mysqlrouter_route_alive"][2])
+        self.assertEqual(
+            [(_route, 1)], _metrics["mysqlrouter_route_destinations"][2])
+        self.assertEqual(
+            [(_cache, 100)],
+            _metrics["mysqlrouter_metadata_refresh_succeeded_total"][2])
+        self.assertEqual(
+            [(_cache, 100)],
+            _metrics[
+                "mysqlrouter_metadata_last_refresh_succeeded_timestamp_"
+                "seconds"][2])
+        self.assertNotIn(
+            "mysqlrouter_metadata_last_refresh_failed_timestamp_seconds",
+            _metrics)
+
+    def test_collect_unavailable(self):
+        self.assertEqual(
+            {"mysqlrouter_up": (mock.ANY, mock.ANY, [({}, 0)])},
+            mysqlrouter_exporter.collect(FakeClient({})))
+
+    def test_format_metrics(self):
+        self.assertEqual(
+            "# HELP mysqlrouter_route_alive Whether the route is alive\n"
+            "# TYPE mysqlrouter_route_alive gauge\n"
+            'mysqlrouter_route_alive{route="jujuCluster_rw"} 1\n'
+            "# HELP mysqlrouter_up Up\n"
+            "# TYPE mysqlrouter_up gauge\n"
+            "mysqlrouter_up 1\n",
+            mysqlrouter_exporter.format_metrics({
+                "mysqlrouter_up": ("gauge", "Up", [({}, 1)]),
+                "mysqlrouter_route_alive": (
+                    "gauge", "Whether the route is alive",
+                    [({"route": "jujuCluster_rw"}, 1)]),
+            }))